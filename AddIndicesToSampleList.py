@@ -3,6 +3,15 @@ import pandas as pd
 import numpy as np
 from io import StringIO
 
+import index_optimizer
+import index_registry
+import plate_layout
+
+@st.cache_resource
+def get_index_registry():
+    # One registry (per-thread SQLite connections) shared by every session
+    return index_registry.IndexRegistry()
+
 def main():
     st.title("Sample Manifest Management")
 
@@ -40,6 +49,10 @@ def main():
 
     all_index_data = pd.DataFrame()
 
+    plate_format = st.radio("Index plate format:", sorted(plate_layout.FORMATS), horizontal=True, format_func=lambda n: f"{n}-well")
+    plate = plate_layout.layout(plate_format)
+    chemistry = st.radio("Sequencer chemistry:", list(index_optimizer.CHEMISTRIES), horizontal=True)
+
     if source_files:
         for source_file in source_files:
             index_data = pd.read_csv(source_file)
@@ -47,13 +60,13 @@ def main():
             st.dataframe(index_data)
 
             st.subheader(f"Select Indexes for {source_file.name}")
-            rows = ["A", "B", "C", "D", "E", "F", "G", "H"]
-            columns = list(range(1, 13))
+            rows = plate.row_letters.tolist()
+            columns = list(range(1, plate.columns + 1))
 
             # Bulk selection buttons
             col1, col2, col3 = st.columns(3)
             if col1.button("Select All", key=f"select_all_{source_file.name}"):
-                st.session_state["selected_indexes"].update({f"{row}{col:02d}" for col in columns for row in rows})
+                st.session_state["selected_indexes"].update(plate_layout.all_wells(plate_format, pad=True).tolist())
             if col2.button("Clear All", key=f"clear_all_{source_file.name}"):
                 st.session_state["selected_indexes"].clear()
 
@@ -68,6 +81,24 @@ def main():
                         else:
                             st.session_state["selected_indexes"].add(index)
 
+            # Suggested wells: no dark cycles, well-separated indexes and even base composition for the sample count
+            if "i7" in index_data.columns:
+                if st.button(f"Suggest wells for {len(editable_manifest)} samples", key=f"suggest_{source_file.name}"):
+                    suggestion = index_optimizer.optimize(
+                        index_data, len(editable_manifest), chemistry=chemistry, plate_format=plate_format
+                    )
+                    suggested = plate_layout.well_index(suggestion["wells"], plate_format)
+                    st.session_state["selected_indexes"] = set(
+                        plate_layout.well_names(suggested[suggested >= 0], plate_format, pad=True).tolist()
+                    )
+                    # Drop the grid's widget state so the checkboxes start from the suggestion
+                    for label in plate_layout.all_wells(plate_format, pad=True).tolist():
+                        st.session_state.pop(f"grid_{source_file.name}_{label}", None)
+                    st.caption(
+                        f"Suggested {len(suggestion['wells'])} wells: minimum Hamming distance {suggestion['min_distance']}, "
+                        f"{suggestion['dark_cycles']} cycle(s) missing a channel, base diversity {suggestion['diversity']:.2f}."
+                    )
+
             # Display the grid with checkboxes
             grid_selections = []
             for row in rows:
@@ -87,7 +118,7 @@ def main():
                         grid_selections.append(checkbox_label)
 
             # Ensure selected_indexes remains unique and sorted in column-wise order
-            ordered_indexes = sorted(st.session_state["selected_indexes"], key=lambda x: (int(x[1:]), x[0]))
+            ordered_indexes = plate_layout.sort_wells(st.session_state["selected_indexes"], plate_format, order="column")
             st.write("Selected Indexes (Column-Wise Order):")
             st.write(", ".join(ordered_indexes))
 
@@ -132,7 +163,32 @@ def main():
     # Step 5: Save Final Manifest
     st.header("Step 5: Save Final Manifest")
 
+    # Saved manifests go into the registry; new ones are checked against every earlier run.
+    # Saving again in the same session replaces the earlier draft instead of conflicting with it.
+    registry_columns = {"batch", "i5", "i7"}.issubset(editable_manifest.columns)
+    if registry_columns:
+        name_columns = [c for c in editable_manifest.columns if c not in ("batch", "i5", "i7")]
+        guess = next((i for i, c in enumerate(name_columns) if "name" in str(c).lower() or "sample" in str(c).lower()), 0)
+        sample_column = st.selectbox("Sample name column:", name_columns, index=guess)
+        save_anyway = st.checkbox("Save even if the manifest conflicts with earlier runs")
+    else:
+        st.info("Add batch, i5 and i7 columns to check the manifest against earlier runs.")
+
     if st.button("Save Final Manifest"):
+        if registry_columns and sample_column is not None:
+            registry = get_index_registry()
+            rows = index_registry.normalize(editable_manifest, sample_column)
+            draft = st.session_state.get("registered_manifest")
+            conflicts = registry.conflicts(rows, replaces=draft)
+            if not conflicts.empty:
+                st.error(f"{len(conflicts)} conflict(s) with earlier runs:")
+                st.dataframe(conflicts, hide_index=True)
+                if not save_anyway:
+                    return
+            st.session_state["registered_manifest"] = registry.record(rows, "final_manifest.csv", replaces=draft)
+            replaced = " It replaces the version saved earlier in this session." if draft is not None else ""
+            st.success(f"Manifest registered ({len(rows)} samples in batch {', '.join(rows['batch'].unique())}).{replaced}")
+
         buffer = StringIO()
         editable_manifest.to_csv(buffer, index=False)
         buffer.seek(0)
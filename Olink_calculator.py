@@ -2,6 +2,8 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime
 
+import pricing_catalog
+
 # Set page configuration for full width
 st.set_page_config(layout="wide")
 
@@ -30,8 +32,8 @@ set_custom_css()
 st.image("olink_cost_files/MTP_logo_RGB.png", caption="")
 
 # Load category mapping
-categories_csv_path = "olink_cost_files/categories.csv"
-categories_df = pd.read_csv(categories_csv_path)
+catalog = pricing_catalog.current()
+categories_df = catalog.categories()
 
 # Streamlit UI
 st.title("Pricing Calculator")
@@ -40,10 +42,8 @@ st.subheader("Select Category")
 category_options = categories_df["Category Name"].tolist()
 selected_category = st.radio("Choose a panel category:", category_options, horizontal=True)
 
-selected_file = categories_df[categories_df["Category Name"] == selected_category]["Prices File"].values[0]
-prices_df = pd.read_csv(selected_file)
-rules_csv_path = "olink_cost_files/pricing_rules.csv"
-rules_df = pd.read_csv(rules_csv_path)
+prices_df = catalog.prices(selected_category)
+rules_df = catalog.rules()
 
 prepared_by = st.text_input("Prepared by (Your Name)")
 prepared_for = st.text_input("Prepared for (Name/Email)")
@@ -1,15 +1,19 @@
 
 import pandas as pd
-import math
 import streamlit as st
 import time
 import json
 from datetime import datetime
 
+import metrics
+import pricing
+import pricing_catalog
+
 # Session timeout duration (in seconds)
 SESSION_TIMEOUT = 600
 # Set page configuration for full width
 st.set_page_config(layout="wide")
+metrics.app_run("Price_calculator")
 
 # Custom CSS for intermediate width
 
@@ -112,8 +116,11 @@ st.image("olink_cost_files/MTP_logo_RGB.png", caption="")
 # Load category mapping
 
 
-categories_csv_path = "olink_cost_files/categories.csv"  # Ensure this file exists with category-to-file mapping
-categories_df = pd.read_csv(categories_csv_path)
+catalog = pricing_catalog.current()  # Validated, memory-mapped pricing catalog shared across sessions
+categories_df = catalog.categories()
+if pricing_catalog.errors():
+    st.warning("The pricing files were edited but failed validation; prices below are from the last valid version.\n\n"
+               + "\n".join(f"- {issue}" for issue in pricing_catalog.errors()))
 
 # Streamlit UI
 
@@ -127,15 +134,9 @@ st.subheader("Select Category")
 category_options = categories_df["Category Name"].tolist()
 selected_category = st.radio("Choose a panel category:", category_options, horizontal=True)
 
-# Get corresponding pricing file
-
-
-selected_file = categories_df[categories_df["Category Name"] == selected_category]["Prices File"].values[0]
-
 # Load the selected pricing data
-prices_df = pd.read_csv(selected_file)
-rules_csv_path = "olink_cost_files/pricing_rules.csv"
-rules_df = pd.read_csv(rules_csv_path)
+prices_df = catalog.prices(selected_category)
+rules_df = catalog.rules()
 
 # User information input
 #prepared_by = st.text_input("Prepared by (Your Name)")
@@ -143,12 +144,11 @@ prepared_for = st.text_input("Prepared for (Name/Email)")
 notes = st.text_area("Additional Notes")
 
 # Account type selection
-account_types = ["Internal", "External Academic", "External Commercial"]
+account_types = pricing.ACCOUNT_TYPES
 selected_account = st.radio("Select Account Type:", account_types)
 
 # Extract panel names dynamically
-combinable_panels = prices_df[prices_df["Panel type"] == "Combinable"]["Panel Name"].tolist()
-standalone_panels = prices_df[prices_df["Panel type"] == "Standalone"]["Panel Name"].tolist()
+combinable_panels, standalone_panels = pricing.panel_options(prices_df)
 
 # Panel selection UI
 st.subheader("Select Panels")
@@ -170,140 +170,38 @@ selected_panels = selected_combinable_panels + ([selected_standalone_panel] if s
 # User input for number of samples
 num_samples = st.number_input("Enter the number of samples:", min_value=1, step=1)
 
-# Function to get batch size and product details
-def get_panel_details(panel):
-    row = prices_df[prices_df["Panel Name"].str.strip() == panel.strip()]
-    if not row.empty:
-        try:
-            batch_size = int(row.iloc[0]["Batch Size"])
-            product_name = row.iloc[0]["Product Name"].strip()
-            return batch_size, product_name
-        except (ValueError, TypeError):
-            return None, None
-    return None, None
-
-# Function to fetch product price
-def get_product_price(product, count):
-    row = rules_df[rules_df["Product Name"].str.strip() == product.strip()]
-    if not row.empty:
-        price_column = f"{selected_account} Price"
-        base_price = float(row.iloc[0][price_column])
-
-        # Check for volume discount
-        if "Batch Number for Discount" in row and "Discount Percentage" in row:
-            discount_threshold = row.iloc[0]["Sample Number for Discount"]
-            discount_percentage = row.iloc[0]["Discount Percentage"]
-
-            if count >= discount_threshold:
-                base_price *= (1 - discount_percentage / 100)
-
-        return count * base_price, base_price
-    return 0, 0
-
-# Get sequencing kit information
-def get_sequencing_kit_info(product):
-    row = rules_df[rules_df["Product Name"].str.strip() == product.strip()]
-    if not row.empty:
-        sequencing_kit = row.iloc[0].get("Sequencing Kit", "").strip()
-        sequencing_qty = float(row.iloc[0].get("Sequencing Qty per Batch", 0))
-        return sequencing_kit, sequencing_qty
-    return None, 0
-
 # Determine closest valid sample numbers
-valid_batches = []
-for panel in selected_panels:
-    batch_size, product_name = get_panel_details(panel)
-    if batch_size:
-        valid_batches.append(batch_size)
-if valid_batches:
-    closest_smaller = max([b * (num_samples // b) for b in valid_batches])
-    closest_larger = min([b * (num_samples // b + 1) for b in valid_batches])
-    num_samples = st.radio("Choose a valid sample count:", [closest_smaller, closest_larger])
-
-
-def apply_bundle_rules(product, sample_count, batch_size):
-    row = rules_df[rules_df["Product Name"].str.strip() == product.strip()]
-
-    if not row.empty:
-        bundle_size = row.iloc[0].get("Bundle Size")
-        bundle_product = row.iloc[0].get("Bundle Product Name")
-
-        if pd.notna(bundle_size) and pd.notna(bundle_product):
-            bundle_size = int(bundle_size)
-            batch_count = sample_count // batch_size  # Number of full batches
-            full_bundles = batch_count // bundle_size  # Number of complete bundled products
-            remainder_batches = batch_count % bundle_size  # Remaining unbundled batches
-
-            result = {}
-            if full_bundles > 0:
-                result[bundle_product] = full_bundles
-            if remainder_batches > 0:
-                result[product] = remainder_batches  # Remainder stays as original product
-
-            return result
-
-    # If no bundling is needed, return the original product count
-    return {product: sample_count // batch_size}
-
+valid_counts = pricing.valid_sample_counts(prices_df, selected_panels, num_samples)
+if valid_counts:
+    # Planner: rank every sample count in a range across all selected panels at once
+    with st.expander("Batch alignment planner"):
+        plan_cols = st.columns(3)
+        plan_low = plan_cols[0].number_input("From samples:", min_value=1, value=max(1, valid_counts[0]), step=1)
+        plan_high = plan_cols[1].number_input("To samples:", min_value=1, value=max(valid_counts[1], num_samples) * 2, step=1)
+        plan_rank = plan_cols[2].selectbox("Rank by:", ["Cost per Sample", "Total Cost", "Wasted Wells"])
+        plan = pricing.plan_batches(prices_df, rules_df, selected_panels, plan_low, plan_high, selected_account, plan_rank)
+        st.dataframe(plan, hide_index=True)
+
+    num_samples = st.radio("Choose a valid sample count:", valid_counts)
 
 # Process selection and calculate costs
-
-panel_breakdown = {}
-product_counts = {}
-sequencing_counts = {}
-total_cost = 0.0
 export_data = [["Prepared by", prepared_by], ["Prepared for", prepared_for], ["Account Type", selected_account], ["Number of Samples", num_samples], ["Notes", notes]]
-
-if num_samples > 0 and selected_panels:
-    for panel in selected_panels:
-        batch_size, product_name = get_panel_details(panel)
-        if batch_size and product_name:
-            product_batches = num_samples // batch_size  # Calculate full batch count
-            bundled_products = apply_bundle_rules(product_name, num_samples, batch_size)
-
-            for bundled_product, bundled_count in bundled_products.items():
-                product_counts[bundled_product] = product_counts.get(bundled_product, 0) + bundled_count
-
-                # Ensure sequencing kits are assigned correctly based on the final product
-                sequencing_kit, sequencing_qty = get_sequencing_kit_info(bundled_product)
-                if sequencing_kit:
-                    sequencing_counts[sequencing_kit] = sequencing_counts.get(sequencing_kit, 0) + (
-                                bundled_count * sequencing_qty)
-
-# Round sequencing kit quantities
-#for seq_kit in sequencing_counts:
- #   sequencing_counts[seq_kit] = math.ceil(sequencing_counts[seq_kit])
-
-#for seq_kit, count in sequencing_counts.items():
-#    cost, unit_price = get_product_price(seq_kit, count)
-#    total_cost += cost
-#    st.write(f"Sequencing Kit: {seq_kit}, Quantity: {count}, Cost: {cost:.2f}")
-
-#for seq_kit in sequencing_counts:
-
+quote = pricing.quote_category(selected_category, selected_panels, num_samples, selected_account)
+panel_breakdown = quote["panels"]
+product_counts = {line["product"]: line["quantity"] for line in quote["products"]}
+sequencing_counts = {line["kit"]: line["quantity"] for line in quote["sequencing_kits"]}
+total_cost = quote["total"]
 
 # Display panel breakdown
 st.subheader("Panel Breakdown")
-panel_breakdown = {}
-if num_samples > 0 and selected_panels:
-    for panel in selected_panels:
-        batch_size, _ = get_panel_details(panel)
-        if batch_size:
-            panel_count = num_samples // batch_size
-            panel_breakdown[panel] = panel_breakdown.get(panel, 0) + panel_count
-
-
-
 for panel, count in panel_breakdown.items():
     st.write(f"Panel: {panel}, Quantity: {count}")
 
 
-# Apply bundle rules and calculate total cost
+# Display products and their costs
 st.subheader("Products and Associated Costs")
-for product, count in product_counts.items():
-    cost, unit_price = get_product_price(product, count)
-    total_cost += cost
-    st.write(f"{product}: {count} x {unit_price:.2f} = {cost:.2f}")
+for line in quote["products"]:
+    st.write(f"{line['product']}: {line['quantity']} x {line['unit_price']:.2f} = {line['cost']:.2f}")
 
 if not product_counts:
     st.write("No products found.")
@@ -311,18 +209,8 @@ if not product_counts:
 
 # Display sequencing kit breakdown
 st.subheader("Sequencing Kits")
-
-for seq_kit in sequencing_counts:
-    sequencing_counts[seq_kit] = math.ceil(sequencing_counts[seq_kit])
-
-
-for seq_kit, count in sequencing_counts.items():
-    cost, unit_price = get_product_price(seq_kit, count)
-    total_cost += cost
-    st.write(f"Sequencing Kit: {seq_kit}, Quantity: {count}, Cost: {cost:.2f}")
-
-
-
+for line in quote["sequencing_kits"]:
+    st.write(f"Sequencing Kit: {line['kit']}, Quantity: {line['quantity']}, Cost: {line['cost']:.2f}")
 
 
 # Display total cost
@@ -2,6 +2,43 @@ import streamlit as st
 import pandas as pd
 import openpyxl
 
+import form_templates
+import form_validation
+import manifests
+
+def show_form_manifests(form: dict):
+    """Preview and download the manifest(s) of a form read by form_templates."""
+    st.info(f"Detected form: {form['title']} (version {form['version']}, sheet '{form['sheet']}')")
+    report = form_validation.validate(form)
+    if report.empty:
+        st.success("No problems found in the form.")
+    else:
+        st.warning(f"{len(report)} problem(s) found in the form; fix them in the workbook and upload it again.")
+        st.dataframe(report.drop(columns=["file"]), hide_index=True)
+    csv_files = manifests.form_manifests(form)
+    if not csv_files:
+        st.warning("The form has no named samples.")
+        return
+
+    for filename, rows in csv_files:
+        st.write(f"Preview of {filename}:")
+        st.dataframe(pd.DataFrame(rows[1:], columns=rows[0]))
+    if len(csv_files) == 1:
+        filename, rows = csv_files[0]
+        st.download_button(
+            label="Download CSV",
+            data=pd.DataFrame(rows[1:], columns=rows[0]).to_csv(index=False),
+            file_name=filename,
+            mime="text/csv"
+        )
+    else:
+        st.download_button(
+            label="Download Manifests as ZIP",
+            data=manifests.create_zip(csv_files),
+            file_name="Manifests.zip",
+            mime="application/zip"
+        )
+
 # Streamlit app
 def main():
     st.title("Excel to CSV Converter")
@@ -10,36 +47,29 @@ def main():
     uploaded_file = st.file_uploader("Upload an Excel file", type=["xlsx", "xls"])
 
     if uploaded_file:
-        # Load the Excel file
+        # Shipped templates are recognised from their header cells and read through their cell map
+        try:
+            form = form_templates.extract(uploaded_file.getvalue())
+        except form_templates.UnknownTemplate:
+            form = None
+        except Exception as e:
+            st.error(f"An error occurred: {e}")
+            return
+        if form is not None:
+            show_form_manifests(form)
+            return
+
+        # Other layouts: quote number in C5 and samples from row 11 of the chosen sheet
         try:
             excel_data = pd.ExcelFile(uploaded_file)
             sheet_name = st.selectbox("Select a sheet", excel_data.sheet_names)
             df = excel_data.parse(sheet_name)
 
-            # Extract filename from cell C5
-            cell_c5 = df.iloc[3, 2]  # Row 5 (index 4), Column C (index 2)
-            if pd.isna(cell_c5):
+            # Quote number (cell C5) and the sample rows from row 11 onwards
+            quote_number, result_df = manifests.submission_manifest(df)
+            if quote_number is None:
                 st.error("Cell C5 is empty. ")
-                print(cell_c5)
-                cell_c5 = "no quote number found"
-                print(cell_c5)
-                #return
-
-            filename = f"{cell_c5}_sample_manifest.csv"
-            print(cell_c5)
-
-            # Extract data from row 11 onwards
-            start_row = 10  # Row 11 (0-based index)
-            sample_names = df.iloc[start_row:, 0].dropna()  # Column A:A
-            container_names = df.iloc[start_row: start_row + len(sample_names), 12]  # Column M:M
-            well_locations = df.iloc[start_row: start_row + len(sample_names), 13]  # Column N:N
-
-            # Combine into a DataFrame
-            result_df = pd.DataFrame({
-                "sample_well_location": well_locations.values,
-                "Sample_name": sample_names.values,
-                "Container_name": container_names.values
-            })
+            filename = manifests.submission_filename(quote_number)
 
             # Display the resulting DataFrame
             st.write("Preview of the resulting CSV:")
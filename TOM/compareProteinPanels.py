@@ -1,8 +1,13 @@
 import streamlit as st
 import pandas as pd
 import os
+import sys
 from io import BytesIO
 
+# The shared helpers live one level up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import data_access
+
 
 def find_common_items(original_df, custom_df, key_column):
     return original_df[original_df[key_column].isin(custom_df[key_column])]
@@ -36,7 +41,7 @@ if os.path.exists(os.path.join(TEMPLATE_DIR, TEMPLATE_FILE)):
 #template_file = [f for f in os.listdir(DATA_DIR_Temp) if f.endswith("template.csv")]
 #st.download_button("template.csv", template_file)
 #DATA_DIR = "https://github.com/Paolo-Piazza/submission-forms/tree/main"  # Folder where preloaded files are stored
-DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+DATA_DIR = str(data_access.DATA_DIR)
 preloaded_files = [f for f in os.listdir(DATA_DIR) if f.endswith(".csv")]
 
 
@@ -51,41 +56,35 @@ if select_all:
 uploaded_files = st.file_uploader("Or Upload Original CSV Files", type=["csv"], accept_multiple_files=True)
 custom_file = st.file_uploader("Upload Custom CSV File", type=["csv"], accept_multiple_files=False)
 
-# Merge preloaded and uploaded files
-all_files = uploaded_files if uploaded_files else []
-for filename in selected_preloaded_files:
-    all_files.append(open(os.path.join(DATA_DIR, filename), "rb"))
-
-if all_files and custom_file:
-    custom_df = pd.read_csv(custom_file)
+if (uploaded_files or selected_preloaded_files) and custom_file:
+    # Read as text like the preloaded panels, so numeric IDs compare equal on both sides
+    custom_df = pd.read_csv(custom_file, dtype=data_access.PANEL_DTYPES)
     st.write("Custom List Preview:", custom_df.head())
 
     key_column = st.selectbox("Select the common column for comparison:", custom_df.columns)
 
     if st.button("Compare Lists"):
-        results = {}
-        for file in all_files:
-            original_df = pd.read_csv(file)
-            common_items = find_common_items(original_df, custom_df, key_column)
-            results[file.name] = len(common_items)
+        # Uploads are read once; preloaded panels come from the shared, mtime-checked cache
+        sources = {file.name: pd.read_csv(file, dtype=data_access.PANEL_DTYPES) for file in uploaded_files or []}
+        for filename in selected_preloaded_files:
+            sources[filename] = data_access.panel(os.path.join(DATA_DIR, filename))
+
+        results = {name: find_common_items(df, custom_df, key_column) for name, df in sources.items()}
 
         # Sort results by number of matches in descending order
-        sorted_results = sorted(results.items(), key=lambda x: x[1], reverse=True)
+        sorted_results = sorted(results.items(), key=lambda x: len(x[1]), reverse=True)
 
         # Display summary of results
 
         st.write("### Summary of Matches")
         summary_text = "\n".join(
-            [f"{os.path.basename(file_name)}: {match_count} matches found" for file_name, match_count in sorted_results])
+            [f"{os.path.basename(file_name)}: {len(common_items)} matches found" for file_name, common_items in sorted_results])
         st.text(summary_text)
 
 
-        for file_name, match_count in sorted_results:
-            st.write(f"**{os.path.basename(file_name)}: {match_count} matches found**")
+        for file_name, common_items in sorted_results:
+            st.write(f"**{os.path.basename(file_name)}: {len(common_items)} matches found**")
 
-            original_df = pd.read_csv(
-                os.path.join(DATA_DIR, file_name)) if file_name in preloaded_files else pd.read_csv(file_name)
-            common_items = find_common_items(original_df, custom_df, key_column)
             csv_data = convert_df_to_csv(common_items)
             st.download_button(
                 label=f"Download common items for {os.path.basename(file_name)}",
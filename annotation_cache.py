@@ -0,0 +1,118 @@
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+APP_DIR = Path(__file__).parent
+CACHE_DIR = APP_DIR / "cache"
+DEFAULT_PATH = CACHE_DIR / "annotations.sqlite"
+
+# Annotations older than this are treated as missing and fetched again
+DEFAULT_TTL = 30 * 24 * 3600
+
+# Stay well below SQLite's host-parameter limit in IN (...) queries
+_CHUNK = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS symbols (
+    symbol    TEXT    NOT NULL,
+    organism  INTEGER NOT NULL,
+    accession TEXT,
+    fetched   REAL    NOT NULL,
+    PRIMARY KEY (symbol, organism)
+);
+CREATE TABLE IF NOT EXISTS entries (
+    accession TEXT PRIMARY KEY,
+    details   TEXT NOT NULL,
+    fetched   REAL NOT NULL
+);
+"""
+
+
+class AnnotationCache:
+    """On-disk UniProt annotation cache shared by every session and server process.
+
+    Two tables: symbol+organism -> accession (None is cached too, so
+    unresolvable symbols are not searched again) and accession -> parsed
+    details. Rows older than ttl seconds are ignored. The database runs in
+    WAL mode with one connection per thread, so concurrent Streamlit
+    sessions can read while another writes.
+    """
+
+    def __init__(self, path: Path = DEFAULT_PATH, ttl: float = DEFAULT_TTL):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _fresh_since(self) -> float:
+        return time.time() - self.ttl
+
+    # ---------- symbol -> accession ----------
+    def get_accessions(self, symbols: list, organism: int) -> dict:
+        """Return {symbol: accession or None} for the symbols with a fresh cache entry."""
+        found = {}
+        conn = self._connect()
+        symbols = list(dict.fromkeys(symbols))
+        for i in range(0, len(symbols), _CHUNK):
+            chunk = symbols[i:i + _CHUNK]
+            rows = conn.execute(
+                f"SELECT symbol, accession FROM symbols WHERE organism = ? AND fetched >= ? "
+                f"AND symbol IN ({','.join('?' * len(chunk))})",
+                [organism, self._fresh_since(), *chunk],
+            )
+            found.update(rows)
+        return found
+
+    def put_accessions(self, accessions: dict, organism: int) -> None:
+        """Store {symbol: accession or None} lookups."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO symbols (symbol, organism, accession, fetched) VALUES (?, ?, ?, ?)",
+                [(symbol, organism, accession, now) for symbol, accession in accessions.items()],
+            )
+
+    # ---------- accession -> details ----------
+    def get_details(self, accessions: list) -> dict:
+        """Return {accession: details tuple} for the accessions with a fresh cache entry."""
+        found = {}
+        conn = self._connect()
+        accessions = list(dict.fromkeys(accessions))
+        for i in range(0, len(accessions), _CHUNK):
+            chunk = accessions[i:i + _CHUNK]
+            rows = conn.execute(
+                f"SELECT accession, details FROM entries WHERE fetched >= ? "
+                f"AND accession IN ({','.join('?' * len(chunk))})",
+                [self._fresh_since(), *chunk],
+            )
+            found.update((accession, tuple(json.loads(details))) for accession, details in rows)
+        return found
+
+    def put_details(self, details: dict) -> None:
+        """Store {accession: details tuple} annotations."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO entries (accession, details, fetched) VALUES (?, ?, ?)",
+                [(accession, json.dumps(list(values)), now) for accession, values in details.items()],
+            )
+
+    def purge_expired(self) -> None:
+        """Delete rows that are past their time-to-live."""
+        since = self._fresh_since()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM symbols WHERE fetched < ?", (since,))
+            conn.execute("DELETE FROM entries WHERE fetched < ?", (since,))
@@ -0,0 +1,150 @@
+import contextlib
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: checkpoints are only locked within the process
+    fcntl = None
+
+from annotation_cache import CACHE_DIR, DEFAULT_TTL
+from uniprot_client import ANNOTATION_COLUMNS
+
+JOBS_DIR = CACHE_DIR / "jobs"
+
+# Symbols annotated (and checkpointed) per step
+DEFAULT_CHUNK_SIZE = 200
+
+_locks = {}
+_locks_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def _locked(path: Path):
+    """Hold a checkpoint's lock: a thread lock per path, plus a file lock on its directory across processes."""
+    with _locks_lock:
+        lock = _locks.setdefault(str(path), threading.Lock())
+    with lock, open(path.parent / ".lock", "a") as handle:
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        yield  # closing the file releases the file lock
+
+
+class AnnotationJob:
+    """A resumable annotation run over one list of symbols.
+
+    The job id is derived from the (deduplicated) symbols, organism and mode
+    (online / offline), so uploading the same list again after a reload
+    picks up the same job.
+    Completed rows are appended to a JSON-lines checkpoint after every
+    chunk; an interrupted job only annotates what is not in it yet.
+    Rows whose lookup failed are kept in memory only, so the next run
+    retries them. The checkpoint is deleted once the job completes (the
+    annotations themselves live in the annotation cache), and one left
+    behind by an abandoned job expires after ttl seconds like the cache.
+    Sessions annotating the same list share the checkpoint; every read,
+    append and delete holds its lock.
+    """
+
+    def __init__(self, symbols, organism_id: int, mode: str = "online", jobs_dir: Path = JOBS_DIR,
+                 ttl: float = DEFAULT_TTL):
+        self.symbols = list(symbols)
+        self.unique = list(dict.fromkeys(s for s in self.symbols if pd.notna(s)))
+        digest = hashlib.sha1(json.dumps([organism_id, mode, self.unique]).encode("utf-8")).hexdigest()[:16]
+        self.job_id = digest
+        self.path = Path(jobs_dir) / f"{digest}.jsonl"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self._done = self._load()
+        self._unresolved = {}
+
+    def _load(self) -> dict:
+        done = {}
+        with _locked(self.path):
+            if not self.path.exists():
+                return done
+            if time.time() - self.path.stat().st_mtime > self.ttl:
+                self.path.unlink(missing_ok=True)
+                return done
+            data = self.path.read_bytes()
+            if data and not data.endswith(b"\n"):
+                # Job was killed mid-write: drop the partial last line so appends stay line-aligned
+                data = data[: data.rfind(b"\n") + 1]
+                with open(self.path, "r+b") as f:
+                    f.truncate(len(data))
+        for line in data.decode("utf-8", errors="replace").splitlines():
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            if not isinstance(row, list) or not row:
+                continue  # a damaged line only costs its symbol a new lookup
+            done[row[0]] = tuple(row[1:])
+        return done
+
+    @property
+    def total(self) -> int:
+        return len(self.unique)
+
+    @property
+    def completed(self) -> int:
+        return len(self._done) + len(self._unresolved)
+
+    @property
+    def unresolved(self) -> list:
+        """Symbols whose lookup failed in this run; they are not checkpointed."""
+        return list(self._unresolved)
+
+    def pending(self) -> list:
+        return [s for s in self.unique if s not in self._done and s not in self._unresolved]
+
+    def run(self, annotate_chunk, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """Annotate pending symbols chunk by chunk, checkpointing each chunk.
+
+        annotate_chunk(symbols) must return a DataFrame with ANNOTATION_COLUMNS
+        and may list failed lookups in its attrs["unresolved"].
+        Yields (completed, total) after every chunk so callers can stream
+        progress and partial results.
+        """
+        pending = self.pending()
+        for i in range(0, len(pending), chunk_size):
+            chunk_df = annotate_chunk(pending[i:i + chunk_size])
+            unresolved = set(chunk_df.attrs.get("unresolved", ()))
+            rows = [
+                tuple(None if pd.isna(v) else v for v in row)
+                for row in chunk_df[ANNOTATION_COLUMNS].itertuples(index=False, name=None)
+            ]
+            done = "".join(json.dumps(row) + "\n" for row in rows if row[0] not in unresolved)
+            with _locked(self.path), open(self.path, "a", encoding="utf-8") as f:
+                # One write of whole lines; the lock keeps other sessions' chunks from interleaving
+                f.write(done)
+                f.flush()
+                os.fsync(f.fileno())
+            for row in rows:
+                (self._unresolved if row[0] in unresolved else self._done)[row[0]] = row[1:]
+            yield self.completed, self.total
+        with _locked(self.path):
+            self.path.unlink(missing_ok=True)
+
+    def result(self) -> pd.DataFrame:
+        """Return the rows annotated so far, one per input symbol, in input order."""
+        empty = (None, "", "", "", "", "")
+        rows = [
+            (symbol,) + (self._done.get(symbol, self._unresolved.get(symbol)) if pd.notna(symbol) else empty)
+            for symbol in self.symbols
+            if pd.isna(symbol) or symbol in self._done or symbol in self._unresolved
+        ]
+        return pd.DataFrame(rows, columns=ANNOTATION_COLUMNS)
+
+    def discard(self) -> None:
+        """Delete the checkpoint so the next run starts from scratch."""
+        with _locked(self.path):
+            self.path.unlink(missing_ok=True)
+        self._done = {}
+        self._unresolved = {}
@@ -0,0 +1,132 @@
+"""Prebuilt UniProt annotations for every protein in the preloaded panels.
+
+Build (needs network access to UniProt, run after data/ changes):
+
+    python annotation_snapshot.py
+
+The snapshot is a build artifact (snapshot/ is not under version control);
+without it every symbol goes to the live client.
+"""
+import argparse
+from pathlib import Path
+
+import pandas as pd
+
+import data_access
+import panel_catalog
+import protein_ids
+from uniprot_client import ANNOTATION_COLUMNS, UniProtClient, parse_entry
+
+SNAPSHOT_PATH = panel_catalog.APP_DIR / "snapshot" / "annotation_snapshot.parquet"
+
+SNAPSHOT_COLUMNS = ANNOTATION_COLUMNS + ["Organism ID"]
+
+
+# ---------- Build ----------
+def catalog_proteins(data_dir: Path = panel_catalog.DATA_DIR) -> pd.DataFrame:
+    """Return the distinct (Protein Symbol, UniProt ID) pairs across every preloaded panel.
+
+    Multi-protein assays ("IL12A_IL12B" / "P29459_P29460") are paired up
+    component by component; rows whose key is not a UniProt accession
+    (e.g. "NT-proBNP") are left out.
+    """
+    data_dir = Path(data_dir)
+    pairs = []
+    for name in panel_catalog.list_panels(data_dir):
+        df = data_access.panel(data_dir / name)
+        if not {"Gene", panel_catalog.KEY_COLUMN} <= set(df.columns):
+            continue
+        accessions = protein_ids.split_keys(df[panel_catalog.KEY_COLUMN])
+        genes = protein_ids.canonical_keys(df["Gene"]).str.split(protein_ids.SEPARATORS, regex=True).explode()
+        # Pair the n-th accession of a row with the n-th gene symbol of the same row
+        accessions = accessions.to_frame("UniProt ID").assign(part=accessions.groupby(level=0).cumcount())
+        genes = genes.to_frame("Protein Symbol").assign(part=genes.groupby(level=0).cumcount())
+        joined = accessions.reset_index().merge(genes.reset_index(), on=["index", "part"])
+        pairs.append(joined[["Protein Symbol", "UniProt ID"]])
+
+    if not pairs:
+        return pd.DataFrame(columns=["Protein Symbol", "UniProt ID"], dtype=object)
+    proteins = pd.concat(pairs, ignore_index=True).drop_duplicates()
+    return proteins[proteins["UniProt ID"].str.fullmatch(protein_ids.ACCESSION)].reset_index(drop=True)
+
+
+def build_snapshot(client: UniProtClient, data_dir: Path = panel_catalog.DATA_DIR) -> pd.DataFrame:
+    """Annotate every catalog accession once (batched multi-ID queries, no symbol searches)."""
+    proteins = catalog_proteins(data_dir)
+    entries = client.fetch_entries(proteins["UniProt ID"].unique().tolist())
+
+    annotations = pd.DataFrame(
+        [
+            (accession,) + parse_entry(entry) + (entry.get("organism", {}).get("taxonId"),)
+            for accession, entry in entries.items()
+        ],
+        columns=["UniProt ID", "Protein Name", "Function", "GO Terms", "Pathways", "Diseases", "Organism ID"],
+    )
+    snapshot = proteins.merge(annotations, on="UniProt ID", how="inner")
+    snapshot["Organism ID"] = snapshot["Organism ID"].astype("Int32")
+    return snapshot[SNAPSHOT_COLUMNS]
+
+
+def save_snapshot(snapshot: pd.DataFrame, path: Path = SNAPSHOT_PATH) -> None:
+    """Write the snapshot as a zstd-compressed, dictionary-encoded Parquet file."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    snapshot.to_parquet(path, index=False, compression="zstd")
+
+
+# ---------- Lookup ----------
+def load_snapshot(path: Path = SNAPSHOT_PATH):
+    """Return the snapshot DataFrame, or None when it has not been built."""
+    path = Path(path)
+    if not path.exists():
+        return None
+    return pd.read_parquet(path)
+
+
+def snapshot_lookup(snapshot: pd.DataFrame, organism_id: int) -> dict:
+    """Return {upper-cased symbol: annotation row tuple (UniProt ID ... Diseases)} for one organism."""
+    rows = snapshot[snapshot["Organism ID"] == organism_id].drop_duplicates("Protein Symbol")
+    values = rows[ANNOTATION_COLUMNS[1:]].itertuples(index=False, name=None)
+    return dict(zip(rows["Protein Symbol"].str.upper(), values))
+
+
+def annotate(symbols, lookup: dict, client: UniProtClient, offline: bool = False) -> pd.DataFrame:
+    """Annotate symbols from the snapshot first; only symbols it lacks go to the live client.
+
+    df.attrs["unresolved"] passes on the client's failed lookups.
+    """
+    symbols = list(symbols)
+    keys = [str(s).strip().upper() if pd.notna(s) else None for s in symbols]
+    missing = [s for s, k in zip(symbols, keys) if k not in lookup]
+
+    live = {}
+    unresolved = []
+    if missing:
+        live_df = client.annotate(missing, offline=offline)
+        live = dict(zip(live_df["Protein Symbol"], live_df[ANNOTATION_COLUMNS[1:]].itertuples(index=False, name=None)))
+        unresolved = live_df.attrs.get("unresolved", [])
+
+    rows = [
+        (symbol,) + (lookup[key] if key in lookup else live.get(symbol, (None, "", "", "", "", "")))
+        for symbol, key in zip(symbols, keys)
+    ]
+    df = pd.DataFrame(rows, columns=ANNOTATION_COLUMNS)
+    df.attrs["unresolved"] = unresolved
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the UniProt annotation snapshot for the preloaded panels.")
+    parser.add_argument("--data-dir", default=str(panel_catalog.DATA_DIR))
+    parser.add_argument("--output", default=str(SNAPSHOT_PATH))
+    parser.add_argument("--base-url", default=None, help="UniProt REST base URL (default: public UniProt)")
+    args = parser.parse_args()
+
+    client = UniProtClient(base_url=args.base_url) if args.base_url else UniProtClient()
+    snapshot = build_snapshot(client, Path(args.data_dir))
+    save_snapshot(snapshot, Path(args.output))
+    print(f"Wrote {len(snapshot)} annotations ({snapshot['UniProt ID'].nunique()} proteins) to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
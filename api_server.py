@@ -0,0 +1,344 @@
+"""Local JSON API over the pricing, manifest and panel comparison engines.
+
+Run (binds to localhost only by default):
+
+    python api_server.py --port 8765 --workers 8
+
+Endpoints:
+
+    GET  /health
+    GET  /categories                  pricing categories and their panels
+    GET  /panels                      preloaded protein panels
+    POST /quote                       {"category", "panels", "num_samples", "account"}
+    POST /manifest?type=plates        body: submission workbook (.xlsx); add &format=zip for the ZIP
+    POST /manifest?type=submission    body: submission form workbook; optional &sheet=<name>
+    POST /manifest?type=auto          body: any shipped submission template, detected from its header cells
+    POST /validate                    body: submission workbook; cell-addressed problems found in it
+    POST /compare                     {"query": [...], "panels": [...], "key_column", "normalize", "include_rows"}
+    GET  /metrics                     this process's counters and latencies (Prometheus text format)
+
+Requests are served by a bounded worker pool and share the process-wide
+catalog caches (data_access, pricing_catalog) with the engines the
+Streamlit apps use; quotes also go through the host-wide shared_cache.
+"""
+import argparse
+import functools
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from io import BytesIO
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+import data_access
+import form_templates
+import form_validation
+import manifests
+import metrics
+import panel_catalog
+import panel_compare
+import pricing
+import pricing_catalog
+import protein_ids
+import shared_cache
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = 8
+
+# Largest request body accepted (workbooks included)
+MAX_BODY = 50 * 1024 * 1024
+
+# A stalled client holds a worker; drop its connection after this many seconds
+SOCKET_TIMEOUT = 30
+
+REQUESTS = metrics.counter("api_requests_total", "API requests, by endpoint and HTTP status", ["endpoint", "status"])
+REQUEST_SECONDS = metrics.histogram("api_request_seconds", "Seconds to handle an API request", ["endpoint"])
+
+
+class ApiError(Exception):
+    """An error reported to the client as {"error": message} with the given HTTP status."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class PooledHTTPServer(HTTPServer):
+    """HTTPServer that hands every connection to a bounded thread pool."""
+
+    def __init__(self, address, handler, workers: int = DEFAULT_WORKERS):
+        super().__init__(address, handler)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api")
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=True)
+
+
+# ---------- Engines ----------
+@functools.lru_cache(maxsize=4)
+def _alias_table(data_dir: str, signature: tuple) -> pd.Series:
+    """Alias table of the panel catalog; signature (names + mtimes) invalidates it."""
+    return protein_ids.build_alias_table(Path(data_dir))
+
+
+@functools.lru_cache(maxsize=4)
+def _panel_row_keys(data_dir: str, signature: tuple, key_column: str) -> dict:
+    """Concept keys of every panel's key column, normalized once per catalog version."""
+    aliases = _alias_table(data_dir, signature)
+    row_keys = {}
+    for name, _ in signature:
+        df = data_access.panel(Path(data_dir) / name)
+        if key_column in df.columns:
+            row_keys[name] = protein_ids.concept_keys(df[key_column].reset_index(drop=True), aliases)
+    return row_keys
+
+
+def _records(df: pd.DataFrame) -> list:
+    """DataFrame rows as JSON-ready dicts (missing values become null)."""
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+
+def health(params: dict, body: bytes) -> dict:
+    # Rejected pricing source edits: the last good catalog is still serving quotes
+    return {
+        "status": "ok",
+        "pricing_catalog_errors": pricing_catalog.errors(),
+        "shared_cache": shared_cache.default().stats(),
+    }
+
+
+def categories(params: dict, body: bytes) -> dict:
+    catalog = pricing_catalog.current()
+    result = []
+    for category in catalog.categories()["Category Name"]:
+        combinable, standalone = pricing.panel_options(catalog.prices(category))
+        result.append({"category": category, "combinable": combinable, "standalone": standalone})
+    return {"categories": result, "accounts": pricing.ACCOUNT_TYPES}
+
+
+def panels(params: dict, body: bytes) -> dict:
+    return {"panels": panel_catalog.list_panels()}
+
+
+def quote(params: dict, body: bytes) -> dict:
+    request = _json(body)
+    try:
+        category = request["category"]
+        selected = list(request["panels"])
+        num_samples = int(request["num_samples"])
+    except (KeyError, TypeError, ValueError):
+        raise ApiError(400, "quote needs category, panels (list) and num_samples (int)")
+    account = request.get("account", "Internal")
+    try:
+        result = pricing.quote_category(category, selected, num_samples, account)
+    except KeyError as e:
+        raise ApiError(400, str(e.args[0]))
+    prices_df = pricing_catalog.current().prices(category)
+    result["valid_sample_counts"] = pricing.valid_sample_counts(prices_df, selected, num_samples)
+    return result
+
+
+def manifest(params: dict, body: bytes):
+    if not body:
+        raise ApiError(400, "POST the workbook as the request body")
+    kind = params.get("type", "plates")
+    if kind == "auto":
+        try:
+            form = form_templates.extract(BytesIO(body))
+        except form_templates.UnknownTemplate as e:
+            raise ApiError(400, str(e))
+        csv_files = manifests.form_manifests(form)
+        if params.get("format") == "zip":
+            return "application/zip", manifests.create_zip(csv_files).getvalue()
+        return {
+            "template": form["template"],
+            "version": form["version"],
+            "fields": form["fields"],
+            "manifests": [{"filename": name, "rows": rows} for name, rows in csv_files],
+        }
+    if kind == "plates":
+        csv_files = manifests.generate_manifests(manifests.read_excel(BytesIO(body)))
+        if params.get("format") == "zip":
+            return "application/zip", manifests.create_zip(csv_files).getvalue()
+        return {"manifests": [{"filename": name, "rows": rows} for name, rows in csv_files]}
+    if kind == "submission":
+        excel_data = pd.ExcelFile(BytesIO(body))
+        sheet_name = params.get("sheet", excel_data.sheet_names[0])
+        if sheet_name not in excel_data.sheet_names:
+            raise ApiError(400, f"Unknown sheet: {sheet_name}")
+        try:
+            quote_number, result_df = manifests.submission_manifest(excel_data.parse(sheet_name))
+        except IndexError:
+            raise ApiError(400, f"Sheet {sheet_name} does not have the submission form layout")
+        return {
+            "filename": manifests.submission_filename(quote_number),
+            "quote_number": quote_number,
+            "rows": _records(result_df),
+        }
+    raise ApiError(400, f"Unknown manifest type: {kind}")
+
+
+def validate(params: dict, body: bytes) -> dict:
+    if not body:
+        raise ApiError(400, "POST the workbook as the request body")
+    report = form_validation.validate_workbook(BytesIO(body), params.get("name", ""))
+    return {"valid": report.empty, "problems": _records(report.drop(columns=["file"]))}
+
+
+def compare(params: dict, body: bytes) -> dict:
+    request = _json(body)
+    key_column = request.get("key_column", panel_catalog.KEY_COLUMN)
+    query = request.get("query")
+    if not isinstance(query, list):
+        raise ApiError(400, "compare needs query (list of identifiers)")
+    available = panel_catalog.list_panels()
+    selected = request.get("panels") or available
+    unknown = sorted(set(selected) - set(available))
+    if unknown:
+        raise ApiError(400, f"Unknown panels: {', '.join(unknown)}")
+
+    aliases = row_keys = None
+    if request.get("normalize"):
+        signature = panel_catalog.catalog_signature()
+        aliases = _alias_table(str(panel_catalog.DATA_DIR), signature)
+        row_keys = _panel_row_keys(str(panel_catalog.DATA_DIR), signature, key_column)
+    custom_df = pd.DataFrame({key_column: query})
+    sources = [(name, data_access.panel(panel_catalog.DATA_DIR / name)) for name in selected]
+    results, skipped, errors = panel_compare.compare_sources(sources, custom_df, key_column, aliases, row_keys)
+
+    include_rows = request.get("include_rows", False)
+    return {
+        "results": [
+            {
+                "panel": name,
+                "matches": count,
+                "items": common[key_column].tolist(),
+                **({"rows": _records(common)} if include_rows else {}),
+            }
+            for name, count, common in results
+        ],
+        "skipped": skipped,
+        "errors": [{"panel": name, "error": message} for name, message in errors],
+    }
+
+
+def metrics_text(params: dict, body: bytes):
+    return metrics.CONTENT_TYPE, metrics.render().encode("utf-8")
+
+
+def _json(body: bytes) -> dict:
+    try:
+        request = json.loads(body or b"{}")
+    except ValueError:
+        raise ApiError(400, "Request body is not valid JSON")
+    if not isinstance(request, dict):
+        raise ApiError(400, "Request body must be a JSON object")
+    return request
+
+
+ROUTES = {
+    ("GET", "/health"): health,
+    ("GET", "/categories"): categories,
+    ("GET", "/panels"): panels,
+    ("POST", "/quote"): quote,
+    ("POST", "/manifest"): manifest,
+    ("POST", "/validate"): validate,
+    ("POST", "/compare"): compare,
+    ("GET", "/metrics"): metrics_text,
+}
+
+
+# ---------- HTTP ----------
+class ApiHandler(BaseHTTPRequestHandler):
+    # One request per connection (HTTP/1.0), so a worker is never parked on an idle keep-alive socket
+    timeout = SOCKET_TIMEOUT
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _dispatch(self, method: str):
+        started = time.perf_counter()
+        url = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        path = url.path.rstrip("/") or "/"
+        # Unknown paths share one label, so probes cannot grow the metrics without bound
+        endpoint = f"{method} {path}" if (method, path) in ROUTES else "unknown"
+        try:
+            body = self._read_body()
+            route = ROUTES.get((method, path))
+            if route is None:
+                raise ApiError(404, f"No endpoint {method} {url.path}")
+            result = route(params, body)
+        except ApiError as e:
+            status, content_type, payload = e.status, "application/json", json.dumps({"error": str(e)}).encode("utf-8")
+        except Exception as e:
+            status, content_type = 500, "application/json"
+            payload = json.dumps({"error": f"{type(e).__name__}: {e}"}).encode("utf-8")
+        else:
+            status = 200
+            if isinstance(result, tuple):
+                content_type, payload = result
+            else:
+                content_type, payload = "application/json", json.dumps(result, default=str).encode("utf-8")
+        REQUESTS.inc(endpoint=endpoint, status=str(status))
+        REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
+        self._send(status, content_type, payload)
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY:
+            raise ApiError(413, "Request body too large")
+        return self.rfile.read(length) if length else b""
+
+    def _send(self, status: int, content_type: str, payload: bytes):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def make_server(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, workers: int = DEFAULT_WORKERS) -> PooledHTTPServer:
+    """Return a server bound to host:port (port 0 picks a free port); call serve_forever() to run it."""
+    return PooledHTTPServer((host, port), ApiHandler, workers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the pricing, manifest and comparison engines as a JSON API.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.workers)
+    metrics.start_exporter()
+    print(f"Serving on http://{args.host}:{server.server_address[1]} with {args.workers} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""Background jobs for long-running work in the Streamlit apps.
+
+Work is submitted to a process-wide pool instead of running inside the
+script, so the session's reruns stay responsive. Each session keeps its
+jobs in a JobRegistry stored in st.session_state; finished jobs keep
+their result until they are replaced or forgotten.
+
+Thread jobs get the Job as their first argument and use it to report
+progress and to notice cancellation. Process jobs (process=True) run on
+other cores; their function and arguments must be picklable and they
+report no intermediate progress. A cancelled job is reported as cancelled
+at once; a process job that already started runs to the end and its
+result is discarded.
+
+    jobs = background_jobs.registry(st.session_state)
+    job = jobs.submit("export", build_export, results)
+    background_jobs.show_progress(job)
+    if job.status == background_jobs.DONE:
+        data = job.result
+"""
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import streamlit as st
+
+import metrics
+
+THREAD_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+PROCESS_WORKERS = os.cpu_count() or 1
+
+# Finished jobs kept per session; the oldest are dropped first
+MAX_FINISHED = 20
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+STATE_KEY = "background_jobs"
+
+JOBS = metrics.counter("background_jobs_total", "Background jobs finished, by job name and final status", ["job", "status"])
+JOB_SECONDS = metrics.histogram("background_job_seconds", "Seconds from submission to finish of background jobs", ["job"])
+
+
+class JobCancelled(Exception):
+    """Raised inside a thread job by Job.check() once the job was cancelled."""
+
+
+# ---------- Pools ----------
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _pool(process: bool):
+    """The shared thread or process pool, created on first use."""
+    with _pools_lock:
+        if process not in _pools:
+            if process:
+                # spawn: forking a process that runs the Streamlit server threads is unsafe
+                _pools[process] = ProcessPoolExecutor(
+                    max_workers=PROCESS_WORKERS, mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                _pools[process] = ThreadPoolExecutor(max_workers=THREAD_WORKERS, thread_name_prefix="job")
+        return _pools[process]
+
+
+# ---------- Jobs ----------
+class Job:
+    """One submitted unit of work: its status, progress and, once finished, result or error."""
+
+    def __init__(self, name: str, label: str, key=None):
+        self.name = name
+        self.label = label
+        self.key = key
+        self.job_id = uuid.uuid4().hex[:12]
+        self.submitted = time.time()
+        self.finished = None
+        self.done = 0
+        self.total = None
+        self.message = ""
+        self._cancel = threading.Event()
+        self._future = None
+
+    # Called from the job
+    def report(self, done, total=None, message: str = "") -> None:
+        """Record progress (done of total units, with an optional message)."""
+        self.done = done
+        if total is not None:
+            self.total = total
+        self.message = message
+
+    def check(self) -> None:
+        """Raise JobCancelled if the job was cancelled; call between units of work."""
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    # Called from the app
+    @property
+    def status(self) -> str:
+        # A cancelled job that is still winding down is reported as cancelled; its result is discarded
+        if self._cancel.is_set():
+            return CANCELLED
+        if not self._future.done():
+            return RUNNING if self._future.running() else QUEUED
+        return FAILED if self._future.exception() is not None else DONE
+
+    @property
+    def result(self):
+        """The return value once the job is done, else None."""
+        return self._future.result() if self.status == DONE else None
+
+    @property
+    def error(self):
+        """The exception the job raised once it failed, else None."""
+        return self._future.exception() if self.status == FAILED else None
+
+    @property
+    def progress(self) -> float:
+        """Fraction complete in [0, 1]; 0 while the total is unknown."""
+        if self.status == DONE:
+            return 1.0
+        return min(1.0, self.done / self.total) if self.total else 0.0
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.time()) - self.submitted
+
+    def cancel(self) -> None:
+        """Ask the job to stop; a queued job never starts, a running thread job stops at its next check()."""
+        self._cancel.set()
+        if self._future is not None:
+            self._future.cancel()
+
+    def wait(self, timeout: float = None):
+        """Block until the job finishes and return its result (raises its error)."""
+        return self._future.result(timeout)
+
+    def _finish(self, future) -> None:
+        self.finished = time.time()
+        JOBS.inc(job=self.name, status=self.status)
+        JOB_SECONDS.observe(self.finished - self.submitted, job=self.name)
+
+
+def _run(job: Job, fn, args, kwargs):
+    job.check()
+    return fn(job, *args, **kwargs)
+
+
+class JobRegistry:
+    """The jobs of one session, by name; submitting under a name replaces (and cancels) the previous job."""
+
+    def __init__(self):
+        self._jobs = {}
+
+    def submit(self, name: str, fn, *args, label: str = None, key=None, process: bool = False, **kwargs) -> Job:
+        """Start fn in the background and register it under name.
+
+        Thread jobs are called as fn(job, *args, **kwargs); process jobs as
+        fn(*args, **kwargs). key identifies the inputs (see current()).
+        """
+        self.cancel(name)
+        job = Job(name, label or name, key)
+        if process:
+            job._future = _pool(True).submit(fn, *args, **kwargs)
+        else:
+            job._future = _pool(False).submit(_run, job, fn, args, kwargs)
+        job._future.add_done_callback(job._finish)
+        self._jobs[name] = job
+        self._prune()
+        return job
+
+    def get(self, name: str):
+        """The job registered under name, or None."""
+        return self._jobs.get(name)
+
+    def current(self, name: str, key):
+        """The job registered under name if it was submitted for the same key, else None."""
+        job = self._jobs.get(name)
+        return job if job is not None and job.key == key else None
+
+    def poll(self) -> dict:
+        """{name: status} of every registered job."""
+        return {name: job.status for name, job in self._jobs.items()}
+
+    def wait(self, timeout: float = None) -> bool:
+        """Block until every registered job has finished; True if any was still going."""
+        pending = [job for job in self._jobs.values() if job.status not in FINISHED]
+        for job in pending:
+            try:
+                job.wait(timeout)
+            except Exception:
+                pass
+        return bool(pending)
+
+    def cancel(self, name: str) -> None:
+        job = self._jobs.get(name)
+        if job is not None and job.status not in FINISHED:
+            job.cancel()
+
+    def forget(self, name: str) -> None:
+        """Cancel the job if it is still going and drop it (and its result) from the registry."""
+        self.cancel(name)
+        self._jobs.pop(name, None)
+
+    def _prune(self) -> None:
+        finished = sorted(
+            (job.finished, name) for name, job in self._jobs.items() if job.status in FINISHED and job.finished
+        )
+        for _, name in finished[: max(0, len(finished) - MAX_FINISHED)]:
+            del self._jobs[name]
+
+
+def registry(state) -> JobRegistry:
+    """The JobRegistry of a session (pass st.session_state), created on first use."""
+    if STATE_KEY not in state:
+        state[STATE_KEY] = JobRegistry()
+    return state[STATE_KEY]
+
+
+# ---------- UI ----------
+def show_progress(job: Job, interval: float = 1.0, cancel_label: str = "Cancel", details=None) -> None:
+    """Show a job's progress bar and a cancel button, refreshing every interval seconds while it runs.
+
+    details, if given, is called under the bar on every refresh (e.g. to
+    show partial results). The refresh is a fragment rerun; once the job
+    has finished the whole app reruns so the caller can show the result.
+    Finished jobs show their error, or nothing.
+    """
+    running = job.status not in FINISHED
+
+    @st.fragment(run_every=interval if running else None)
+    def _progress():
+        status = job.status
+        if status in FINISHED:
+            if running:
+                # Finished since the last full run: rerun the app so it can render the result
+                st.rerun()
+            if status == FAILED:
+                st.error(f"{job.label} failed: {job.error}")
+            elif status == CANCELLED:
+                st.info(f"{job.label} was cancelled.")
+            return
+        text = job.message or f"{job.label}: {status} ({job.elapsed:.0f} s)"
+        st.progress(job.progress, text=text)
+        if st.button(cancel_label, key=f"_job_cancel_{job.job_id}"):
+            job.cancel()
+            st.rerun()
+        if details is not None:
+            details()
+
+    _progress()
@@ -0,0 +1,384 @@
+"""Concurrent-session load test for the Streamlit apps.
+
+Each simulated user is an in-process streamlit.testing.v1.AppTest session
+replaying a scripted interaction sequence; users run concurrently in
+threads. Every rerun is timed and the report gives, per app, p50 / p95
+rerun latency, throughput (reruns per second of wall time) and peak
+traced memory.
+
+    python benchmarks/load_test.py                          # every app, 10 users
+    python benchmarks/load_test.py --apps pricing indices --users 50
+    python benchmarks/load_test.py --save-baseline          # write benchmarks/baseline.json
+    python benchmarks/load_test.py --max-regression 25      # exit 1 if any metric is >25% worse than the baseline
+
+Pass --email / --password to drive the pricing login form; otherwise the
+session is authenticated through session state. Needs a Streamlit release
+whose AppTest supports file_uploader.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import streamlit
+from streamlit.testing.v1 import AppTest
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+
+# Seconds a single rerun may take before AppTest gives up
+RUN_TIMEOUT = 120
+
+# Reported metrics compared against the baseline (higher is worse unless listed here)
+HIGHER_IS_BETTER = {"throughput"}
+
+
+class ScenarioError(Exception):
+    """A rerun raised inside the app under test."""
+
+
+# ---------- Sessions ----------
+class Session:
+    """One simulated user: an AppTest plus the timings of its reruns."""
+
+    def __init__(self, script: str, timings: list):
+        self.at = AppTest.from_file(script, default_timeout=RUN_TIMEOUT)
+        self.timings = timings
+
+    def run(self, label: str, action=None):
+        """Apply action(at) (widget interactions) and time the rerun it triggers.
+
+        Background jobs the rerun started are waited for and their results
+        rendered, so the timing covers the work itself.
+        """
+        if action is not None:
+            action(self.at)
+        start = time.perf_counter()
+        while True:
+            run_started = time.time()
+            self.at.run()
+            if "background_jobs" not in self.at.session_state:
+                break
+            # A job still running, or one that finished during the run (e.g. a shared-cache hit),
+            # may not have had its result rendered yet
+            jobs = self.at.session_state["background_jobs"]
+            recent = [jobs.get(name) for name in jobs.poll()]
+            if not any(job.finished is None or job.finished >= run_started for job in recent):
+                break
+            jobs.wait()
+        self.timings.append(time.perf_counter() - start)
+        if self.at.exception:
+            raise ScenarioError(f"{label}: {self.at.exception[0].message}")
+        return self.at
+
+
+def _labelled(elements, label: str):
+    """Return the widget with the given label."""
+    for element in elements:
+        if element.label == label:
+            return element
+    raise ScenarioError(f"No widget labelled {label!r}")
+
+
+def _csv_bytes(df: pd.DataFrame) -> bytes:
+    return df.to_csv(index=False).encode("utf-8")
+
+
+# ---------- Fixtures ----------
+WELLS = [f"{row}{col:02d}" for col in range(1, 13) for row in "ABCDEFGH"]
+
+
+def build_fixtures() -> dict:
+    """Synthetic uploads shared by every session (built once, before timing starts)."""
+    rng = np.random.default_rng(0)
+    manifest = pd.DataFrame({"Sample_name": [f"S{i:03d}" for i in range(1, 97)], "Well": WELLS})
+    indices = pd.DataFrame({
+        "Well": WELLS,
+        "i7": ["".join(rng.choice(list("ACGT"), 8)) for _ in WELLS],
+        "i5": ["".join(rng.choice(list("ACGT"), 8)) for _ in WELLS],
+    })
+
+    left = pd.DataFrame(rng.integers(0, 1000, size=(2000, 8)), columns=[f"col{i}" for i in range(8)])
+    right = left.copy()
+    changed = rng.random(right.shape) < 0.01
+    right = right.mask(changed, right + 1)
+
+    panel = pd.read_csv(REPO_DIR / "data" / "Olink_Flex.csv", dtype=str)
+    custom = pd.DataFrame({"UniProt ID": list(panel["UniProt ID"].str.lower()) + ["P05231-2", "IL6", "TNF"]})
+    return {
+        "manifest": ("manifest.csv", _csv_bytes(manifest), "text/csv"),
+        "indices": ("index_plate.csv", _csv_bytes(indices), "text/csv"),
+        "file1": ("run_a.csv", _csv_bytes(left), "text/csv"),
+        "file2": ("run_b.csv", _csv_bytes(right), "text/csv"),
+        "custom": ("targets.csv", _csv_bytes(custom), "text/csv"),
+    }
+
+
+# ---------- Scenarios ----------
+def pricing_scenario(session: Session, fixtures: dict, options) -> None:
+    """Log in, pick two combinable panels, enter a sample count, round it and switch account."""
+    at = session.at
+    if options.email:
+        session.run("open login")
+        session.run("log in", lambda at: (
+            at.text_input[0].input(options.email), at.text_input[1].input(options.password)))
+    else:
+        at.session_state["authenticated"] = True
+        at.session_state["user_name"] = "load test"
+        at.session_state["last_active"] = time.time()
+        session.run("open calculator")
+    session.run("select panel", lambda at: at.checkbox[0].check())
+    session.run("select panel", lambda at: at.checkbox[1].check())
+    session.run("enter samples", lambda at: _labelled(at.number_input, "Enter the number of samples:").set_value(300))
+    session.run("round up", lambda at: _labelled(at.radio, "Choose a valid sample count:").set_value(
+        _labelled(at.radio, "Choose a valid sample count:").options[-1]))
+    session.run("switch account", lambda at: _labelled(at.radio, "Select Account Type:").set_value("External Academic"))
+
+
+def indices_scenario(session: Session, fixtures: dict, options) -> None:
+    """Upload a manifest and an index plate, then work the 96-well selection grid."""
+    session.run("open")
+    session.run("upload manifest", lambda at: at.file_uploader[0].set_value([fixtures["manifest"]]))
+    session.run("enter batch", lambda at: at.text_input[0].input("BATCH-01"))
+    session.run("upload indices", lambda at: at.file_uploader[1].set_value([fixtures["indices"]]))
+    name = fixtures["indices"][0]
+    session.run("select all", lambda at: at.button(key=f"select_all_{name}").click())
+    for well in ("A01", "B01", "H12"):
+        session.run("toggle well", lambda at: at.checkbox(key=f"grid_{name}_{well}").uncheck())
+    session.run("pick columns", lambda at: at.multiselect(key=f"multi_column_select_{name}").set_value([3, 4]))
+    session.run("toggle columns", lambda at: at.button(key=f"toggle_selected_columns_{name}").click())
+    session.run("check duplicates", lambda at: _labelled(at.button, "Check for Duplicates").click())
+
+
+def files_scenario(session: Session, fixtures: dict, options) -> None:
+    """Upload two versions of a CSV and build the highlighted difference report."""
+    session.run("open")
+    session.run("upload first", lambda at: at.file_uploader[0].set_value(fixtures["file1"]))
+    session.run("upload second", lambda at: at.file_uploader[1].set_value(fixtures["file2"]))
+
+
+def panels_scenario(session: Session, fixtures: dict, options) -> None:
+    """Compare a custom list against every preloaded panel, exact then normalized, and export."""
+    session.run("open")
+    session.run("select all panels", lambda at: _labelled(at.checkbox, "Select all preloaded files").check())
+    session.run("upload custom", lambda at: at.file_uploader[1].set_value(fixtures["custom"]))
+    session.run("compare", lambda at: _labelled(at.button, "Compare Lists").click())
+    session.run("normalize", lambda at: at.checkbox[1].check())
+    session.run("compare normalized", lambda at: _labelled(at.button, "Compare Lists").click())
+    session.run("prepare export", lambda at: _labelled(at.button, "Prepare export of all results").click())
+
+
+# name -> (script, scenario)
+SCENARIOS = {
+    "pricing": ("Price_calculator.py", pricing_scenario),
+    "indices": ("AddIndicesToSampleList.py", indices_scenario),
+    "files": ("compareFiles.py", files_scenario),
+    "panels": ("compareProteinPanels.py", panels_scenario),
+}
+
+
+# ---------- Runner ----------
+def share_runtime() -> None:
+    """Let concurrent AppTest sessions share one runtime.
+
+    AppTest installs a fresh mock Runtime singleton for every run and clears
+    it afterwards, so concurrent sessions pull it out from under each other
+    (uploads and cached data vanish mid-run). Install one shared mock, as
+    the sessions of a real server share one Runtime, and send each run's
+    own assignment to a throw-away subclass instead.
+    """
+    from unittest.mock import MagicMock
+
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    from streamlit.testing.v1 import app_test
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = app_test.MediaFileManager(app_test.MemoryMediaFileStorage("/mock/media"))
+    runtime.dataframe_source_mgr = app_test.DataframeSourceManager()
+    runtime.cache_storage_manager = app_test.MemoryCacheStorageManager()
+    registry = app_test.BidiComponentManager()
+    registry.discover_and_register_components(start_file_watching=False)
+    runtime.bidi_component_registry = registry
+    Runtime._instance = runtime
+
+    class SessionRuntime(Runtime):
+        _instance = None
+
+    app_test.Runtime = SessionRuntime
+    # Each run patches this option and restores the previous value on exit; keep it on throughout
+    config.set_option("global.appTest", True)
+
+
+def share_script_cache():
+    """Let every session use one script cache, as the sessions of a real server do, and return it.
+
+    AppTest otherwise compiles the script again for every run, and
+    concurrent compiles (ast.parse while adding magic) intermittently fail
+    with SystemError or leave widgets missing. Scripts are compiled into
+    the shared cache before the users start (see run_app).
+    """
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test, local_script_runner
+
+    script_cache = ScriptCache()
+    app_test.ScriptCache = lambda: script_cache
+    local_script_runner.ScriptCache = lambda: script_cache
+    return script_cache
+
+
+def mirror_repo() -> Path:
+    """Return a temporary mirror of the repo (symlinks) without pages/.
+
+    Streamlit would otherwise pick up pages/ as extra pages of the app under
+    test, and pages/compareProteinPanels.py clashes with the root app.
+    """
+    mirror = Path(tempfile.mkdtemp(prefix="load_test_"))
+    for entry in REPO_DIR.iterdir():
+        if entry.name not in {"pages", ".git", "benchmarks", "__pycache__"}:
+            (mirror / entry.name).symlink_to(entry, target_is_directory=entry.is_dir())
+    return mirror
+
+
+def run_app(name: str, users: int, iterations: int, fixtures: dict, options) -> dict:
+    """Replay one app's scenario for users concurrent sessions, iterations times each."""
+    script, scenario = SCENARIOS[name]
+    timings = []
+    errors = []
+    lock = threading.Lock()
+    # Compiled once, serially, before the concurrent sessions start
+    options.script_cache.get_bytecode(str(options.app_dir / script))
+
+    def user(_):
+        for _ in range(iterations):
+            local = []
+            try:
+                scenario(Session(str(options.app_dir / script), local), fixtures, options)
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+            with lock:
+                timings.extend(local)
+
+    if options.memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        list(pool.map(user, range(users)))
+    wall = time.perf_counter() - start
+    peak = 0
+    if options.memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    latencies = np.array(timings) * 1000
+    return {
+        "script": script,
+        "users": users,
+        "sessions": users * iterations,
+        "reruns": len(timings),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "p50_ms": float(np.percentile(latencies, 50)) if len(latencies) else None,
+        "p95_ms": float(np.percentile(latencies, 95)) if len(latencies) else None,
+        "max_ms": float(latencies.max()) if len(latencies) else None,
+        "throughput": len(timings) / wall if wall else None,
+        "peak_mib": peak / 2 ** 20 if options.memory else None,
+        "wall_s": wall,
+    }
+
+
+def _fmt(value, digits=1):
+    return "-" if value is None else f"{value:.{digits}f}"
+
+
+def report(results: dict, baseline: dict = None) -> list:
+    """Print the results table (with % change vs. baseline); return the regressed (app, metric) pairs."""
+    metrics = ["p50_ms", "p95_ms", "throughput", "peak_mib"]
+    header = f"{'app':<10}{'users':>6}{'reruns':>8}{'errors':>7}{'p50 ms':>10}{'p95 ms':>10}{'reruns/s':>10}{'peak MiB':>10}"
+    print(header)
+    print("-" * len(header))
+    changes = []
+    for name, r in results.items():
+        print(f"{name:<10}{r['users']:>6}{r['reruns']:>8}{r['errors']:>7}{_fmt(r['p50_ms']):>10}"
+              f"{_fmt(r['p95_ms']):>10}{_fmt(r['throughput'], 2):>10}{_fmt(r['peak_mib']):>10}")
+        if r["first_error"]:
+            print(f"{'':<10}first error: {r['first_error']}")
+        previous = (baseline or {}).get("apps", {}).get(name)
+        if not previous:
+            continue
+        deltas = []
+        for metric in metrics:
+            old, new = previous.get(metric), r.get(metric)
+            if old and new is not None:
+                change = (new - old) / old * 100
+                worse = -change if metric in HIGHER_IS_BETTER else change
+                changes.append((name, metric, worse))
+                deltas.append(f"{metric} {change:+.0f}%")
+        if deltas:
+            print(f"{'':<10}vs baseline: {', '.join(deltas)}")
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay scripted sessions concurrently against the Streamlit apps.")
+    parser.add_argument("--apps", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--users", type=int, default=10, help="concurrent sessions per app")
+    parser.add_argument("--iterations", type=int, default=1, help="scenario repetitions per user")
+    parser.add_argument("--email", help="log in to the pricing app with these credentials")
+    parser.add_argument("--password", default="")
+    parser.add_argument("--no-memory", dest="memory", action="store_false",
+                        help="skip tracemalloc (it slows the apps down noticeably)")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="write these results as the new baseline")
+    parser.add_argument("--max-regression", type=float, default=None,
+                        help="exit 1 if any metric is this many percent worse than the baseline")
+    options = parser.parse_args()
+
+    # Apps read some files relative to the working directory and import the helpers as top-level modules
+    options.app_dir = mirror_repo()
+    os.chdir(options.app_dir)
+    sys.path.insert(0, str(options.app_dir))
+    share_runtime()
+    options.script_cache = share_script_cache()
+    fixtures = build_fixtures()
+
+    baseline = json.loads(options.baseline.read_text()) if options.baseline.exists() else None
+    results = {}
+    for name in options.apps:
+        print(f"Running {name} ({options.users} users x {options.iterations})...", file=sys.stderr)
+        results[name] = run_app(name, options.users, options.iterations, fixtures, options)
+
+    changes = report(results, baseline)
+
+    if options.save_baseline:
+        options.baseline.write_text(json.dumps({
+            "meta": {
+                "python": platform.python_version(),
+                "streamlit": streamlit.__version__,
+                "users": options.users,
+                "iterations": options.iterations,
+                "memory": options.memory,
+                "saved": time.strftime("%Y-%m-%d %H:%M:%S"),
+            },
+            "apps": {**(baseline or {}).get("apps", {}), **results},
+        }, indent=2))
+        print(f"Baseline written to {options.baseline}")
+
+    if options.max_regression is not None:
+        regressed = [(n, m, w) for n, m, w in changes if w > options.max_regression]
+        for name, metric, worse in regressed:
+            print(f"REGRESSION {name} {metric}: {worse:.0f}% worse than baseline", file=sys.stderr)
+        sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
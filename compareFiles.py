@@ -2,8 +2,19 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 from io import BytesIO
+from itertools import zip_longest
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.comments import Comment
 from openpyxl.styles import PatternFill
+from openpyxl.utils import get_column_letter
+
+import background_jobs
+import form_templates
+import metrics
+
+# Columns of the workbook difference table
+WORKBOOK_DIFF_COLUMNS = ["Sheet", "Cell", "File 1", "File 2"]
 
 def highlight_differences(row, base_columns):
     """Highlight differences in the row for the specified base columns."""
@@ -53,14 +64,180 @@ def save_styled_excel(dataframe, base_columns):
         buffer.seek(0)
         return buffer.read()
 
+@metrics.timed(metrics.COMPARISONS, metrics.COMPARISON_SECONDS, kind="files")
+def build_comparison(job, df1, df2):
+    """Return (differing rows, highlighted Excel bytes or None); runs as a background job."""
+    job.report(0, 2, "Comparing rows...")
+
+    # Align both DataFrames by index and columns
+    df1 = df1.sort_index().reset_index(drop=True)
+    df2 = df2.sort_index().reset_index(drop=True)
+
+    # Add suffixes to differentiate file1 and file2 data
+    df1 = df1.add_suffix('_file1')
+    df2 = df2.add_suffix('_file2')
+
+    # Combine the two DataFrames for comparison
+    combined = pd.concat([df1, df2], axis=1)
+
+    # Identify columns without suffixes for comparison
+    base_columns = [col.replace('_file1', '') for col in df1.columns if '_file1' in col]
+
+    # Identify rows with differences
+    diff_mask = (df1.values != df2.values)  # Compare values directly
+    differing_rows = combined[np.any(diff_mask, axis=1)]
+    if differing_rows.empty:
+        return differing_rows, None
+
+    job.check()
+    job.report(1, 2, "Building highlighted Excel report...")
+    # Save the differing rows to an Excel file with highlights
+    return differing_rows, save_styled_excel(differing_rows, base_columns)
+
+def sheet_names(data: bytes) -> list:
+    """Sheet names of a workbook, read without loading any cells."""
+    wb = form_templates.open_workbook(data)
+    try:
+        return wb.sheetnames
+    finally:
+        wb.close()
+
+def default_sheet_pairs(names1: list, names2: list) -> dict:
+    """{sheet in file 1: sheet in file 2} for the sheets both workbooks have by name."""
+    return {name: name for name in names1 if name in names2}
+
+def diff_sheets(ws1, ws2, sheet: str, out=None, fill=None, check=None):
+    """Stream two read-only worksheets row by row and yield (sheet, cell, value 1, value 2) for each differing cell.
+
+    If out (a write-only worksheet) is given, file 2's rows are copied into
+    it as they are read, differing cells highlighted with fill and
+    annotated with the file 1 value, so every cell keeps its address.
+    """
+    rows = zip_longest(ws1.iter_rows(values_only=True), ws2.iter_rows(values_only=True), fillvalue=())
+    for row_number, (row1, row2) in enumerate(rows, start=1):
+        if check is not None and row_number % 1000 == 0:
+            check()
+        if row1 == row2:
+            if out is not None:
+                out.append(row2)
+            continue
+        line = []
+        for col_number, (value1, value2) in enumerate(zip_longest(row1, row2), start=1):
+            if value1 == value2:
+                line.append(value2)
+                continue
+            yield sheet, f"{get_column_letter(col_number)}{row_number}", value1, value2
+            if out is not None:
+                cell = WriteOnlyCell(out, value=value2)
+                cell.fill = fill
+                cell.comment = Comment(f"File 1: {'' if value1 is None else value1}", "compareFiles")
+                line.append(cell)
+        if out is not None:
+            out.append(line)
+
+@metrics.timed(metrics.COMPARISONS, metrics.COMPARISON_SECONDS, kind="workbooks")
+def build_workbook_comparison(job, data1: bytes, data2: bytes, pairs: dict):
+    """Return (differences, highlighted Excel bytes or None) for paired sheets of two workbooks.
+
+    Both workbooks are streamed in openpyxl's read-only mode, one row of each
+    at a time; only the differences are kept. The report has file 2's
+    paired sheets with differing cells highlighted at their original
+    addresses, plus a Differences sheet. Runs as a background job.
+    """
+    wb1 = form_templates.open_workbook(data1)
+    wb2 = form_templates.open_workbook(data2)
+    report = Workbook(write_only=True)
+    yellow_fill = PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid")
+    differences = []
+    try:
+        for i, (sheet1, sheet2) in enumerate(pairs.items()):
+            job.check()
+            job.report(i, len(pairs), f"Comparing sheet '{sheet1}' ({i + 1} of {len(pairs)})...")
+            out = report.create_sheet(title=sheet2[:31])
+            label = sheet1 if sheet1 == sheet2 else f"{sheet1} / {sheet2}"
+            differences.extend(diff_sheets(wb1[sheet1], wb2[sheet2], label, out, yellow_fill, job.check))
+    finally:
+        wb1.close()
+        wb2.close()
+
+    differences = pd.DataFrame(differences, columns=WORKBOOK_DIFF_COLUMNS)
+    job.report(len(pairs), len(pairs), "Writing highlighted workbook...")
+    summary = report.create_sheet(title="Differences")
+    summary.append(WORKBOOK_DIFF_COLUMNS)
+    for row in differences.itertuples(index=False):
+        summary.append([None if pd.isna(v) else v for v in row])
+    # Saved even when there is nothing to show, so the write-only sheets' temp files are closed
+    with BytesIO() as buffer:
+        report.save(buffer)
+        return differences, (buffer.getvalue() if not differences.empty else None)
+
+def compare_workbooks(file1, file2):
+    """Workbook mode: pair the sheets, diff them in the background and offer the highlighted report."""
+    data1, data2 = file1.getvalue(), file2.getvalue()
+    try:
+        names1, names2 = sheet_names(data1), sheet_names(data2)
+    except Exception as e:
+        st.error(f"Could not read the workbooks: {e}")
+        return
+
+    # Pair each sheet of the first workbook with a sheet of the second (same name by default)
+    st.write("Sheets to compare:")
+    defaults = default_sheet_pairs(names1, names2)
+    skip = "(skip)"
+    pairs = {}
+    for name in names1:
+        options = [skip] + names2
+        choice = st.selectbox(
+            f"'{name}' in {file1.name} against:", options,
+            index=options.index(defaults.get(name, skip)), key=f"sheet_pair_{name}",
+        )
+        if choice != skip:
+            pairs[name] = choice
+    if not pairs:
+        st.info("Choose at least one pair of sheets to compare.")
+        return
+
+    jobs = background_jobs.registry(st.session_state)
+    key = (file1.file_id, file2.file_id, tuple(pairs.items()))
+    job = jobs.current("compare_workbooks", key)
+    if job is None:
+        job = jobs.submit("compare_workbooks", build_workbook_comparison, data1, data2, pairs,
+                          label="Comparing workbooks", key=key)
+    background_jobs.show_progress(job)
+    if job.status != background_jobs.DONE:
+        return
+    differences, excel_data = job.result
+
+    if differences.empty:
+        st.success("The selected sheets are identical!")
+        return
+    st.warning(f"{len(differences)} differing cell(s) found.")
+    st.dataframe(differences.groupby("Sheet").size().rename("Differences"), use_container_width=True)
+    st.dataframe(differences.astype({"File 1": "string", "File 2": "string"}), hide_index=True, use_container_width=True)
+    st.download_button(
+        label="Download Highlighted Differences (Excel)",
+        data=excel_data,
+        file_name=f"{file1.name.rsplit('.', 1)[0]}_vs_{file2.name.rsplit('.', 1)[0]}.xlsx",
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    )
+
 def main():
-    st.title("CSV File Comparison Tool")
+    metrics.app_run("compareFiles")
+    st.title("CSV / Excel File Comparison Tool")
 
     # Upload the first and second files
-    file1 = st.file_uploader("Upload the first CSV file", type="csv", key="file1")
-    file2 = st.file_uploader("Upload the second CSV file", type="csv", key="file2")
+    file1 = st.file_uploader("Upload the first CSV or Excel file", type=["csv", "xlsx"], key="file1")
+    file2 = st.file_uploader("Upload the second CSV or Excel file", type=["csv", "xlsx"], key="file2")
 
     if file1 and file2:
+        kinds = {f.name.rsplit(".", 1)[-1].lower() for f in (file1, file2)}
+        if kinds == {"xlsx"}:
+            compare_workbooks(file1, file2)
+            return
+        if "xlsx" in kinds:
+            st.error("Upload two CSV files or two Excel workbooks.")
+            return
+
         # Read the uploaded CSV files
         df1 = pd.read_csv(file1)
         df2 = pd.read_csv(file2)
@@ -70,32 +247,22 @@ def main():
             st.error("The two files have different column structures. Please upload files with matching columns.")
             return
 
-        # Align both DataFrames by index and columns
-        df1 = df1.sort_index().reset_index(drop=True)
-        df2 = df2.sort_index().reset_index(drop=True)
-
-        # Add suffixes to differentiate file1 and file2 data
-        df1 = df1.add_suffix('_file1')
-        df2 = df2.add_suffix('_file2')
-
-        # Combine the two DataFrames for comparison
-        combined = pd.concat([df1, df2], axis=1)
-
-        # Identify columns without suffixes for comparison
-        base_columns = [col.replace('_file1', '') for col in df1.columns if '_file1' in col]
-
-        # Identify rows with differences
-        diff_mask = (df1.values != df2.values)  # Compare values directly
-        differing_rows = combined[np.any(diff_mask, axis=1)]
+        # Diff and Excel report are built in the background; the page polls for the result
+        jobs = background_jobs.registry(st.session_state)
+        key = (file1.file_id, file2.file_id)
+        job = jobs.current("compare_files", key)
+        if job is None:
+            job = jobs.submit("compare_files", build_comparison, df1, df2, label="Comparing files", key=key)
+        background_jobs.show_progress(job)
+        if job.status != background_jobs.DONE:
+            return
+        differing_rows, excel_data = job.result
 
         if differing_rows.empty:
             st.success("The two files are identical!")
         else:
             st.warning("Differences found between the files.")
 
-            # Highlight differences
-            styled_diff = differing_rows.style.apply(lambda row: highlight_differences(row, base_columns), axis=1)
-
             # Display differing rows with highlights
             st.write("Rows with differences:")
             st.dataframe(differing_rows, use_container_width=True)
@@ -105,9 +272,6 @@ def main():
             filename2 = file2.name.split('.')[0]
             output_filename = f"{filename1}_vs_{filename2}.xlsx"
 
-            # Save the differing rows to an Excel file with highlights
-            excel_data = save_styled_excel(differing_rows, base_columns)
-
             # Provide a download link
             st.download_button(
                 label="Download Highlighted Differences (Excel)",
@@ -1,39 +1,252 @@
-import os
-#from pathlib import Path
-from io import StringIO
-import pandas as pd
-#import streamlit as st
-
-#-----------temp
-
-
-import streamlit as st, hashlib, sys, os
 from pathlib import Path
-print (hello)
-APP_FILE = Path(__file__)
-APP_HASH = hashlib.md5(APP_FILE.read_bytes()).hexdigest()[:10]
 
-st.caption(f"Build marker: {APP_FILE.name} @ {APP_HASH}")
-st.caption(f"Streamlit version: {st.__version__}")
-st.caption(f"Running from: {APP_FILE.resolve()}")
-st.caption(f"Working dir: {Path.cwd()}")
-st.caption(f"Python: {sys.version.split()[0]}")
-#-----------end temp
+import pandas as pd
+import altair as alt
+import streamlit as st
 
-# ---------- Helpers ----------
-def find_common_items(original_df: pd.DataFrame, custom_df: pd.DataFrame, key_column: str) -> pd.DataFrame:
-    """Return rows from original_df whose key_column appears in custom_df[key_column]."""
-    # normalize to string to reduce false negatives due to type mismatch
-    left = original_df.copy()
-    right = custom_df.copy()
-    left[key_column] = left[key_column].astype(str)
-    right[key_column] = right[key_column].astype(str)
-    return left[left[key_column].isin(right[key_column])]
+import background_jobs
+import data_access
+import metrics
+import panel_catalog
+import panel_compare
+import protein_ids
+import panel_recommender
+import result_export
+import shared_cache
 
+# ---------- Helpers ----------
 def df_to_csv_bytes(df: pd.DataFrame) -> bytes:
     """Return a UTF-8 CSV as bytes for st.download_button."""
     return df.to_csv(index=False).encode("utf-8")
 
+@st.cache_data(show_spinner="Computing overlap across all panels...")
+def cached_panel_overlap(data_dir: str, signature: tuple) -> pd.DataFrame:
+    """Pairwise panel overlap table; signature (names + mtimes) invalidates the cache."""
+    return panel_catalog.panel_overlap_table(Path(data_dir))
+
+@st.cache_data(show_spinner="Building identifier alias table...")
+def cached_alias_table(data_dir: str, signature: tuple) -> pd.Series:
+    """Alias -> accession table from the preloaded panels; signature invalidates the cache."""
+    return protein_ids.build_alias_table(Path(data_dir))
+
+@st.cache_data(show_spinner="Indexing preloaded panels...")
+def cached_panel_key_sets(data_dir: str, signature: tuple) -> dict:
+    """Per-panel sets of normalized identifiers; signature invalidates the cache."""
+    aliases = cached_alias_table(data_dir, signature)
+    return panel_recommender.panel_key_sets(Path(data_dir), aliases)
+
+@st.cache_data
+def cached_panel_prices(account: str) -> dict:
+    """Price of one batch of each preloaded panel for the given account type."""
+    return panel_recommender.load_panel_prices(account)
+
+def render_panel_overlap(data_dir: Path) -> None:
+    """Heatmap and download of intersection sizes / Jaccard indices for every preloaded panel."""
+    st.subheader("Panel Overlap")
+    signature = panel_catalog.catalog_signature(data_dir)
+    if not signature:
+        st.info("No preloaded panels found.")
+        return
+
+    overlap_df = cached_panel_overlap(str(data_dir), signature)
+    metric = st.radio("Colour by:", ["Jaccard", "Intersection"], horizontal=True)
+
+    heatmap = (
+        alt.Chart(overlap_df)
+        .mark_rect()
+        .encode(
+            x=alt.X("Panel B:N", title=None),
+            y=alt.Y("Panel A:N", title=None),
+            color=alt.Color(f"{metric}:Q", scale=alt.Scale(scheme="viridis")),
+            tooltip=["Panel A", "Panel B", "Size A", "Size B", "Intersection", "Jaccard"],
+        )
+        .properties(height=700)
+    )
+    st.altair_chart(heatmap, use_container_width=True)
+
+    st.dataframe(
+        overlap_df.pivot(index="Panel A", columns="Panel B", values=metric),
+        use_container_width=True,
+    )
+    st.download_button(
+        "Download overlap table",
+        data=df_to_csv_bytes(overlap_df),
+        file_name="panel_overlap.csv",
+        mime="text/csv",
+    )
+
+def render_panel_recommender(data_dir: Path) -> None:
+    """Rank the combinations of preloaded panels that best cover an uploaded target list."""
+    st.subheader("Panel Recommender")
+    target_file = st.file_uploader("Upload target protein list (CSV)", type=["csv"], key="recommend_file")
+    if not target_file:
+        st.info("Upload a CSV with the target proteins to get panel recommendations.")
+        return
+
+    try:
+        target_df = pd.read_csv(target_file, dtype=data_access.PANEL_DTYPES)
+    except Exception as e:
+        st.error(f"Could not read target CSV: {e}")
+        return
+
+    target_column = st.selectbox("Column holding the protein identifiers:", list(target_df.columns))
+    objective = st.radio("Optimise for:", ["Fewest panels", "Lowest cost"], horizontal=True)
+    account = None
+    if objective == "Lowest cost":
+        account = st.radio(
+            "Account type for prices:", ["Internal", "External Academic", "External Commercial"], horizontal=True
+        )
+        st.caption("Panels without a price in olink_cost_files (e.g. SomaScan) are not considered.")
+    exact = st.checkbox("Exhaustive search when few panels are candidates", value=True)
+    max_panels = st.number_input("Maximum panels per combination (exhaustive search):", min_value=1, max_value=6, value=3)
+
+    signature = panel_catalog.catalog_signature(data_dir)
+    aliases = cached_alias_table(str(data_dir), signature)
+    key_sets = cached_panel_key_sets(str(data_dir), signature)
+    prices = cached_panel_prices(account) if account else None
+
+    ranking, uncovered = panel_recommender.recommend_panels(
+        target_df[target_column], key_sets, aliases, prices=prices, max_panels=int(max_panels), exact=exact
+    )
+    if ranking.empty:
+        st.info("None of the target proteins are measured by the preloaded panels.")
+        return
+
+    st.dataframe(ranking, use_container_width=True)
+    st.download_button(
+        "Download recommendations",
+        data=ranking.to_csv().encode("utf-8"),
+        file_name="panel_recommendations.csv",
+        mime="text/csv",
+    )
+    if uncovered:
+        st.warning(f"{len(uncovered)} target(s) are not measured by any candidate panel:")
+        st.code("\n".join(uncovered))
+
+def coverage_in_background(job, lists: list, sources: list, key_column: str, aliases, cache_parts) -> tuple:
+    """panel_compare.coverage_matrix as a background job, served from the shared cache when already computed."""
+    job.report(0, 1, f"Matching {len(lists)} list(s) against {len(sources)} panel(s)...")
+    return shared_cache.default().get_or_compute(
+        "coverage", cache_parts, lambda: panel_compare.coverage_matrix(lists, sources, key_column, aliases)
+    )
+
+def build_coverage_export_in_background(job, coverage: pd.DataFrame, details: pd.DataFrame, fmt: str) -> bytes:
+    """result_export.coverage_export_bytes as a background job."""
+    job.report(0, 1, f"Building {fmt} export of {len(details)} matched item(s)...")
+    return result_export.coverage_export_bytes(coverage, details, fmt)
+
+def render_batch_coverage(data_dir: Path) -> None:
+    """List x panel coverage of many uploaded target lists at once, with an export of the matrix and matches."""
+    st.subheader("Batch Coverage")
+    panel_names = panel_catalog.list_panels(data_dir)
+    selected = st.multiselect("Panels:", panel_names, default=panel_names, key="batch_panels")
+    list_files = st.file_uploader(
+        "Upload target lists (CSV)", type=["csv"], accept_multiple_files=True, key="batch_lists"
+    )
+    if not list_files or not selected:
+        st.info("Upload one or more target lists and select the panels to compare them against.")
+        return
+
+    lists = []
+    for uf in list_files:
+        try:
+            lists.append((uf.name, pd.read_csv(uf, dtype=data_access.PANEL_DTYPES)))
+        except Exception as e:
+            st.warning(f"Could not read uploaded file '{uf.name}': {e}")
+    if not lists:
+        return
+
+    columns = list(dict.fromkeys(c for _, df in lists for c in df.columns))
+    default = columns.index(panel_catalog.KEY_COLUMN) if panel_catalog.KEY_COLUMN in columns else 0
+    key_column = st.selectbox("Column holding the protein identifiers:", columns, index=default, key="batch_key")
+    normalize = st.checkbox(
+        "Normalize identifiers (ignore case, whitespace and isoform suffixes; match gene/protein name aliases)",
+        key="batch_normalize",
+    )
+
+    jobs = background_jobs.registry(st.session_state)
+    batch_key = (tuple(uf.file_id for uf in list_files), tuple(selected), key_column, normalize)
+    job = jobs.current("batch_coverage", batch_key)
+    if job is None:
+        aliases = None
+        signature = panel_catalog.catalog_signature(data_dir)
+        if normalize:
+            aliases = cached_alias_table(str(data_dir), signature)
+        sources = [(name, data_access.panel(data_dir / name)) for name in selected]
+        mtimes = dict(signature)
+        cache_parts = (lists, [(name, mtimes.get(name)) for name in selected], key_column, signature if normalize else None)
+        job = jobs.submit(
+            "batch_coverage", coverage_in_background, lists, sources, key_column, aliases, cache_parts,
+            label="Computing coverage", key=batch_key,
+        )
+    background_jobs.show_progress(job)
+    if job.status != background_jobs.DONE:
+        return
+    coverage, details, skipped = job.result
+    if skipped:
+        st.info("Skipped (missing selected key column): " + ", ".join(skipped))
+    if coverage.empty:
+        st.info("Nothing to compare.")
+        return
+
+    metric = st.radio("Show:", ["Coverage", "Covered", "Matches"], horizontal=True, key="batch_metric")
+    heatmap = (
+        alt.Chart(coverage)
+        .mark_rect()
+        .encode(
+            x=alt.X("Panel:N", title=None),
+            y=alt.Y("List:N", title=None),
+            color=alt.Color(f"{metric}:Q", scale=alt.Scale(scheme="viridis")),
+            tooltip=panel_compare.COVERAGE_COLUMNS,
+        )
+    )
+    st.altair_chart(heatmap, use_container_width=True)
+    st.dataframe(coverage.pivot(index="List", columns="Panel", values=metric), use_container_width=True)
+
+    export_format = st.radio("Export format:", ["Excel workbook (.xlsx)", "ZIP of CSVs"], horizontal=True, key="batch_fmt")
+    fmt = "xlsx" if export_format.startswith("Excel") else "zip"
+    # Serialized only on request, not on every rerun (e.g. switching the metric above)
+    export_key = (job.job_id, fmt)
+    export_job = jobs.current("coverage_export", export_key)
+    if export_job is None or export_job.status in (background_jobs.CANCELLED, background_jobs.FAILED):
+        if st.button("Prepare export of the coverage matrix and matches"):
+            export_job = jobs.submit(
+                "coverage_export", build_coverage_export_in_background, coverage, details, fmt,
+                label="Building export", key=export_key,
+            )
+    if export_job is not None:
+        background_jobs.show_progress(export_job)
+    if export_job is not None and export_job.status == background_jobs.DONE:
+        st.download_button(
+            "Download coverage matrix and matches",
+            data=export_job.result,
+            file_name=f"batch_coverage.{fmt}",
+            mime=(
+                "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                if fmt == "xlsx" else "application/zip"
+            ),
+        )
+
+def compare_in_background(job, sources: list, custom_df: pd.DataFrame, key_column: str, aliases, cache_parts) -> tuple:
+    """panel_compare.compare_sources as a background job, reporting progress per source.
+
+    Results go through the shared cache, so a comparison repeated in any
+    server process is not recomputed.
+    """
+    def progress(done, total, name):
+        job.check()
+        job.report(done, total, f"Comparing against {name} ({done + 1} of {total})...")
+
+    return shared_cache.default().get_or_compute(
+        "compare", cache_parts,
+        lambda: panel_compare.compare_sources(sources, custom_df, key_column, aliases, progress=progress),
+    )
+
+def build_export_in_background(job, results: list, fmt: str) -> bytes:
+    """result_export.export_bytes as a background job."""
+    job.report(0, 1, f"Building {fmt} export of {len(results)} result(s)...")
+    return result_export.export_bytes(results, fmt)
+
 # ---------- Paths (safe even on Streamlit Cloud) ----------
 APP_DIR = Path(__file__).parent if "__file__" in globals() else Path.cwd()
 DATA_DIR = APP_DIR / "data"
@@ -47,6 +260,18 @@ if DATA_DIR.exists():
 
 # ---------- UI ----------
 st.title("CSV List Comparator")
+metrics.app_run("compareProteinPanels")
+
+mode = st.radio("Mode:", ["Compare lists", "Batch coverage", "Panel overlap", "Recommend panels"], horizontal=True)
+if mode == "Batch coverage":
+    render_batch_coverage(DATA_DIR)
+    st.stop()
+if mode == "Panel overlap":
+    render_panel_overlap(DATA_DIR)
+    st.stop()
+if mode == "Recommend panels":
+    render_panel_recommender(DATA_DIR)
+    st.stop()
 
 # Template download (if present)
 if TEMPLATE_FILE.exists():
@@ -66,31 +291,32 @@ if st.checkbox("Select all preloaded files"):
 uploaded_files = st.file_uploader("Or Upload Original CSV Files", type=["csv"], accept_multiple_files=True)
 custom_file = st.file_uploader("Upload Custom CSV File", type=["csv"], accept_multiple_files=False)
 
-# Build a normalized list of sources: [{"name": "file.csv", "df": DataFrame}]
+# Build a normalized list of sources: [{"name": "file.csv", "df": DataFrame, or the uploaded file to stream}]
 sources = []
 
 # Add preloaded files
 for fname in selected_preloaded_files:
     path = DATA_DIR / fname
     try:
-        df = pd.read_csv(path)
+        df = data_access.panel(path)
         sources.append({"name": fname, "df": df, "source": "preloaded"})
     except Exception as e:
         st.warning(f"Could not read preloaded file '{fname}': {e}")
 
-# Add uploaded files
+# Add uploaded files; these may be whole-proteome exports, so they are kept as files and
+# streamed by panel_compare (key column only, full rows for matches) instead of loaded here
 if uploaded_files:
     for uf in uploaded_files:
         try:
-            # Important: read into DataFrame NOW and keep it, so we don't depend on re-reading buffers later.
-            df = pd.read_csv(uf)
-            sources.append({"name": uf.name, "df": df, "source": "uploaded"})
+            panel_compare.csv_columns(uf)
+            sources.append({"name": uf.name, "df": uf, "source": "uploaded"})
         except Exception as e:
             st.warning(f"Could not read uploaded file '{uf.name}': {e}")
 
 if sources and custom_file:
     try:
-        custom_df = pd.read_csv(custom_file)
+        # Text like the preloaded panels, so numeric IDs match without float formatting ("123.0")
+        custom_df = pd.read_csv(custom_file, dtype=data_access.PANEL_DTYPES)
     except Exception as e:
         st.error(f"Could not read custom CSV: {e}")
         st.stop()
@@ -99,24 +325,56 @@ if sources and custom_file:
     st.dataframe(custom_df.head(20), use_container_width=True)
 
     key_column = st.selectbox("Select the common column for comparison:", list(custom_df.columns))
+    normalize = st.checkbox(
+        "Normalize identifiers (ignore case, whitespace and isoform suffixes; match gene/protein name aliases)"
+    )
 
+    # Comparison and export run as background jobs; the page polls until they finish
+    jobs = background_jobs.registry(st.session_state)
+    compare_key = (
+        tuple((item["name"], item["df"].file_id if item["source"] == "uploaded" else None) for item in sources),
+        custom_file.file_id, key_column, normalize,
+    )
     if st.button("Compare Lists"):
-        results = []
-        skipped = []
-
-        for item in sources:
-            name, original_df = item["name"], item["df"]
-            if key_column not in original_df.columns:
-                skipped.append(name)
-                continue
-            try:
-                common = find_common_items(original_df, custom_df, key_column)
-                results.append((name, len(common), common))
-            except Exception as e:
-                st.warning(f"Error comparing '{name}': {e}")
-
-        # Sort by matches desc
-        results.sort(key=lambda x: x[1], reverse=True)
+        aliases = None
+        signature = panel_catalog.catalog_signature(DATA_DIR)
+        if normalize:
+            aliases = cached_alias_table(str(DATA_DIR), signature)
+
+        # Cache key: preloaded panels by modification time, uploads by content
+        mtimes = dict(signature)
+        cache_parts = (
+            [(item["name"], mtimes.get(item["name"]) if item["source"] == "preloaded" else item["df"]) for item in sources],
+            custom_df, key_column, signature if normalize else None,
+        )
+        jobs.submit(
+            "compare_lists", compare_in_background,
+            [(item["name"], item["df"]) for item in sources], custom_df, key_column, aliases, cache_parts,
+            label="Comparing lists", key=compare_key,
+        )
+
+    compare_job = jobs.current("compare_lists", compare_key)
+    if compare_job is not None:
+        background_jobs.show_progress(compare_job)
+        if compare_job.status == background_jobs.DONE and st.session_state.get("comparison_job") != compare_job.job_id:
+            results, skipped, errors = compare_job.result
+            for name, message in errors:
+                st.warning(f"Error comparing '{name}': {message}")
+
+            # Keep results across reruns so the export can be built on a later click
+            st.session_state["comparison_results"] = results
+            st.session_state["comparison_skipped"] = skipped
+            st.session_state["comparison_job"] = compare_job.job_id
+            st.session_state["comparison_key"] = compare_key
+
+    # Results of other inputs are dropped, never shown (or exported) as the current comparison
+    if st.session_state.get("comparison_key") != compare_key:
+        for name in ("comparison_results", "comparison_skipped", "comparison_job", "comparison_key"):
+            st.session_state.pop(name, None)
+
+    if "comparison_results" in st.session_state:
+        results = st.session_state["comparison_results"]
+        skipped = st.session_state["comparison_skipped"]
 
         # Summary
         st.subheader("Summary of Matches")
@@ -139,16 +397,35 @@ if sources and custom_file:
                 + ", ".join(skipped)
             )
 
-        # Per-file downloads
+        # Single export of every result, serialized once and only on request
+        if results:
+            export_format = st.radio("Export format:", ["Excel workbook (.xlsx)", "ZIP of CSVs"], horizontal=True)
+            fmt = "xlsx" if export_format.startswith("Excel") else "zip"
+            export_key = (st.session_state.get("comparison_job"), fmt)
+            export_job = jobs.current("comparison_export", export_key)
+            if export_job is None or export_job.status in (background_jobs.CANCELLED, background_jobs.FAILED):
+                if st.button("Prepare export of all results"):
+                    export_job = jobs.submit(
+                        "comparison_export", build_export_in_background, results, fmt,
+                        label="Building export", key=export_key,
+                    )
+            if export_job is not None:
+                background_jobs.show_progress(export_job)
+            if export_job is not None and export_job.status == background_jobs.DONE:
+                st.download_button(
+                    "Download all results",
+                    data=export_job.result,
+                    file_name=f"comparison_results.{fmt}",
+                    mime=(
+                        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                        if fmt == "xlsx" else "application/zip"
+                    ),
+                )
+
+        # Per-file previews
         for name, count, common_df in results:
             st.markdown(f"**{name}: {count} matches found**")
             st.dataframe(common_df.head(50), use_container_width=True)
-            st.download_button(
-                label=f"Download common items for {name}",
-                data=df_to_csv_bytes(common_df),
-                file_name=f"common_items_{name}",
-                mime="text/csv",
-            )
 else:
     st.info("Select or upload at least one original CSV **and** upload a custom CSV to begin.")
 
@@ -0,0 +1,90 @@
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+# Every relative path is resolved against the repo root, not the working directory
+APP_DIR = Path(__file__).parent
+DATA_DIR = APP_DIR / "data"
+COST_DIR = APP_DIR / "olink_cost_files"
+
+CATEGORIES_FILE = COST_DIR / "categories.csv"
+RULES_FILE = COST_DIR / "pricing_rules.csv"
+
+# ---------- Schemas ----------
+CATEGORIES_DTYPES = {"Category Name": str, "Prices File": str}
+PRICES_DTYPES = {"Panel Name": str, "Batch Size": "Int64", "Panel type": str, "Product Name": str}
+RULES_DTYPES = {
+    "Product Name": str,
+    "Internal Price": float,
+    "External Academic Price": float,
+    "External Commercial Price": float,
+    "Sample Number for Discount": float,
+    "Discount Percentage": float,
+    "Bundle Size": float,
+    "Bundle Factor": float,
+    "Bundle Product Name": str,
+    "Sequencing Qty per Batch": float,
+    "Sequencing Kit": str,
+}
+# Panel files differ in their extra columns; every column is text
+PANEL_DTYPES = str
+
+# (resolved path, dtype, usecols) -> ((mtime_ns, size), DataFrame)
+_frames = {}
+_lock = threading.Lock()
+
+
+def resolve(path) -> Path:
+    """Return path as an absolute Path, relative paths being taken from the repo root."""
+    path = Path(path)
+    return path if path.is_absolute() else APP_DIR / path
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return tuple(sorted((k, str(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(value)
+    return value if value is None else str(value)
+
+
+def read_csv(path, dtype=None, usecols=None) -> pd.DataFrame:
+    """Return the parsed CSV, cached process-wide until the file's mtime or size changes.
+
+    The cached frame is shared by every session: callers get a shallow
+    copy and must treat the data as read-only (under pandas copy-on-write
+    any write lands in the copy, never in the cache).
+    """
+    path = resolve(path)
+    stat = path.stat()
+    version = (stat.st_mtime_ns, stat.st_size)
+    key = (str(path), _freeze(dtype), _freeze(usecols))
+    with _lock:
+        entry = _frames.get(key)
+    if entry is None or entry[0] != version:
+        entry = (version, pd.read_csv(path, dtype=dtype, usecols=usecols))
+        with _lock:
+            _frames[key] = entry
+    return entry[1].copy(deep=False)
+
+
+# ---------- Catalogs ----------
+def categories() -> pd.DataFrame:
+    """olink_cost_files/categories.csv: Category Name -> Prices File."""
+    return read_csv(CATEGORIES_FILE, dtype=CATEGORIES_DTYPES)
+
+
+def prices(path) -> pd.DataFrame:
+    """One prices file (Panel Name, Batch Size, Panel type, Product Name)."""
+    return read_csv(path, dtype=PRICES_DTYPES)
+
+
+def pricing_rules() -> pd.DataFrame:
+    """olink_cost_files/pricing_rules.csv with numeric price / discount / bundle columns."""
+    return read_csv(RULES_FILE, dtype=RULES_DTYPES)
+
+
+def panel(path, usecols=None) -> pd.DataFrame:
+    """One protein panel CSV from data/ (or any path), all columns as text."""
+    return read_csv(path, dtype=PANEL_DTYPES, usecols=usecols)
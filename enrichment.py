@@ -0,0 +1,158 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.stats import hypergeom
+
+import data_access
+import panel_catalog
+import protein_ids
+
+GENE_SETS_DIR = panel_catalog.APP_DIR / "gene_sets"
+
+# Same columns, in the same order, as GProfiler(return_dataframe=True).profile(...)
+RESULT_COLUMNS = [
+    "source", "native", "name", "p_value", "significant", "description", "term_size",
+    "query_size", "intersection_size", "effective_domain_size", "precision", "recall",
+    "query", "parents",
+]
+
+
+# ---------- Libraries ----------
+def list_gmt_files(gene_sets_dir: Path = GENE_SETS_DIR) -> list:
+    """Return the sorted .gmt files shipped in gene_sets/ (source name = file stem)."""
+    gene_sets_dir = Path(gene_sets_dir)
+    if not gene_sets_dir.exists():
+        return []
+    return sorted(gene_sets_dir.glob("*.gmt"))
+
+
+def read_gmt(lines, source: str) -> list:
+    """Parse GMT lines ("term id <TAB> description <TAB> gene ...") into (source, id, name, genes) tuples."""
+    gene_sets = []
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        fields = line.rstrip("\r\n").split("\t")
+        if len(fields) < 3:
+            continue
+        genes = sorted({g.strip().upper() for g in fields[2:] if g.strip()})
+        gene_sets.append((source, fields[0], fields[1], genes))
+    return gene_sets
+
+
+def build_library(gene_sets: list) -> tuple:
+    """Return (genes, terms, matrix) for parsed gene sets.
+
+    genes is an Index of upper-cased symbols, terms a DataFrame with
+    source / native / name columns, and matrix a sparse boolean
+    gene x term matrix in CSR format.
+    """
+    terms = pd.DataFrame([gs[:3] for gs in gene_sets], columns=["source", "native", "name"])
+    members = [gs[3] for gs in gene_sets]
+    genes, rows = np.unique(np.concatenate(members) if members else np.array([], dtype=str), return_inverse=True)
+    cols = np.repeat(np.arange(len(members)), [len(m) for m in members])
+    matrix = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=bool), (rows, cols)), shape=(len(genes), len(members)), dtype=bool
+    )
+    return pd.Index(genes), terms, matrix
+
+
+def load_library(paths: list) -> tuple:
+    """Read and combine GMT files into one (genes, terms, matrix) library."""
+    gene_sets = []
+    for path in paths:
+        path = Path(path)
+        with open(path, "r", encoding="utf-8") as f:
+            gene_sets.extend(read_gmt(f, path.stem))
+    return build_library(gene_sets)
+
+
+def panel_background(panel_file: str, data_dir: Path = panel_catalog.DATA_DIR) -> set:
+    """Return the upper-cased gene symbols measured by one preloaded panel (every gene of multi-gene assays)."""
+    df = data_access.panel(Path(data_dir) / panel_file)
+    return set(protein_ids.split_symbols(df["Gene"]).tolist()) if "Gene" in df.columns else set()
+
+
+# ---------- Enrichment ----------
+def benjamini_hochberg(p_values: np.ndarray) -> np.ndarray:
+    """Return Benjamini-Hochberg adjusted p-values (FDR), in the input order."""
+    n = len(p_values)
+    if n == 0:
+        return p_values
+    order = np.argsort(p_values)
+    ranked = p_values[order] * n / np.arange(1, n + 1)
+    adjusted = np.minimum.accumulate(ranked[::-1])[::-1]
+    out = np.empty(n)
+    out[order] = np.minimum(adjusted, 1.0)
+    return out
+
+
+def enrich(library: tuple, query, background=None, threshold: float = 0.05,
+           all_results: bool = False) -> pd.DataFrame:
+    """Hypergeometric enrichment of the query genes for every term at once.
+
+    background restricts the gene universe (e.g. the panel the query was
+    measured on); by default it is every gene in the library. As with
+    g:Profiler, each source's domain is the background genes annotated in
+    that source, p_value is multiple-testing corrected (Benjamini-Hochberg
+    within each source) and only significant terms are returned unless
+    all_results is set.
+    """
+    genes, terms, matrix = library
+    query = {str(g).strip().upper() for g in query if pd.notna(g)}
+    gene_list = genes.tolist()
+    if background is None:
+        in_background = np.ones(len(gene_list), dtype=bool)
+    else:
+        background = set(background)
+        in_background = np.fromiter((g in background for g in gene_list), dtype=bool, count=len(gene_list))
+    bg_matrix = matrix[in_background]
+    bg_genes = [g for g, keep in zip(gene_list, in_background) if keep]
+    in_query = np.fromiter((g in query for g in bg_genes), dtype=np.int64, count=len(bg_genes))
+
+    # Per-source domain: background genes with at least one term in that source
+    sources, term_source = np.unique(terms["source"].to_numpy(), return_inverse=True)
+    source_indicator = sparse.csr_matrix(
+        (np.ones(len(terms), dtype=np.int64), (np.arange(len(terms)), term_source)),
+        shape=(len(terms), len(sources)),
+    )
+    annotated = (bg_matrix.astype(np.int64) @ source_indicator).toarray() > 0
+    domain_size = annotated.sum(axis=0)[term_source]
+    query_size = (in_query[:, None] * annotated).sum(axis=0)[term_source]
+
+    term_size = np.asarray(bg_matrix.sum(axis=0)).ravel()
+    intersection = np.asarray(bg_matrix.T.astype(np.int64) @ in_query).ravel()
+
+    # P(X >= k); terms without any query gene have p = 1 and need no evaluation
+    p_values = np.ones(len(terms))
+    hit = intersection > 0
+    p_values[hit] = hypergeom.sf(intersection[hit] - 1, domain_size[hit], term_size[hit], query_size[hit])
+    adjusted = np.ones(len(terms))
+    for s in range(len(sources)):
+        tested = (term_source == s) & (term_size > 0)
+        adjusted[tested] = benjamini_hochberg(p_values[tested])
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result = pd.DataFrame({
+            "source": terms["source"].to_numpy(),
+            "native": terms["native"].to_numpy(),
+            "name": terms["name"].to_numpy(),
+            "p_value": adjusted,
+            "significant": adjusted < threshold,
+            "description": terms["name"].to_numpy(),
+            "term_size": term_size,
+            "query_size": query_size,
+            "intersection_size": intersection,
+            "effective_domain_size": domain_size,
+            "precision": np.where(query_size > 0, intersection / query_size, 0.0),
+            "recall": np.where(term_size > 0, intersection / term_size, 0.0),
+            "query": "query_1",
+        })
+    result["parents"] = [[] for _ in range(len(result))]
+
+    result = result[result["intersection_size"] > 0]
+    if not all_results:
+        result = result[result["significant"]]
+    return result.sort_values(["p_value", "source"]).reset_index(drop=True)[RESULT_COLUMNS]
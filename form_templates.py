@@ -0,0 +1,207 @@
+"""Cell maps of the shipped submission templates and the extraction they drive.
+
+Each template is described once: the header cells that identify it, the
+single cells holding form fields and the sample block (first row and the
+column of every sample attribute). An uploaded workbook is opened in
+openpyxl's streaming read-only mode, matched against the fingerprints,
+and only the mapped ranges are read.
+
+    form = form_templates.extract("Olink submission form v1.2.xlsx")
+    form["template"], form["fields"]["quote_number"], form["samples"]
+"""
+from io import BytesIO
+from pathlib import Path
+
+import openpyxl as xl
+import pandas as pd
+from openpyxl.utils.cell import column_index_from_string, coordinate_to_tuple
+
+# Shared layout of the plate forms (Olink and Alamar): form fields in column D,
+# one row per well from row 38, filled column-wise; the control wells at the
+# end of each plate have no row, so a plate spans fewer than 96 rows
+_PLATE_FORM_FIELDS = {
+    "customer_name": "D14",
+    "quote_number": "D15",
+    "purchase_order": "D18",
+    "sample_type": "D27",
+}
+_PLATE_FORM_COLUMNS = {"well": "A", "name": "B", "plate_name": "C", "volume": "D"}
+
+# name -> spec; fingerprint cells are compared after stripping whitespace
+TEMPLATES = {
+    "olink": {
+        "title": "Olink submission form",
+        "version": "1.2",
+        "file": "Olink submission form v1.2.xlsx",
+        "sheet": "Submission form",
+        "fingerprint": {
+            "A1": "WHG Technology Platforms Sample Submission Form",
+            "A37": "Sample/Well Location",
+            "B37": "Sample/Name",
+        },
+        "fields": _PLATE_FORM_FIELDS,
+        # A1-H11; column 12 is left for the Olink controls
+        "samples": {"first_row": 38, "plate_size": 88, "columns": _PLATE_FORM_COLUMNS},
+        "manifest": "plates",
+    },
+    "alamar": {
+        "title": "Alamar NULISA sample submission form",
+        "version": "1",
+        "file": "Alamar - sample submission form.xlsx",
+        "sheet": "Sheet1",
+        "fingerprint": {
+            "A1": "CHG Multiomics Technology Platforms Sample Submission Form (Alamar - Nulisa)",
+            "A37": "Sample/Well Location",
+            "B37": "Sample/Name",
+        },
+        "fields": {**_PLATE_FORM_FIELDS, "sample_type_details": "D28"},
+        # A1-F11; G11-H12 are left for the NULISA controls
+        "samples": {"first_row": 38, "plate_size": 86, "columns": _PLATE_FORM_COLUMNS},
+        "manifest": "plates",
+    },
+    "library": {
+        "title": "Library sample submission form",
+        "version": "1",
+        "file": "Library sample submission form.xlsx",
+        "sheet": "Sheet1",
+        "fingerprint": {
+            "D1": "Multiomics Technology Platforms Sample Submission Form",
+            "A11": "Sample/Name",
+            "N11": "Sample/Well Location",
+        },
+        "fields": {"customer_name": "C4", "quote_number": "C5", "purchase_order": "C8"},
+        "samples": {
+            "first_row": 12,
+            "plate_size": 96,
+            "columns": {
+                "name": "A",
+                "sample_type": "B",
+                "reference_genome": "C",
+                "concentration": "D",
+                "units": "E",
+                "volume": "F",
+                "mass": "G",
+                "rin": "H",
+                "ratio_260_280": "I",
+                "ratio_260_230": "J",
+                "pooling": "K",
+                "container_type": "L",
+                "container_name": "M",
+                "well": "N",
+            },
+        },
+        "manifest": "submission",
+    },
+}
+
+
+class UnknownTemplate(ValueError):
+    """The workbook matches none of the template fingerprints."""
+
+
+# ---------- Reading ----------
+def open_workbook(source):
+    """Open a workbook (path, bytes or file-like) in streaming read-only mode, formulas evaluated."""
+    if isinstance(source, (bytes, bytearray)):
+        source = BytesIO(source)
+    return xl.load_workbook(source, read_only=True, data_only=True)
+
+
+def read_cells(ws, refs) -> dict:
+    """Return {ref: value} for single-cell references, streaming only the rows and columns they span."""
+    coords = {ref: coordinate_to_tuple(ref) for ref in refs}
+    if not coords:
+        return {}
+    max_row = max(r for r, _ in coords.values())
+    max_col = max(c for _, c in coords.values())
+    rows = list(ws.iter_rows(min_row=1, max_row=max_row, max_col=max_col, values_only=True))
+    values = {}
+    for ref, (r, c) in coords.items():
+        row = rows[r - 1] if r <= len(rows) else ()
+        values[ref] = row[c - 1] if c <= len(row) else None
+    return values
+
+
+def _text(value) -> str:
+    return "" if value is None else str(value).strip()
+
+
+# ---------- Detection ----------
+def detect(wb):
+    """Return (template name, worksheet) of the first template whose fingerprint matches, or (None, None).
+
+    The template's own sheet name is tried first, then every other sheet,
+    so renamed sheets are still recognised.
+    """
+    for name, spec in TEMPLATES.items():
+        sheets = [spec["sheet"]] if spec["sheet"] in wb.sheetnames else []
+        sheets += [s for s in wb.sheetnames if s != spec["sheet"]]
+        for sheet in sheets:
+            ws = wb[sheet]
+            cells = read_cells(ws, spec["fingerprint"])
+            if all(_text(cells[ref]) == _text(expected) for ref, expected in spec["fingerprint"].items()):
+                return name, ws
+    return None, None
+
+
+# ---------- Extraction ----------
+def read_samples(ws, samples_spec: dict) -> pd.DataFrame:
+    """Read the sample block into a frame with one column per mapped attribute plus the Excel row and plate.
+
+    Only the columns between the first and last mapped ones are streamed;
+    trailing rows without a sample name are dropped.
+    """
+    columns = samples_spec["columns"]
+    indices = {key: column_index_from_string(letter) for key, letter in columns.items()}
+    min_col, max_col = min(indices.values()), max(indices.values())
+    first_row = samples_spec["first_row"]
+    block = list(ws.iter_rows(min_row=first_row, min_col=min_col, max_col=max_col, values_only=True))
+
+    df = pd.DataFrame.from_records(block, columns=range(min_col, max_col + 1)) if block else pd.DataFrame(
+        columns=range(min_col, max_col + 1))
+    df = df[list(indices.values())].set_axis(list(indices), axis=1).astype(object)
+    df = df.where(df.notna(), None)
+    df.insert(0, "row", range(first_row, first_row + len(df)))
+    df.insert(1, "plate", (df["row"] - first_row) // samples_spec["plate_size"] + 1)
+
+    named = df["name"].map(_text) != ""
+    last = named[named].index.max() if named.any() else -1
+    return df.iloc[: last + 1].reset_index(drop=True)
+
+
+def extract(source) -> dict:
+    """Detect the template of a workbook and read its mapped fields and sample block.
+
+    Returns {"template", "title", "version", "sheet", "manifest", "fields",
+    "samples"}; manifest is the kind manifests.form_manifests emits, and
+    samples has a "row" (Excel row) and "plate" column besides the mapped
+    attributes. Raises UnknownTemplate if no fingerprint matches.
+    """
+    wb = open_workbook(source)
+    try:
+        name, ws = detect(wb)
+        if name is None:
+            raise UnknownTemplate(
+                "Unrecognised submission form; expected one of: "
+                + ", ".join(spec["file"] for spec in TEMPLATES.values())
+            )
+        spec = TEMPLATES[name]
+        cells = read_cells(ws, spec["fields"].values())
+        fields = {field: cells[ref] for field, ref in spec["fields"].items()}
+        samples = read_samples(ws, spec["samples"])
+        return {
+            "template": name,
+            "title": spec["title"],
+            "version": spec["version"],
+            "sheet": ws.title,
+            "manifest": spec["manifest"],
+            "fields": fields,
+            "samples": samples,
+        }
+    finally:
+        wb.close()
+
+
+def template_path(name: str) -> Path:
+    """Path of a shipped blank template."""
+    return Path(__file__).parent / TEMPLATES[name]["file"]
@@ -0,0 +1,265 @@
+"""Validation of submission workbooks before their manifests are generated.
+
+Each template has a rule set over its sample block and form fields
+(form_templates cell maps). The rules are compiled once per template into
+vectorized checks over the columnar sample frame, and every failure is
+reported with the cell it came from.
+
+Check a week's worth of forms in one run (exit code 1 if any fail):
+
+    python form_validation.py inbox/ --output report.csv --workers 8
+"""
+import argparse
+import functools
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from openpyxl.utils.cell import column_index_from_string
+
+import form_templates
+
+REPORT_COLUMNS = ["file", "template", "cell", "field", "rule", "value", "message"]
+
+# Characters the submission forms disallow in names (the form's own "Illegal characters" list)
+ILLEGAL_NAME_CHARS = "^<>/{}[]\\~`@,:;"
+
+_PLATE_FORM_RULES = [
+    {"rule": "required_field", "field": "quote_number"},
+    {"rule": "required_field", "field": "customer_name"},
+    {"rule": "required_field", "field": "sample_type"},
+    {"rule": "unique", "column": "name"},
+    {"rule": "no_gaps", "column": "name"},
+    {"rule": "name_chars", "column": "name"},
+    {"rule": "regex", "column": "well", "pattern": r"[A-H](?:[1-9]|1[0-2])"},
+    {"rule": "required", "column": "plate_name"},
+    {"rule": "one_per_plate", "column": "plate_name"},
+    {"rule": "range", "column": "volume", "min": 0, "min_inclusive": False, "required": True},
+]
+
+# template name -> rules; checks on sample columns only look at rows with a sample name
+RULES = {
+    "olink": _PLATE_FORM_RULES,
+    "alamar": _PLATE_FORM_RULES,
+    "library": [
+        {"rule": "required_field", "field": "quote_number"},
+        {"rule": "required_field", "field": "customer_name"},
+        {"rule": "unique", "column": "name"},
+        {"rule": "no_gaps", "column": "name"},
+        {"rule": "name_chars", "column": "name"},
+        {"rule": "regex", "column": "well", "pattern": r"[A-H]:(?:[1-9]|1[0-2])"},
+        {"rule": "choices", "column": "sample_type", "choices": ["RNA", "DNA"]},
+        {"rule": "range", "column": "concentration", "min": 0, "min_inclusive": False, "required": True},
+        {"rule": "range", "column": "volume", "min": 0, "min_inclusive": False, "required": True},
+        {"rule": "range", "column": "rin", "min": 1, "max": 10},
+        {"rule": "range", "column": "ratio_260_280", "min": 0},
+        {"rule": "range", "column": "ratio_260_230", "min": 0},
+    ],
+}
+
+
+# ---------- Rules ----------
+def _text(values: pd.Series) -> pd.Series:
+    """Cell values as stripped strings, "" for empty cells."""
+    return values.astype("string").fillna("").str.strip()
+
+
+def _blank(values: pd.Series) -> pd.Series:
+    return _text(values) == ""
+
+
+def _unique(column, **_):
+    def check(samples, named):
+        names = _text(samples[column]).where(named)
+        return named & names.duplicated(keep=False), "Duplicate sample name"
+    return check
+
+
+def _no_gaps(column, **_):
+    def check(samples, named):
+        # Blank name in a plate row that comes before the plate's last named row
+        last_named = samples["row"].where(named).groupby(samples["plate"]).transform("max")
+        return ~named & (samples["row"] < last_named), "Blank sample name inside a plate"
+    return check
+
+
+def _name_chars(column, **_):
+    def check(samples, named):
+        names = _text(samples[column])
+        bad = names.str.contains(f"[{re.escape(ILLEGAL_NAME_CHARS)}]", regex=True) | ~names.map(str.isascii).astype(bool)
+        return named & bad, "Sample name contains disallowed or non-ASCII characters"
+    return check
+
+
+def _regex(column, pattern, **_):
+    def check(samples, named):
+        values = _text(samples[column])
+        return named & ~values.str.fullmatch(pattern), "Well ID is not in the template's format"
+    return check
+
+
+def _required(column, **_):
+    def check(samples, named):
+        return named & _blank(samples[column]), "Required value is missing"
+    return check
+
+
+def _one_per_plate(column, **_):
+    def check(samples, named):
+        present = named & ~_blank(samples[column])
+        values = _text(samples[column]).where(present)
+        first = values.groupby(samples["plate"]).transform("first")
+        return present & (values != first), "Differs from the plate's other rows"
+    return check
+
+
+def _choices(column, choices, **_):
+    def check(samples, named):
+        values = _text(samples[column]).str.upper()
+        return named & ~values.isin([c.upper() for c in choices]), f"Expected one of {', '.join(choices)}"
+    return check
+
+
+def _range(column, min=None, max=None, min_inclusive=True, required=False, **_):
+    def check(samples, named):
+        blank = _blank(samples[column])
+        values = pd.to_numeric(samples[column], errors="coerce")
+        bad = ~blank & values.isna()
+        if min is not None:
+            bad |= (values <= min) if not min_inclusive else (values < min)
+        if max is not None:
+            bad |= values > max
+        if required:
+            bad |= blank
+        bounds = " ".join(filter(None, [
+            f"{'>=' if min_inclusive else '>'} {min}" if min is not None else "",
+            f"<= {max}" if max is not None else "",
+        ]))
+        return named & bad, f"Expected a number {bounds}".strip()
+    return check
+
+
+SAMPLE_CHECKS = {
+    "unique": _unique,
+    "no_gaps": _no_gaps,
+    "name_chars": _name_chars,
+    "regex": _regex,
+    "required": _required,
+    "one_per_plate": _one_per_plate,
+    "choices": _choices,
+    "range": _range,
+}
+
+
+@functools.lru_cache(maxsize=None)
+def compiled_rules(template: str) -> list:
+    """Return [(rule spec, check)] for a template; sample checks map (samples, named mask) -> (failing mask, message)."""
+    compiled = []
+    for spec in RULES[template]:
+        check = None if spec["rule"] == "required_field" else SAMPLE_CHECKS[spec["rule"]](**spec)
+        compiled.append((spec, check))
+    return compiled
+
+
+# ---------- Validation ----------
+def validate(form: dict, file: str = "") -> pd.DataFrame:
+    """Return the cell-addressed failures (REPORT_COLUMNS) of a form read by form_templates.extract."""
+    template = form["template"]
+    spec = form_templates.TEMPLATES[template]
+    samples = form["samples"].reset_index(drop=True)
+    named = ~_blank(samples["name"])
+    letters = spec["samples"]["columns"]
+
+    parts = []
+    for rule, check in compiled_rules(template):
+        if check is None:
+            field = rule["field"]
+            value = form["fields"].get(field)
+            if value is None or str(value).strip() == "":
+                parts.append(pd.DataFrame([{
+                    "cell": spec["fields"][field], "field": field, "rule": "required",
+                    "value": None, "message": "Required form field is empty",
+                }]))
+            continue
+        mask, message = check(samples, named)
+        mask = mask.fillna(False).astype(bool)
+        if not mask.any():
+            continue
+        column = rule["column"]
+        failing = samples.loc[mask, ["row", column]]
+        parts.append(pd.DataFrame({
+            "cell": letters[column] + failing["row"].astype(str),
+            "field": column,
+            "rule": rule["rule"],
+            "value": _text(failing[column]).to_numpy(dtype=object),
+            "message": message,
+        }))
+
+    if not parts:
+        return pd.DataFrame(columns=REPORT_COLUMNS)
+    report = pd.concat(parts, ignore_index=True)
+    report.insert(0, "file", file)
+    report.insert(1, "template", template)
+    # Sheet order: by row, then by column
+    cells = report["cell"].str.extract(r"^([A-Z]+)(\d+)$")
+    order = np.lexsort((cells[0].map(column_index_from_string).to_numpy(), cells[1].astype(int).to_numpy()))
+    return report.iloc[order].reset_index(drop=True)[REPORT_COLUMNS]
+
+
+def validate_workbook(source, file: str = "") -> pd.DataFrame:
+    """Extract and validate one workbook (path, bytes or file-like); unreadable or unknown forms are one report row."""
+    try:
+        form = form_templates.extract(source)
+    except Exception as e:
+        return pd.DataFrame([{
+            "file": file, "template": None, "cell": None, "field": None,
+            "rule": "template", "value": None, "message": str(e),
+        }], columns=REPORT_COLUMNS)
+    return validate(form, file)
+
+
+def _validate_path(path: str) -> pd.DataFrame:
+    return validate_workbook(path, Path(path).name)
+
+
+def validate_many(paths: list, workers: int = None) -> pd.DataFrame:
+    """Validate many workbooks in parallel processes and return one combined report."""
+    paths = [str(p) for p in paths]
+    if len(paths) <= 1 or workers == 1:
+        reports = [_validate_path(p) for p in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            reports = list(pool.map(_validate_path, paths, chunksize=4))
+    reports = [r for r in reports if not r.empty]
+    if not reports:
+        return pd.DataFrame(columns=REPORT_COLUMNS)
+    return pd.concat(reports, ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate submission workbooks against their template rules.")
+    parser.add_argument("paths", nargs="+", help="Workbooks, or directories searched for *.xlsx")
+    parser.add_argument("--output", help="Write the report to this CSV instead of printing it")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    files = []
+    for p in map(Path, args.paths):
+        files += sorted(p.rglob("*.xlsx")) if p.is_dir() else [p]
+    files = [f for f in files if not f.name.startswith("~$")]
+
+    report = validate_many(files, args.workers)
+    if args.output:
+        report.to_csv(args.output, index=False)
+    else:
+        print(report.to_string(index=False) if not report.empty else "No problems found.")
+    failed = report["file"].nunique() if not report.empty else 0
+    print(f"{len(files)} workbook(s) checked, {failed} with problems, {len(report)} problem(s)", file=sys.stderr)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""Choose index wells with balanced base composition for a pool of N samples.
+
+Low-plex pools on two-colour instruments (NextSeq, NovaSeq) fail when a
+cycle has no signal in one channel, e.g. every index reads G (dark).
+Four-colour instruments image each base in its own channel, so there a
+cycle is dark when one of the four bases is missing. A candidate set of
+wells is scored on:
+
+- cycles where a channel has no signal (0 for two-colour; for four-colour
+  only pools of 4 or more can reach 0),
+- the minimum pairwise Hamming distance of the combined i7+i5 indexes,
+- per-cycle base diversity (mean normalized entropy).
+
+Index sequences are one-hot encoded once ((wells, cycles, 4) arrays).
+Small pools are solved exactly by scoring every combination in
+vectorized blocks; larger ones by a restarted greedy fill and swap local
+search that scores every candidate well per step in one pass.
+
+    result = index_optimizer.optimize(index_data, n_samples=12)
+    result["wells"], result["min_distance"], result["dark_cycles"]
+"""
+import itertools
+import math
+import time
+
+import numpy as np
+import pandas as pd
+
+import plate_layout
+
+BASES = "ACGT"
+
+# chemistry -> the bases lit in each imaging channel
+CHEMISTRIES = {
+    "two-colour": {"red": "AC", "green": "AT"},   # G is dark
+    "four-colour": {"A": "A", "C": "C", "G": "G", "T": "T"},
+}
+
+# Distance below which demultiplexing is unreliable; beyond it distance only breaks ties
+MIN_DISTANCE = 3
+
+# Time allowed for the restarted greedy + swap search
+DEFAULT_BUDGET = 0.5
+
+# Up to this many candidate sets (e.g. every pair of a 384-well kit) are all scored
+EXHAUSTIVE_LIMIT = 200_000
+
+
+# ---------- Encoding ----------
+def one_hot(sequences) -> np.ndarray:
+    """(len(sequences), longest, 4) boolean array over ACGT; N, padding and other letters are all-zero."""
+    sequences = ["" if pd.isna(s) else str(s).strip().upper() for s in sequences]
+    length = max((len(s) for s in sequences), default=0)
+    codes = np.full((len(sequences), length), -1, dtype=np.int8)
+    lookup = np.full(256, -1, dtype=np.int8)
+    lookup[np.frombuffer(BASES.encode(), dtype=np.uint8)] = np.arange(4)
+    for i, s in enumerate(sequences):
+        codes[i, :len(s)] = lookup[np.frombuffer(s.encode("ascii", "replace"), dtype=np.uint8)]
+    return codes[..., None] == np.arange(4)
+
+
+def hamming_matrix(encoded: np.ndarray) -> np.ndarray:
+    """Pairwise Hamming distances of one-hot sequences (a cycle missing in either counts as different)."""
+    flat = encoded.reshape(len(encoded), -1).astype(np.int32)
+    return encoded.shape[1] - flat @ flat.T
+
+
+# ---------- Scoring ----------
+def _channel_masks(chemistry: str) -> np.ndarray:
+    """(4, channels) array: 1 where a base is lit in a channel."""
+    if chemistry not in CHEMISTRIES:
+        raise ValueError(f"Unknown chemistry: {chemistry} (expected one of {list(CHEMISTRIES)})")
+    return np.array([np.isin(list(BASES), list(bases)) for bases in CHEMISTRIES[chemistry].values()], dtype=np.int32).T
+
+
+def composition(counts: np.ndarray, size: int, chemistry: str = "two-colour") -> tuple:
+    """Return (dark cycles, mean base diversity) of base counts shaped (..., cycles, 4) for sets of `size` wells."""
+    read = counts.sum(-1) > 0
+    dark = (((counts @ _channel_masks(chemistry)) == 0).any(-1) & read).sum(-1)
+    p = counts / max(size, 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        entropy = -np.where(p > 0, p * np.log2(p), 0).sum(-1) / 2
+    diversity = (entropy * read).sum(-1) / np.maximum(read.sum(-1), 1)
+    return dark, diversity
+
+
+def _score(dark, min_distance, diversity):
+    """Higher is better: no dark cycles first, then distance up to MIN_DISTANCE, then diversity."""
+    return -1000.0 * dark + 100.0 * np.minimum(min_distance, MIN_DISTANCE) + 10.0 * diversity + 0.1 * min_distance
+
+
+# ---------- Search ----------
+def _min_distance(distances: np.ndarray, selected: np.ndarray, cap: int) -> int:
+    if len(selected) < 2:
+        return cap
+    sub = distances[np.ix_(selected, selected)].astype(float)
+    np.fill_diagonal(sub, np.inf)
+    return int(sub.min())
+
+
+def _set_score(counts_of, distances, selected, chemistry: str) -> float:
+    dark, diversity = composition(counts_of[selected].sum(0), len(selected), chemistry)
+    return float(_score(dark, _min_distance(distances, selected, counts_of.shape[1]), diversity))
+
+
+def exhaustive(encoded: np.ndarray, distances: np.ndarray, n: int, chemistry: str = "two-colour",
+               block: int = 20_000) -> np.ndarray:
+    """Indices of the best n wells over every combination (only sensible when there are few of them)."""
+    counts_of = encoded.astype(np.int32)
+    best, best_score = None, -np.inf
+    combinations = itertools.combinations(range(len(encoded)), n)
+    while True:
+        combos = np.array(list(itertools.islice(combinations, block)), dtype=np.intp).reshape(-1, n)
+        if not len(combos):
+            return best
+        dark, diversity = composition(counts_of[combos].sum(1), n, chemistry)
+        min_distance = np.full(len(combos), encoded.shape[1])
+        for i, j in itertools.combinations(range(n), 2):
+            min_distance = np.minimum(min_distance, distances[combos[:, i], combos[:, j]])
+        score = _score(dark, min_distance, diversity)
+        top = int(np.argmax(score))
+        if score[top] > best_score:
+            best, best_score = combos[top], score[top]
+
+
+def _greedy(counts_of, distances, n: int, start: int, chemistry: str) -> np.ndarray:
+    """Fill n wells from start, adding the best candidate each step."""
+    cap = counts_of.shape[1]
+    selected = [start]
+    counts = counts_of[start].copy()
+    nearest = distances[start].astype(float)  # distance of every well to the selected set
+    current_min = cap
+    while len(selected) < n:
+        dark, diversity = composition(counts + counts_of, len(selected) + 1, chemistry)
+        min_distance = np.minimum(current_min, nearest)
+        score = _score(dark, min_distance, diversity)
+        score[selected] = -np.inf
+        best = int(np.argmax(score))
+        selected.append(best)
+        counts += counts_of[best]
+        current_min = min(current_min, nearest[best])
+        nearest = np.minimum(nearest, distances[best])
+    return np.array(selected)
+
+
+def _local_search(counts_of, distances, selected: np.ndarray, chemistry: str, deadline: float) -> tuple:
+    """Apply the best improving swap of one selected well until none improves or time runs out."""
+    n = len(selected)
+    cap = counts_of.shape[1]
+    counts = counts_of[selected].sum(0)
+    best_score = _set_score(counts_of, distances, selected, chemistry)
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for position in range(n):
+            rest = np.delete(selected, position)
+            rest_counts = counts - counts_of[selected[position]]
+            rest_min = _min_distance(distances, rest, cap)
+            dark, diversity = composition(rest_counts + counts_of, n, chemistry)
+            min_distance = np.minimum(rest_min, distances[:, rest].min(axis=1))
+            score = _score(dark, min_distance, diversity)
+            score[selected] = -np.inf
+            candidate = int(np.argmax(score))
+            if score[candidate] > best_score + 1e-9:
+                counts = rest_counts + counts_of[candidate]
+                selected[position] = candidate
+                best_score = score[candidate]
+                improved = True
+            if time.perf_counter() >= deadline:
+                break
+    return selected, best_score
+
+
+def search(encoded: np.ndarray, distances: np.ndarray, n: int, chemistry: str = "two-colour",
+           budget: float = DEFAULT_BUDGET, seed: int = 0) -> np.ndarray:
+    """Indices of n wells (rows of encoded).
+
+    When there are at most EXHAUSTIVE_LIMIT combinations (pairs and
+    triples of a plate, the low-plex pools this matters most for) every
+    one is scored. Otherwise a greedy fill plus best-swap local search is
+    restarted from different first wells (A1 first, as kits are usually
+    filled from it) until the budget runs out, keeping the best set.
+    """
+    wells = len(encoded)
+    if n >= wells:
+        return np.arange(wells)
+    if math.comb(wells, n) <= EXHAUSTIVE_LIMIT:
+        return exhaustive(encoded, distances, n, chemistry)
+
+    counts_of = encoded.astype(np.int32)
+    deadline = time.perf_counter() + budget
+    starts = np.concatenate([[0], np.random.default_rng(seed).permutation(np.arange(1, wells))])
+    best, best_score = None, -np.inf
+    for start in starts:
+        selected, score = _local_search(
+            counts_of, distances, _greedy(counts_of, distances, n, int(start), chemistry), chemistry, deadline
+        )
+        if score > best_score:
+            best, best_score = selected, score
+        if time.perf_counter() >= deadline:
+            break
+    return best
+
+
+def optimize(index_data: pd.DataFrame, n_samples: int, well_column=None, chemistry: str = "two-colour",
+             plate_format: int = 96, budget: float = DEFAULT_BUDGET) -> dict:
+    """Propose the wells of an index kit to use for n_samples.
+
+    index_data is a kit sheet as loaded in AddIndicesToSampleList: well IDs
+    in well_column (default: the first column) and sequences in i7 and,
+    for dual indexes, i5. Returns {"wells" (column-wise order),
+    "dark_cycles", "min_distance", "diversity"}.
+    """
+    well_column = index_data.columns[0] if well_column is None else well_column
+    kit = index_data.dropna(subset=["i7"]).drop_duplicates(subset=[well_column])
+    if kit.empty or n_samples < 1:
+        return {"wells": [], "dark_cycles": 0, "min_distance": 0, "diversity": 0.0}
+
+    parts = [one_hot(kit["i7"])]
+    if "i5" in kit.columns:
+        parts.append(one_hot(kit["i5"]))
+    encoded = np.concatenate(parts, axis=1)
+    distances = hamming_matrix(encoded)
+
+    chosen = search(encoded, distances, min(n_samples, len(kit)), chemistry, budget)
+    dark, diversity = composition(encoded[chosen].sum(0), len(chosen), chemistry)
+    wells = kit[well_column].astype(str).to_numpy()[chosen]
+    return {
+        "wells": plate_layout.sort_wells(wells, plate_format, order="column"),
+        "dark_cycles": int(dark),
+        "min_distance": _min_distance(distances, chosen, encoded.shape[1]),
+        "diversity": float(diversity),
+    }
@@ -0,0 +1,210 @@
+"""Registry of every final manifest saved from AddIndicesToSampleList.
+
+Each saved manifest's batch, i5/i7 pairs and sample names are kept in a
+local SQLite database, so a new manifest can be checked against every
+earlier run rather than only against itself:
+
+- an i5/i7 pair already used in the same batch (flow cell), and
+- a sample name that was already sequenced in any batch.
+
+Back-fill the history from older final manifests with
+
+    python index_registry.py runs/*.csv --sample-column Sample
+"""
+import argparse
+import hashlib
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+
+APP_DIR = Path(__file__).parent
+DEFAULT_PATH = APP_DIR / "registry" / "index_registry.sqlite"
+
+CONFLICT_COLUMNS = [
+    "row", "sample", "batch", "i5", "i7", "conflict",
+    "previous_batch", "previous_sample", "previous_file", "saved",
+]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS manifests (
+    id       INTEGER PRIMARY KEY,
+    digest   TEXT    NOT NULL UNIQUE,
+    batch    TEXT    NOT NULL,
+    file     TEXT,
+    samples  INTEGER NOT NULL,
+    saved    REAL    NOT NULL
+);
+CREATE TABLE IF NOT EXISTS samples (
+    manifest INTEGER NOT NULL REFERENCES manifests (id) ON DELETE CASCADE,
+    batch    TEXT    NOT NULL,
+    sample   TEXT    NOT NULL,
+    i5       TEXT    NOT NULL,
+    i7       TEXT    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS samples_pair ON samples (batch, i5, i7);
+CREATE INDEX IF NOT EXISTS samples_sample ON samples (sample);
+CREATE INDEX IF NOT EXISTS samples_manifest ON samples (manifest);
+"""
+
+
+def _text(values: pd.Series) -> pd.Series:
+    return values.astype("string").fillna("").str.strip()
+
+
+def normalize(manifest: pd.DataFrame, sample_column: str, batch: str = None) -> pd.DataFrame:
+    """Return the registry view of a manifest: row, batch, sample, i5, i7 (stripped; index sequences upper-cased).
+
+    batch overrides the manifest's own batch column.
+    """
+    return pd.DataFrame({
+        "row": range(len(manifest)),
+        "batch": str(batch).strip() if batch is not None else _text(manifest["batch"]),
+        "sample": _text(manifest[sample_column]),
+        "i5": _text(manifest["i5"]).str.upper(),
+        "i7": _text(manifest["i7"]).str.upper(),
+    })
+
+
+def manifest_digest(rows: pd.DataFrame) -> str:
+    """Content hash of a normalized manifest, so saving the same manifest twice is a no-op."""
+    content = rows[["batch", "sample", "i5", "i7"]].to_csv(index=False)
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+class IndexRegistry:
+    """SQLite registry of saved manifests, shared by every session.
+
+    Lookups are joins between the incoming rows (a temporary table) and
+    the indexed history, one query per kind of conflict. WAL mode and one
+    connection per thread, as in annotation_cache.
+    """
+
+    def __init__(self, path: Path = DEFAULT_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    # ---------- Checking ----------
+    def conflicts(self, rows: pd.DataFrame, replaces: int = None) -> pd.DataFrame:
+        """Return the conflicts (CONFLICT_COLUMNS) of normalized manifest rows with the saved history.
+
+        Rows without an index pair or a sample name skip that check; a
+        manifest that is already registered is not checked against itself,
+        nor against the saved manifest it replaces (an earlier draft of it).
+        """
+        conn = self._connect()
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS incoming (row INTEGER, batch TEXT, sample TEXT, i5 TEXT, i7 TEXT)")
+        try:
+            conn.executemany(
+                "INSERT INTO incoming VALUES (?, ?, ?, ?, ?)",
+                rows[["row", "batch", "sample", "i5", "i7"]].itertuples(index=False, name=None),
+            )
+            own = conn.execute("SELECT id FROM manifests WHERE digest = ?", (manifest_digest(rows),)).fetchone()
+            own = own[0] if own else -1
+            found = conn.execute(
+                """
+                SELECT n.row, n.sample, n.batch, n.i5, n.i7, 'index pair already used in this batch',
+                       s.batch, s.sample, m.file, m.saved
+                FROM incoming n
+                JOIN samples s ON s.batch = n.batch AND s.i5 = n.i5 AND s.i7 = n.i7
+                JOIN manifests m ON m.id = s.manifest
+                WHERE (n.i5 != '' OR n.i7 != '') AND s.manifest NOT IN (?, ?)
+                UNION ALL
+                SELECT n.row, n.sample, n.batch, n.i5, n.i7, 'sample already sequenced',
+                       s.batch, s.sample, m.file, m.saved
+                FROM incoming n
+                JOIN samples s ON s.sample = n.sample
+                JOIN manifests m ON m.id = s.manifest
+                WHERE n.sample != '' AND s.manifest NOT IN (?, ?)
+                ORDER BY 1
+                """,
+                (own, replaces or -1, own, replaces or -1),
+            ).fetchall()
+        finally:
+            # The inserts opened a transaction; end it so the next check reads the current history
+            conn.execute("DELETE FROM incoming")
+            conn.rollback()
+        report = pd.DataFrame(found, columns=CONFLICT_COLUMNS)
+        report["saved"] = pd.to_datetime(report["saved"], unit="s").dt.strftime("%Y-%m-%d %H:%M")
+        return report
+
+    # ---------- Recording ----------
+    def record(self, rows: pd.DataFrame, file: str = None, replaces: int = None) -> int:
+        """Store normalized manifest rows and return the manifest id (the existing one if already saved).
+
+        replaces is the id of an earlier draft of the same manifest; it is
+        removed in the same transaction.
+        """
+        digest = manifest_digest(rows)
+        batches = rows["batch"].unique()
+        with self._connect() as conn:
+            existing = conn.execute("SELECT id FROM manifests WHERE digest = ?", (digest,)).fetchone()
+            if existing:
+                manifest_id = existing[0]
+            else:
+                manifest_id = conn.execute(
+                    "INSERT INTO manifests (digest, batch, file, samples, saved) VALUES (?, ?, ?, ?, ?)",
+                    (digest, ", ".join(batches), file, len(rows), time.time()),
+                ).lastrowid
+                conn.executemany(
+                    "INSERT INTO samples (manifest, batch, sample, i5, i7) VALUES (?, ?, ?, ?, ?)",
+                    [(manifest_id, *values) for values in rows[["batch", "sample", "i5", "i7"]].itertuples(index=False, name=None)],
+                )
+            if replaces is not None and replaces != manifest_id:
+                conn.execute("DELETE FROM manifests WHERE id = ?", (replaces,))
+        return manifest_id
+
+    def forget(self, manifest_id: int) -> None:
+        """Remove a saved manifest (e.g. a run that was never sequenced)."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM manifests WHERE id = ?", (manifest_id,))
+
+    def history(self) -> pd.DataFrame:
+        """Saved manifests, newest first."""
+        history = pd.read_sql_query(
+            "SELECT id, batch, file, samples, saved FROM manifests ORDER BY saved DESC", self._connect()
+        )
+        history["saved"] = pd.to_datetime(history["saved"], unit="s").dt.strftime("%Y-%m-%d %H:%M")
+        return history
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Register final manifests and report conflicts with earlier runs.")
+    parser.add_argument("paths", nargs="+", help="Final manifest CSVs (batch, i5, i7 and a sample name column)")
+    parser.add_argument("--sample-column", required=True)
+    parser.add_argument("--check-only", action="store_true", help="Report conflicts without registering")
+    parser.add_argument("--db", default=DEFAULT_PATH, type=Path)
+    args = parser.parse_args()
+
+    registry = IndexRegistry(args.db)
+    failed = False
+    for path in map(Path, args.paths):
+        rows = normalize(pd.read_csv(path), args.sample_column)
+        found = registry.conflicts(rows)
+        if not found.empty:
+            failed = True
+            print(f"{path.name}: {len(found)} conflict(s)")
+            print(found.to_string(index=False))
+        if not args.check_only:
+            registry.record(rows, path.name)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import csv
+from datetime import datetime
+from io import BytesIO, StringIO
+from zipfile import ZipFile
+
+import numpy as np
+import openpyxl as xl
+import pandas as pd
+
+import form_templates
+import metrics
+import plate_layout
+
+MANIFESTS = metrics.counter("manifests_total", "Manifest generations, by layout (plates, form or submission)", ["layout"])
+MANIFEST_SECONDS = metrics.histogram("manifest_seconds", "Seconds to generate the manifests of a workbook, by layout", ["layout"])
+
+
+# ---------- Plate manifests (Create_manifest) ----------
+def read_excel(file):
+    """Return the active sheet of a workbook (path or file-like), formulas evaluated."""
+    wb = xl.load_workbook(file, data_only=True)
+    return wb.active
+
+
+@metrics.timed(MANIFESTS, MANIFEST_SECONDS, layout="plates")
+def generate_manifests(sheet, today: str = None):
+    """Return [(filename, rows)] with one Name / Well / Matrix Type manifest per 96-well plate."""
+    today = today or datetime.now().strftime('%Y.%m.%d')
+    sample_count = len(sheet['C']) - 36
+    plate_count = int(sample_count / 96)
+
+    project_id = str(sheet['D15'].value)
+    matrix_type = sheet['D27'].value
+
+    csv_files = []
+
+    # The sheet lists each 96-well plate column-wise from row 37; the manifest lists it row-wise
+    wells = np.arange(86)
+    for plate_num in range(1, plate_count + 1):
+        csv_data = [["Name", "Well", "Matrix Type"]]
+
+        sheet_rows = plate_layout.positions(plate_num, wells) + 37
+        for row_index in sheet_rows.tolist():
+            name = sheet.cell(row=row_index, column=2).value
+            well = sheet.cell(row=row_index, column=1).value
+            csv_data.append([name, well, matrix_type])
+
+        plate_str = f'P{plate_num:02}'
+        filename = f"{today}_{project_id}_{plate_str}_Manifest.csv"
+
+        # Append data as (filename, list of rows)
+        csv_files.append((filename, csv_data))
+
+    return csv_files
+
+
+def create_zip(csv_files):
+    """Return a BytesIO holding one CSV per (filename, rows) pair."""
+    zip_buffer = BytesIO()
+    with ZipFile(zip_buffer, "w") as zip_file:
+        for filename, data in csv_files:
+            # Use StringIO to write text CSV content
+            text_stream = StringIO()
+            writer = csv.writer(text_stream)
+            for row in data:
+                writer.writerow(row)
+            # Encode to bytes before writing to ZIP
+            zip_file.writestr(filename, text_stream.getvalue())
+    zip_buffer.seek(0)
+    return zip_buffer
+
+
+def manifest_zip(data: bytes, today: str = None) -> tuple:
+    """Return (template title or None, manifest count, ZIP bytes) for the bytes of a submission workbook.
+
+    Recognised templates go through form_templates; other workbooks fall
+    back to the fixed plate layout of generate_manifests. Takes and returns
+    plain values so it can run in a background process.
+    """
+    metrics.start_exporter()  # a pool worker process exports its own metrics
+    try:
+        form = form_templates.extract(data)
+    except form_templates.UnknownTemplate:
+        title, csv_files = None, generate_manifests(read_excel(BytesIO(data)), today)
+    else:
+        title, csv_files = form["title"], form_manifests(form, today)
+    return title, len(csv_files), create_zip(csv_files).getvalue()
+
+
+# ---------- Manifests from detected templates (form_templates) ----------
+@metrics.timed(MANIFESTS, MANIFEST_SECONDS, layout="form")
+def form_manifests(form: dict, today: str = None) -> list:
+    """Return [(filename, rows)] for a form read by form_templates.extract.
+
+    Plate forms give one Name / Well / Matrix Type manifest per plate that
+    has samples, wells in row-major order; the library form gives one
+    sample_well_location / Sample_name / Container_name manifest.
+    Wells without a sample name are left out; a form without any gives
+    no manifests.
+    """
+    samples = form["samples"]
+    # astype(bool): mapping an empty frame gives an object Series, which would select columns
+    samples = samples[samples["name"].map(lambda v: v is not None and str(v).strip() != "").astype(bool)]
+    if samples.empty:
+        return []
+    fields = form["fields"]
+
+    if form["manifest"] == "submission":
+        rows = [["sample_well_location", "Sample_name", "Container_name"]]
+        rows += samples[["well", "name", "container_name"]].values.tolist()
+        return [(submission_filename(fields.get("quote_number")), rows)]
+
+    today = today or datetime.now().strftime('%Y.%m.%d')
+    project_id = str(fields.get("quote_number"))
+    csv_files = []
+    for plate, plate_samples in samples.groupby("plate", sort=True):
+        plate_samples = plate_samples.iloc[plate_layout.sort_key(plate_samples["well"]).argsort(kind="stable")]
+        rows = [["Name", "Well", "Matrix Type"]]
+        rows += [[name, well, fields.get("sample_type")] for name, well in zip(plate_samples["name"], plate_samples["well"])]
+        csv_files.append((f"{today}_{project_id}_P{plate:02}_Manifest.csv", rows))
+    return csv_files
+
+
+# ---------- Submission form manifest (SampleSubmissionFormToManifest) ----------
+@metrics.timed(MANIFESTS, MANIFEST_SECONDS, layout="submission")
+def submission_manifest(df: pd.DataFrame) -> tuple:
+    """Return (quote number or None, manifest) from a parsed submission form sheet.
+
+    The quote number is cell C5; samples start on row 11 with names in
+    column A, container names in column M and well locations in column N.
+    """
+    cell_c5 = df.iloc[3, 2]  # Row 5 (index 4), Column C (index 2)
+    quote_number = None if pd.isna(cell_c5) else cell_c5
+
+    # Extract data from row 11 onwards
+    start_row = 10  # Row 11 (0-based index)
+    sample_names = df.iloc[start_row:, 0].dropna()  # Column A:A
+    container_names = df.iloc[start_row: start_row + len(sample_names), 12]  # Column M:M
+    well_locations = df.iloc[start_row: start_row + len(sample_names), 13]  # Column N:N
+
+    result_df = pd.DataFrame({
+        "sample_well_location": well_locations.values,
+        "Sample_name": sample_names.values,
+        "Container_name": container_names.values
+    })
+    return quote_number, result_df
+
+
+def submission_filename(quote_number) -> str:
+    """Return the manifest file name for a quote number (None when C5 is empty)."""
+    return f"{quote_number if quote_number is not None else 'no quote number found'}_sample_manifest.csv"
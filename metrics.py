@@ -0,0 +1,406 @@
+"""Counters and latency histograms for the tools, exported in the Prometheus text format.
+
+Metrics live in the process (every Streamlit session of a server shares
+them) and cost a dict update under a per-metric lock to record. Each
+process that calls start_exporter() rewrites its own
+cache/metrics/<pid>.prom every EXPORT_INTERVAL seconds. When it exits
+(or its file is found stale with the process gone) its last values are
+folded into cache/metrics/retired.prom, so the summed view for
+Prometheus never drops a finished process's share, which would read as
+a counter reset:
+
+    python metrics.py                 # print the merged metrics
+    python metrics.py --serve 9464    # serve them at http://localhost:9464/metrics
+
+api_server also answers GET /metrics with its own process's metrics.
+
+    QUOTES = metrics.counter("quotes_total", "Quotes computed", ["account"])
+    QUOTES.inc(account="Internal")
+    with QUOTE_SECONDS.time():
+        ...
+"""
+import argparse
+import atexit
+import bisect
+import contextlib
+import functools
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock around the retired totals
+    fcntl = None
+
+from annotation_cache import CACHE_DIR
+
+METRICS_DIR = Path(os.environ.get("METRICS_DIR", CACHE_DIR / "metrics"))
+EXPORT_INTERVAL = 15
+
+# Files not rewritten for this long are checked for a process that died without retiring them
+STALE_AFTER = 5 * EXPORT_INTERVAL
+
+# Summed metrics of every process that has exited
+RETIRED_FILE = "retired.prom"
+
+# Every metric name starts with this
+PREFIX = "tools_"
+
+# Seconds; spans a cached quote to a whole-proteome comparison
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# ---------- Metrics ----------
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names, values) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+def _number(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Counter:
+    """A monotonically increasing count per label combination."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels[n] for n in self.labels)
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> list:
+        """[(sample name, label names, label values, value)]"""
+        with self._lock:
+            return [(self.name, self.labels, key, value) for key, value in self._values.items()]
+
+
+class Histogram:
+    """Observation counts per upper bound, plus their sum and count, per label combination."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(labels[n] for n in self.labels)
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][slot] += 1
+            state[1] += value
+            state[2] += 1
+
+    def time(self, **labels):
+        """Context manager observing the seconds its block takes."""
+        return _Timer(self, labels)
+
+    def samples(self) -> list:
+        with self._lock:
+            values = [(key, list(counts), total, n) for key, (counts, total, n) in self._values.items()]
+        samples = []
+        names = self.labels + ("le",)
+        for key, counts, total, n in values:
+            running = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                running += count
+                samples.append((f"{self.name}_bucket", names, key + (_number(bound),), running))
+            samples.append((f"{self.name}_sum", self.labels, key, total))
+            samples.append((f"{self.name}_count", self.labels, key, n))
+        return samples
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: dict):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def _get_or_create(cls, name: str, *args, **kwargs):
+    # Streamlit reruns app scripts, so defining a metric again returns the existing one
+    name = PREFIX + name
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = _registry[name] = cls(name, *args, **kwargs)
+        return metric
+
+
+def counter(name: str, help: str, labels=()) -> Counter:
+    return _get_or_create(Counter, name, help, labels)
+
+
+def histogram(name: str, help: str, labels=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+    return _get_or_create(Histogram, name, help, labels, buckets)
+
+
+def timed(calls: Counter, seconds: Histogram, **labels):
+    """Decorator counting the calls of a function and observing the seconds each takes."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            calls.inc(**labels)
+            with seconds.time(**labels):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# ---------- Exposition ----------
+def render(extra_labels: dict = None) -> str:
+    """Every metric of this process in the Prometheus text format; extra_labels are added to each sample."""
+    extra_names = tuple(extra_labels or ())
+    extra_values = tuple((extra_labels or {}).values())
+    lines = []
+    with _registry_lock:
+        metrics = sorted(_registry.values(), key=lambda m: m.name)
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, label_names, label_values, value in metric.samples():
+            lines.append(f"{name}{_label_text(label_names + extra_names, label_values + extra_values)} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+_SAMPLE = re.compile(r'^(?P<name>[a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(?P<labels>.*)\})? (?P<value>\S+)$')
+_LABEL = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+
+
+def merge(texts, drop_labels=("pid",)) -> str:
+    """Sum the samples of several exposition texts, ignoring drop_labels (e.g. one text per process)."""
+    meta = {}
+    totals = {}
+    for text in texts:
+        for line in text.splitlines():
+            if line.startswith("# "):
+                parts = line.split(" ", 3)
+                if len(parts) == 4:
+                    meta.setdefault(parts[2], {})[parts[1]] = parts[3]
+                continue
+            match = _SAMPLE.match(line)
+            if not match:
+                continue
+            labels = tuple((k, v) for k, v in _LABEL.findall(match["labels"] or "") if k not in drop_labels)
+            key = (match["name"], labels)
+            totals[key] = totals.get(key, 0.0) + float(match["value"])
+
+    lines = []
+    for family in sorted(meta):
+        lines.append(f"# HELP {family} {meta[family].get('HELP', '')}")
+        lines.append(f"# TYPE {family} {meta[family].get('TYPE', 'untyped')}")
+        suffixes = ("", "_bucket", "_sum", "_count")
+        for (name, labels), value in totals.items():
+            if any(name == family + s for s in suffixes):
+                label_text = "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}" if labels else ""
+                lines.append(f"{name}{label_text} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def _alive(pid: int) -> bool:
+    if os.name != "posix":
+        return True  # no cheap check; the file waits for its process to retire it
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+@contextlib.contextmanager
+def _locked(directory: Path, exclusive: bool):
+    """Hold the metrics directory's lock: shared to read the files, exclusive to retire one."""
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / ".lock", "a") as handle:
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        yield  # closing the file releases the lock
+
+
+def retire(path: Path, directory: Path = METRICS_DIR) -> bool:
+    """Fold a process's exported file into the retired totals and remove it; False if already retired."""
+    directory = Path(directory)
+    retired = directory / RETIRED_FILE
+    with _locked(directory, exclusive=True):
+        try:
+            text = Path(path).read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return False
+        previous = retired.read_text(encoding="utf-8") if retired.exists() else ""
+        tmp = retired.with_suffix(".tmp")
+        tmp.write_text(merge([previous, text]), encoding="utf-8")
+        os.replace(tmp, retired)
+        Path(path).unlink()
+    return True
+
+
+def merged_files(directory: Path = METRICS_DIR, stale_after: float = STALE_AFTER) -> str:
+    """The summed metrics of every process that exported here, exited ones included."""
+    directory = Path(directory)
+    now = time.time()
+    for path in directory.glob("*.prom"):
+        if not path.stem.isdigit():
+            continue
+        try:
+            stale = now - path.stat().st_mtime > stale_after
+        except OSError:
+            continue  # retired by its exiting process meanwhile
+        if stale and not _alive(int(path.stem)):
+            retire(path, directory)
+
+    texts = []
+    with _locked(directory, exclusive=False):
+        for path in directory.glob("*.prom"):
+            try:
+                texts.append(path.read_text(encoding="utf-8"))
+            except OSError:
+                continue
+    return merge(texts)
+
+
+# ---------- Export ----------
+_exporter = None
+_exporter_lock = threading.Lock()
+
+
+def write_textfile(path: Path) -> None:
+    """Write this process's metrics (labelled with its pid) to path, atomically."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(render({"pid": os.getpid()}), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def start_exporter(directory: Path = METRICS_DIR, interval: float = EXPORT_INTERVAL) -> None:
+    """Export this process's metrics to <directory>/<pid>.prom every interval seconds (once per process).
+
+    At exit the final values are written and retired.
+    """
+    global _exporter
+    with _exporter_lock:
+        if _exporter is not None:
+            return
+        path = Path(directory) / f"{os.getpid()}.prom"
+        stopped = threading.Event()
+        writing = threading.Lock()
+
+        def loop():
+            while not stopped.is_set():
+                with writing:
+                    # Never rewrite the file once it has been retired
+                    if stopped.is_set():
+                        break
+                    try:
+                        write_textfile(path)
+                    except OSError:
+                        pass
+                stopped.wait(interval)
+
+        def finish():
+            with writing:
+                stopped.set()
+                try:
+                    write_textfile(path)
+                    retire(path, directory)
+                except OSError:
+                    pass
+
+        _exporter = threading.Thread(target=loop, name="metrics-exporter", daemon=True)
+        _exporter.start()
+        atexit.register(finish)
+
+
+APP_RUNS = counter("app_runs_total", "Script runs (page loads and widget interactions) per app", ["app"])
+
+# Shared by the comparison engines; kind is panels, coverage, files or workbooks
+COMPARISONS = counter("comparisons_total", "Comparisons run, by kind", ["kind"])
+COMPARISON_SECONDS = histogram("comparison_seconds", "Seconds spent computing a comparison (queue wait excluded), by kind", ["kind"])
+
+
+def app_run(app: str) -> None:
+    """Count a run of an app script and make sure this process exports its metrics."""
+    APP_RUNS.inc(app=app)
+    start_exporter()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print or serve the metrics of every tools process on this host.")
+    parser.add_argument("--dir", type=Path, default=METRICS_DIR)
+    parser.add_argument("--serve", type=int, metavar="PORT", help="Serve GET /metrics on this port instead of printing")
+    parser.add_argument("--host", default="127.0.0.1")
+    args = parser.parse_args()
+
+    if args.serve is None:
+        print(merged_files(args.dir), end="")
+        return
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") != "/metrics":
+                self.send_error(404)
+                return
+            payload = merged_files(args.dir).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    server = ThreadingHTTPServer((args.host, args.serve), Handler)
+    print(f"Serving merged metrics on http://{args.host}:{args.serve}/metrics")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+import data_access
+
+# ---------- Paths ----------
+APP_DIR = data_access.APP_DIR
+DATA_DIR = data_access.DATA_DIR
+
+# Every preloaded panel carries this column
+KEY_COLUMN = "UniProt ID"
+
+
+# ---------- Catalog ----------
+def list_panels(data_dir: Path = DATA_DIR) -> list:
+    """Return the sorted file names of the preloaded panel CSVs."""
+    data_dir = Path(data_dir)
+    if not data_dir.exists():
+        return []
+    return sorted(p.name for p in data_dir.glob("*.csv"))
+
+
+def catalog_signature(data_dir: Path = DATA_DIR) -> tuple:
+    """Return (name, mtime) pairs for the catalog, usable as a cache key."""
+    data_dir = Path(data_dir)
+    return tuple((name, (data_dir / name).stat().st_mtime_ns) for name in list_panels(data_dir))
+
+
+def load_panel_keys(path: Path, key_column: str = KEY_COLUMN) -> np.ndarray:
+    """Return the unique, stripped identifiers found in one panel's key column."""
+    df = data_access.panel(path, usecols=[key_column])
+    keys = df[key_column].dropna().str.strip()
+    return keys[keys != ""].unique()
+
+
+# ---------- Overlap ----------
+def build_membership_matrix(data_dir: Path = DATA_DIR, key_column: str = KEY_COLUMN):
+    """Return (proteins, panels, matrix) for the whole catalog.
+
+    matrix is a sparse boolean protein x panel matrix in CSC format where
+    matrix[i, j] is True when proteins[i] is measured by panels[j].
+    """
+    data_dir = Path(data_dir)
+    panels = []
+    panel_keys = []
+    for name in list_panels(data_dir):
+        try:
+            keys = load_panel_keys(data_dir / name, key_column)
+        except ValueError:
+            # File has no key column; it cannot take part in the overlap
+            continue
+        panels.append(name)
+        panel_keys.append(keys)
+
+    if not panels:
+        return np.array([], dtype=object), [], sparse.csc_matrix((0, 0), dtype=bool)
+
+    proteins, rows = np.unique(np.concatenate(panel_keys), return_inverse=True)
+    cols = np.repeat(np.arange(len(panels)), [len(k) for k in panel_keys])
+    data = np.ones(len(rows), dtype=bool)
+    matrix = sparse.csc_matrix((data, (rows, cols)), shape=(len(proteins), len(panels)), dtype=bool)
+    return proteins, panels, matrix
+
+
+def overlap_matrices(matrix) -> tuple:
+    """Return dense (intersection, jaccard) panel x panel arrays.
+
+    All pairwise intersection sizes come from a single sparse product
+    M^T M; the diagonal holds each panel's size, from which the unions
+    and Jaccard indices follow without touching the protein axis again.
+    """
+    counts = matrix.astype(np.int32)
+    intersection = (counts.T @ counts).toarray()
+    sizes = np.diag(intersection)
+    union = sizes[:, None] + sizes[None, :] - intersection
+    jaccard = np.divide(
+        intersection, union, out=np.zeros(intersection.shape, dtype=float), where=union > 0
+    )
+    return intersection, jaccard
+
+
+def panel_overlap_table(data_dir: Path = DATA_DIR, key_column: str = KEY_COLUMN) -> pd.DataFrame:
+    """Return a long table with one row per ordered panel pair.
+
+    Columns: Panel A, Panel B, Size A, Size B, Intersection, Union, Jaccard.
+    """
+    _, panels, matrix = build_membership_matrix(data_dir, key_column)
+    intersection, jaccard = overlap_matrices(matrix)
+    sizes = np.diag(intersection)
+
+    n = len(panels)
+    a_idx, b_idx = np.meshgrid(np.arange(n), np.arange(n), indexing="ij")
+    a_idx, b_idx = a_idx.ravel(), b_idx.ravel()
+    names = np.array(panels, dtype=object)
+    return pd.DataFrame({
+        "Panel A": names[a_idx],
+        "Panel B": names[b_idx],
+        "Size A": sizes[a_idx],
+        "Size B": sizes[b_idx],
+        "Intersection": intersection.ravel(),
+        "Union": sizes[a_idx] + sizes[b_idx] - intersection.ravel(),
+        "Jaccard": jaccard.ravel().round(4),
+    })
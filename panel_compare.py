@@ -0,0 +1,231 @@
+import numpy as np
+import pandas as pd
+
+import metrics
+import protein_ids
+
+
+# Rows per chunk when streaming an uploaded reference file
+CHUNK_ROWS = 100_000
+
+
+# ---------- Matching ----------
+def find_common_items(original_df: pd.DataFrame, custom_df: pd.DataFrame, key_column: str) -> pd.DataFrame:
+    """Return rows from original_df whose key_column appears in custom_df[key_column]."""
+    # compare as strings to reduce false negatives due to type mismatch
+    query = custom_df[key_column].astype(str).unique()
+    return original_df[original_df[key_column].astype(str).isin(query).to_numpy()]
+
+
+def find_common_items_normalized(original_df: pd.DataFrame, query: frozenset, key_column: str, aliases: pd.Series) -> pd.DataFrame:
+    """Return rows from original_df whose key_column resolves to any of the query keys
+    (case/whitespace-insensitive, isoforms stripped, Gene/Protein name aliases applied)."""
+    return original_df[protein_ids.match_mask(original_df[key_column], query, aliases)]
+
+
+# ---------- Streamed references ----------
+def _rewind(source) -> None:
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+
+def csv_columns(source) -> list:
+    """Header of a CSV path or seekable file, without reading any rows."""
+    _rewind(source)
+    return list(pd.read_csv(source, nrows=0).columns)
+
+
+def stream_common_items(source, custom_df: pd.DataFrame, key_column: str, aliases: pd.Series = None,
+                        query: frozenset = None, chunksize: int = CHUNK_ROWS) -> pd.DataFrame:
+    """find_common_items / find_common_items_normalized over a CSV that is never loaded whole.
+
+    The file is parsed in chunks of rows and only the matching rows of
+    each chunk are kept, so peak memory follows the chunk size and the
+    number of matches, not the size of the file. key_column is read as
+    text. The result is indexed by parsed row position (blank lines and
+    quoted line breaks do not shift it).
+    """
+    if aliases is None:
+        exact = frozenset(custom_df[key_column].astype(str).unique())
+    elif query is None:
+        query = protein_ids.query_keys(custom_df[key_column], aliases)
+
+    _rewind(source)
+    matches = []
+    offset = 0
+    for chunk in pd.read_csv(source, dtype={key_column: str}, chunksize=chunksize):
+        keys = chunk[key_column]
+        if aliases is None:
+            mask = keys.astype(str).isin(exact).to_numpy()
+        else:
+            mask = protein_ids.match_mask(keys, query, aliases)
+        chunk.index = np.arange(offset, offset + len(chunk))
+        offset += len(chunk)
+        matches.append(chunk[mask])
+    if not matches:
+        _rewind(source)
+        return pd.read_csv(source, nrows=0)
+    return pd.concat(matches) if len(matches) > 1 else matches[0]
+
+
+# ---------- Comparison ----------
+@metrics.timed(metrics.COMPARISONS, metrics.COMPARISON_SECONDS, kind="panels")
+def compare_sources(sources: list, custom_df: pd.DataFrame, key_column: str, aliases: pd.Series = None,
+                    row_keys: dict = None, progress=None) -> tuple:
+    """Compare the custom list against every (name, DataFrame or CSV) source.
+
+    A source given as a CSV path or seekable file (e.g. an upload) is
+    streamed with stream_common_items rather than loaded.
+    With an alias table the comparison is normalized, otherwise exact.
+    row_keys may hold precomputed protein_ids.concept_keys of a source's key
+    column (by source name), sparing the per-call normalization.
+    progress(done, total, name), if given, is called before each source.
+    Returns (results, skipped, errors): results are (name, match count,
+    matching rows) sorted by matches descending, skipped the sources
+    without key_column and errors (name, message) pairs.
+    """
+    results = []
+    skipped = []
+    errors = []
+
+    query = None
+    if aliases is not None:
+        query = protein_ids.query_keys(custom_df[key_column], aliases)
+
+    for i, (name, original_df) in enumerate(sources):
+        if progress is not None:
+            progress(i, len(sources), name)
+        streamed = not isinstance(original_df, pd.DataFrame)
+        try:
+            columns = csv_columns(original_df) if streamed else original_df.columns
+        except Exception as e:
+            errors.append((name, str(e)))
+            continue
+        if key_column not in columns:
+            skipped.append(name)
+            continue
+        try:
+            if streamed:
+                common = stream_common_items(original_df, custom_df, key_column, aliases, query)
+            elif aliases is not None and row_keys and name in row_keys:
+                common = original_df[protein_ids.keys_mask(row_keys[name], len(original_df), query)]
+            elif aliases is not None:
+                common = find_common_items_normalized(original_df, query, key_column, aliases)
+            else:
+                common = find_common_items(original_df, custom_df, key_column)
+            results.append((name, len(common), common))
+        except Exception as e:
+            errors.append((name, str(e)))
+
+    # Sort by matches desc
+    results.sort(key=lambda x: x[1], reverse=True)
+    return results, skipped, errors
+
+
+# ---------- Batch coverage ----------
+COVERAGE_COLUMNS = ["List", "Panel", "Items", "Covered", "Coverage", "Matches"]
+DETAIL_COLUMNS = ["List", "Panel", "Item", "Panel row", "Panel key"]
+
+
+def _item_keys(values: pd.Series, aliases: pd.Series = None) -> pd.Series:
+    """Lookup keys of values, indexed by row position: concept keys when normalizing, else the exact text."""
+    values = values.reset_index(drop=True)
+    if aliases is not None:
+        return protein_ids.concept_keys(values, aliases)
+    return values.dropna().astype(str)
+
+
+def panel_index(sources: list, key_column: str, aliases: pd.Series = None, row_keys: dict = None) -> tuple:
+    """Return (panels, index) for (name, DataFrame) sources that have key_column.
+
+    index is one long (key, panel, row) table over every panel, so a batch
+    of lists is matched with a single join however many panels there are.
+    """
+    panels = []
+    parts = []
+    for name, df in sources:
+        if key_column not in df.columns:
+            continue
+        keys = row_keys[name] if aliases is not None and row_keys and name in row_keys else _item_keys(df[key_column], aliases)
+        parts.append(pd.DataFrame({"key": keys.to_numpy(), "panel": len(panels), "row": keys.index.to_numpy()}))
+        panels.append(name)
+    if not parts:
+        return panels, pd.DataFrame({"key": pd.Series(dtype=str), "panel": pd.Series(dtype=int), "row": pd.Series(dtype=int)})
+    return panels, pd.concat(parts, ignore_index=True).drop_duplicates()
+
+
+@metrics.timed(metrics.COMPARISONS, metrics.COMPARISON_SECONDS, kind="coverage")
+def coverage_matrix(lists: list, sources: list, key_column: str, aliases: pd.Series = None,
+                    row_keys: dict = None) -> tuple:
+    """Match many (name, DataFrame) custom lists against every source at once.
+
+    All list items are stacked into one (list, item, key) table and joined
+    with the shared panel_index, so the work grows with the total query
+    size and the number of hits rather than with lists x panels.
+    Returns (coverage, details, skipped): coverage has one row per list and
+    panel (COVERAGE_COLUMNS; Items are the list's distinct non-blank values,
+    Covered those found in the panel, Matches the panel rows matched),
+    details one row per matched item and panel row (DETAIL_COLUMNS), and
+    skipped the lists and panels without key_column.
+    """
+    panels, index = panel_index(sources, key_column, aliases, row_keys)
+    skipped = [name for name, df in sources if key_column not in df.columns]
+
+    names = []
+    item_parts = []
+    key_parts = []
+    for name, df in lists:
+        if key_column not in df.columns:
+            skipped.append(name)
+            continue
+        values = df[key_column].dropna().astype(str).str.strip()
+        items = pd.Series(values[values != ""].unique())
+        keys = _item_keys(items, aliases)
+        item_parts.append(pd.DataFrame({"list": len(names), "item": items}))
+        key_parts.append(pd.DataFrame({"list": len(names), "item": items.to_numpy()[keys.index], "key": keys.to_numpy()}))
+        names.append(name)
+
+    if not names or not panels:
+        return pd.DataFrame(columns=COVERAGE_COLUMNS), pd.DataFrame(columns=DETAIL_COLUMNS), skipped
+
+    items = pd.concat(item_parts, ignore_index=True)
+    hits = pd.concat(key_parts, ignore_index=True).merge(index, on="key")[["list", "panel", "item", "row"]].drop_duplicates()
+
+    sizes = items.groupby("list").size().reindex(range(len(names)), fill_value=0).to_numpy()
+    covered = np.zeros((len(names), len(panels)), dtype=int)
+    matches = np.zeros((len(names), len(panels)), dtype=int)
+    if not hits.empty:
+        pairs = hits.groupby(["list", "panel"])
+        found = pairs["item"].nunique()
+        covered[found.index.get_level_values(0), found.index.get_level_values(1)] = found.to_numpy()
+        rows = pairs["row"].nunique()
+        matches[rows.index.get_level_values(0), rows.index.get_level_values(1)] = rows.to_numpy()
+
+    list_idx, panel_idx = np.meshgrid(np.arange(len(names)), np.arange(len(panels)), indexing="ij")
+    list_idx, panel_idx = list_idx.ravel(), panel_idx.ravel()
+    list_names = np.array(names, dtype=object)
+    panel_names = np.array(panels, dtype=object)
+    coverage = pd.DataFrame({
+        "List": list_names[list_idx],
+        "Panel": panel_names[panel_idx],
+        "Items": sizes[list_idx],
+        "Covered": covered.ravel(),
+        "Coverage": np.divide(covered.ravel(), sizes[list_idx], out=np.zeros(len(list_idx)),
+                              where=sizes[list_idx] > 0).round(4),
+        "Matches": matches.ravel(),
+    })
+
+    hits = hits.sort_values(["list", "panel", "row"], kind="stable")
+    rows = hits["row"].to_numpy()
+    key_values = [df[key_column].to_numpy(dtype=object) for _, df in sources if key_column in df.columns]
+    panel_key = np.empty(len(hits), dtype=object)
+    for j, positions in hits.groupby("panel").indices.items():
+        panel_key[positions] = key_values[j][rows[positions]]
+    details = pd.DataFrame({
+        "List": list_names[hits["list"].to_numpy()],
+        "Panel": panel_names[hits["panel"].to_numpy()],
+        "Item": hits["item"].to_numpy(),
+        "Panel row": rows + 1,
+        "Panel key": panel_key,
+    })
+    return coverage, details, skipped
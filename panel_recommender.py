@@ -0,0 +1,232 @@
+import itertools
+import math
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import data_access
+import panel_catalog
+import protein_ids
+
+# Relative to the app directory, as are the "Prices File" entries in categories.csv
+CATEGORIES_FILE = Path("olink_cost_files/categories.csv")
+RULES_FILE = Path("olink_cost_files/pricing_rules.csv")
+
+# Preloaded panel file -> "Panel Name" in the olink_cost_files prices files
+PANEL_PRICE_NAMES = {
+    "Alamar_CNS_120.csv": "Nulisa CNS",
+    "Alamar_Inf_250-AQ_measures.csv": "Nulisa Inf AQ",
+    "Alamar_Inf_250.csv": "Nulisa Inf",
+    "Olink_Explore_384_Cardio.csv": "Cardiometabolic I",
+    "Olink_Explore_384_Cardio_II.csv": "Cardiometabolic II",
+    "Olink_Explore_384_Inf.csv": "Inflammation I",
+    "Olink_Explore_384_Inf_II.csv": "Inflammation II",
+    "Olink_Explore_384_Neuro.csv": "Neurology I",
+    "Olink_Explore_384_Neuro_II.csv": "Neurology II",
+    "Olink_Explore_384_Onc.csv": "Oncology I",
+    "Olink_Explore_384_OncII.csv": "Oncology II",
+    "Olink_Explore_3K.csv": "Explore 3k",
+    "Olink_Explore_HT.csv": "Explore HT (86)",
+    "Olink_Explore_Reveal.csv": "Reveal",
+    "Olink_Flex.csv": "Flex 21",
+    "Olink_T48_Cyt.csv": "T48 Cytokine",
+    "Olink_T48_Im_sur.csv": "T48 Immune Surveillance",
+    "Olink_T48_Mouse_cyt.csv": "T48 Mouse Cytokine",
+    "Olink_T96_Cardio.csv": "T96 Cardiometabolic",
+    "Olink_T96_Cardio_II.csv": "T96 Cardiovascular II",
+    "Olink_T96_Cardio_III.csv": "T96 Cardiovascular III",
+    "Olink_T96_Cell_reg.csv": "T96 Cell Regulation",
+    "Olink_T96_Dev.csv": "T96 Development",
+    "Olink_T96_Im_onc.csv": "T96 Immuno-Oncology",
+    "Olink_T96_Im_res.csv": "T96 Immune Response",
+    "Olink_T96_Inf.csv": "T96 Inflammation",
+    "Olink_T96_Met.csv": "T96 Metabolism",
+    "Olink_T96_Mouse_exp.csv": "T96 Mouse Exploratory",
+    "Olink_T96_Neu_exp.csv": "T96 Neuro Exploratory",
+    "Olink_T96_Neuro.csv": "T96 Neurology",
+    "Olink_T96_OncIII.csv": "T96 Oncology III",
+    "Olink_T96_Onc_II.csv": "T96 Oncology II",
+    "Olink_T96_Org_dam.csv": "T96 Organ Damage",
+}
+
+# Exhaustive search is only attempted when this few panels cover anything
+EXACT_MAX_CANDIDATES = 24
+
+
+# ---------- Prices ----------
+def load_panel_prices(account: str = "Internal", app_dir: Path = panel_catalog.APP_DIR) -> dict:
+    """Return {panel file name: price of one batch of its product} for the given account type.
+
+    Panels with no entry in the prices files, or whose product has no price
+    (e.g. SomaScan), are left out.
+    """
+    app_dir = Path(app_dir)
+    categories_df = data_access.read_csv(app_dir / CATEGORIES_FILE, dtype=data_access.CATEGORIES_DTYPES)
+    prices_df = pd.concat(
+        [data_access.prices(app_dir / f) for f in categories_df["Prices File"]], ignore_index=True
+    )
+    rules_df = data_access.read_csv(app_dir / RULES_FILE, dtype=data_access.RULES_DTYPES)
+
+    products = dict(zip(prices_df["Panel Name"].str.strip(), prices_df["Product Name"].str.strip()))
+    unit_prices = dict(zip(rules_df["Product Name"].str.strip(), rules_df[f"{account} Price"]))
+
+    prices = {}
+    for panel_file, panel_name in PANEL_PRICE_NAMES.items():
+        price = unit_prices.get(products.get(panel_name))
+        if price is not None and pd.notna(price):
+            prices[panel_file] = float(price)
+    return prices
+
+
+# ---------- Bitsets ----------
+def panel_key_sets(data_dir: Path = panel_catalog.DATA_DIR, aliases: pd.Series = None,
+                   key_column: str = panel_catalog.KEY_COLUMN) -> dict:
+    """Return {panel file name: frozenset of concept keys} for every preloaded panel."""
+    data_dir = Path(data_dir)
+    if aliases is None:
+        aliases = protein_ids.build_alias_table(data_dir)
+    key_sets = {}
+    for name in panel_catalog.list_panels(data_dir):
+        df = data_access.panel(data_dir / name)
+        if key_column in df.columns:
+            key_sets[name] = frozenset(protein_ids.concept_keys(df[key_column], aliases).tolist())
+    return key_sets
+
+
+def coverage_bitsets(query_values: pd.Series, key_sets: dict, aliases: pd.Series) -> tuple:
+    """Encode each panel's coverage of the query list as an int bitset.
+
+    Returns (items, bitsets) where items are the distinct query values and
+    bit i of bitsets[panel] is set when the panel measures items[i].
+    """
+    items = query_values.dropna().astype(str).str.strip()
+    items = pd.Series(items[items != ""].unique())
+    concepts = protein_ids.concept_keys(items, aliases)
+    rows = concepts.index.to_numpy()
+    keys = concepts.tolist()
+
+    bitsets = {}
+    for name, key_set in key_sets.items():
+        hit = np.zeros(len(items), dtype=bool)
+        hit[rows[np.fromiter((k in key_set for k in keys), dtype=bool, count=len(keys))]] = True
+        bitsets[name] = int.from_bytes(np.packbits(hit, bitorder="little").tobytes(), "little")
+    return items.tolist(), bitsets
+
+
+# ---------- Set cover ----------
+def greedy_cover(bitsets: dict, weights: dict, universe: int, exclude: frozenset = frozenset()) -> list:
+    """Greedy weighted set cover: repeatedly take the panel with most newly covered items per unit weight."""
+    chosen = []
+    covered = 0
+    while covered != universe:
+        best, best_ratio = None, 0.0
+        for name, mask in bitsets.items():
+            if name in exclude or name in chosen:
+                continue
+            gain = (mask & ~covered).bit_count()
+            if gain:
+                ratio = gain / weights[name]
+                if ratio > best_ratio:
+                    best, best_ratio = name, ratio
+        if best is None:
+            break
+        chosen.append(best)
+        covered |= bitsets[best]
+    return chosen
+
+
+def _non_dominated(bitsets: dict, weights: dict) -> dict:
+    """Drop empty panels and panels whose coverage another panel matches for no more weight."""
+    kept = {}
+    for name, mask in bitsets.items():
+        if not mask:
+            continue
+        dominated = False
+        for other, other_mask in bitsets.items():
+            if other == name or mask & ~other_mask or weights[other] > weights[name]:
+                continue
+            # other covers everything name covers, for no more weight; ties keep one panel only
+            if other_mask != mask or weights[other] < weights[name] or other < name:
+                dominated = True
+                break
+        if not dominated:
+            kept[name] = mask
+    return kept
+
+
+def exact_covers(bitsets: dict, weights: dict, max_panels: int, top: int) -> list:
+    """Enumerate every combination of up to max_panels candidate panels; return the best `top`."""
+    candidates = _non_dominated(bitsets, weights)
+    if len(candidates) > EXACT_MAX_CANDIDATES:
+        return []
+    names = sorted(candidates)
+    scored = []
+    for size in range(1, min(max_panels, len(names)) + 1):
+        for combo in itertools.combinations(names, size):
+            mask = 0
+            for name in combo:
+                mask |= candidates[name]
+            scored.append((-mask.bit_count(), sum(weights[n] for n in combo), combo))
+    scored.sort()
+    return [list(combo) for _, _, combo in scored[:top]]
+
+
+def recommend_panels(query_values: pd.Series, key_sets: dict, aliases: pd.Series, prices: dict = None,
+                     max_panels: int = 4, exact: bool = True, top: int = 10) -> tuple:
+    """Return (ranking, uncovered) for the query list.
+
+    ranking is a DataFrame of panel combinations sorted by coverage, then cost
+    (when prices are given; unpriced panels are left out) or panel count.
+    uncovered lists query items that no candidate panel measures.
+    """
+    items, bitsets = coverage_bitsets(query_values, key_sets, aliases)
+    if prices is not None:
+        bitsets = {name: mask for name, mask in bitsets.items() if name in prices}
+        weights = {name: prices[name] for name in bitsets}
+    else:
+        weights = {name: 1.0 for name in bitsets}
+
+    universe = 0
+    for mask in bitsets.values():
+        universe |= mask
+    uncovered = [items[i] for i in range(len(items)) if not (universe >> i) & 1]
+
+    combos = []
+    greedy = greedy_cover(bitsets, weights, universe)
+    if greedy:
+        combos.append((greedy, "Greedy"))
+        # Alternatives: re-run greedy without each panel of the first answer
+        for name in greedy:
+            alternative = greedy_cover(bitsets, weights, universe, exclude=frozenset([name]))
+            if alternative:
+                combos.append((alternative, "Greedy (alternative)"))
+    if exact:
+        combos.extend((combo, "Exact") for combo in exact_covers(bitsets, weights, max_panels, top))
+
+    rows = []
+    seen = set()
+    for combo, method in combos:
+        key = frozenset(combo)
+        if key in seen:
+            continue
+        seen.add(key)
+        mask = 0
+        for name in combo:
+            mask |= bitsets[name]
+        covered = mask.bit_count()
+        rows.append({
+            "Panels": ", ".join(combo),
+            "Panel count": len(combo),
+            "Covered": covered,
+            "Coverage (%)": round(100 * covered / len(items), 1) if items else 0.0,
+            "Cost": sum(prices[n] for n in combo) if prices is not None else math.nan,
+            "Method": method,
+        })
+
+    ranking = pd.DataFrame(rows, columns=["Panels", "Panel count", "Covered", "Coverage (%)", "Cost", "Method"])
+    order = ["Covered", "Cost" if prices is not None else "Panel count"]
+    ranking = ranking.sort_values(order, ascending=[False, True]).head(top).reset_index(drop=True)
+    ranking.index = ranking.index + 1
+    ranking.index.name = "Rank"
+    return ranking, uncovered
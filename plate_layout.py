@@ -0,0 +1,161 @@
+"""Well positions of 96- and 384-well plates as NumPy lookup tables.
+
+Every transform is a table built once per plate format and applied to
+whole arrays of wells at a time: well name <-> index, row-major
+(A1, A2, ...) <-> column-major (A1, B1, ...) order, stamping 96-well
+plates into the quadrants of a 384-well plate, and the offsets of wells
+spread over several plates.
+
+Indices are 0-based and row-major unless a function says otherwise.
+
+    plate_layout.well_index(["A1", "B01", "C:12"])           # [0, 12, 35]
+    plate_layout.sort_wells(names, order="column")
+    plate_layout.stamp(plate_layout.well_index(names), quadrant=1)
+"""
+import functools
+
+import numpy as np
+import pandas as pd
+
+# wells -> (rows, columns)
+FORMATS = {96: (8, 12), 384: (16, 24)}
+ORDERS = ("row", "column")
+
+# A1, A01, a:1, A-01; the row letter is validated against the plate format
+WELL_PATTERN = r"^\s*([A-Za-z])\W*0*(\d{1,2})\s*$"
+
+
+# ---------- Tables ----------
+class PlateLayout:
+    """Lookup tables of one plate format.
+
+    names / padded: row-major well names ("A1" / "A01")
+    row_to_column: column-major index of each row-major index
+    column_to_row: row-major index of each column-major index
+    """
+
+    def __init__(self, wells: int):
+        if wells not in FORMATS:
+            raise ValueError(f"Unsupported plate format: {wells} wells (expected one of {sorted(FORMATS)})")
+        self.wells = wells
+        self.rows, self.columns = FORMATS[wells]
+        self.row_letters = np.array([chr(ord("A") + r) for r in range(self.rows)])
+
+        index = np.arange(wells)
+        row, column = np.divmod(index, self.columns)
+        self.row_of = row
+        self.column_of = column
+        self.names = np.char.add(self.row_letters[row], (column + 1).astype(str))
+        self.padded = np.char.add(self.row_letters[row], np.char.zfill((column + 1).astype(str), 2))
+        self.row_to_column = column * self.rows + row
+        self.column_to_row = np.argsort(self.row_to_column)
+        for table in (self.row_of, self.column_of, self.names, self.padded, self.row_to_column, self.column_to_row):
+            table.flags.writeable = False
+
+
+@functools.lru_cache(maxsize=None)
+def layout(wells: int = 96) -> PlateLayout:
+    """Return the (shared, read-only) lookup tables of a plate format."""
+    return PlateLayout(wells)
+
+
+@functools.lru_cache(maxsize=None)
+def _quadrant_table() -> np.ndarray:
+    """(4, 96) table: 384-well index of every 96-well index in each quadrant.
+
+    Quadrant 0 takes A1 to A1, 1 to A2, 2 to B1 and 3 to B2; each source
+    well lands every other row and column, as a 4-head stamp lays it down.
+    """
+    source = layout(96)
+    quadrant = np.arange(4)[:, None]
+    rows = 2 * source.row_of[None, :] + quadrant // 2
+    columns = 2 * source.column_of[None, :] + quadrant % 2
+    table = rows * FORMATS[384][1] + columns
+    table.flags.writeable = False
+    return table
+
+
+# ---------- Names ----------
+def well_index(names, wells: int = 96) -> np.ndarray:
+    """Row-major indices of well names written A1, A01 or A:1; -1 where a name is not a well of the format."""
+    plate = layout(wells)
+    parts = pd.Series(names, dtype="string").str.extract(WELL_PATTERN)
+    rows = parts[0].str.upper().map(lambda letter: ord(letter) - ord("A"), na_action="ignore")
+    rows = pd.to_numeric(rows).fillna(-1).to_numpy(dtype=int)
+    columns = pd.to_numeric(parts[1]).fillna(0).to_numpy(dtype=int) - 1
+    valid = (rows >= 0) & (rows < plate.rows) & (columns >= 0) & (columns < plate.columns)
+    return np.where(valid, rows * plate.columns + columns, -1)
+
+
+def well_names(indices, wells: int = 96, pad: bool = False) -> np.ndarray:
+    """Well names of row-major indices; pad=True gives A01 rather than A1."""
+    plate = layout(wells)
+    table = plate.padded if pad else plate.names
+    return table[np.asarray(indices, dtype=int)]
+
+
+def all_wells(wells: int = 96, order: str = "row", pad: bool = False) -> np.ndarray:
+    """Every well name of a plate, in row- or column-major order."""
+    return well_names(from_order(np.arange(wells), wells, order), wells, pad)
+
+
+# ---------- Orders ----------
+def to_order(indices, wells: int = 96, order: str = "column") -> np.ndarray:
+    """Position in the given fill order of row-major indices."""
+    if order not in ORDERS:
+        raise ValueError(f"Unknown order: {order} (expected one of {ORDERS})")
+    indices = np.asarray(indices, dtype=int)
+    return indices if order == "row" else layout(wells).row_to_column[indices]
+
+
+def from_order(positions, wells: int = 96, order: str = "column") -> np.ndarray:
+    """Row-major indices of positions in the given fill order."""
+    if order not in ORDERS:
+        raise ValueError(f"Unknown order: {order} (expected one of {ORDERS})")
+    positions = np.asarray(positions, dtype=int)
+    return positions if order == "row" else layout(wells).column_to_row[positions]
+
+
+def sort_key(names, wells: int = 96, order: str = "row") -> np.ndarray:
+    """Sort key of well names in the given order; names that are not wells sort last."""
+    index = well_index(names, wells)
+    return np.where(index >= 0, to_order(np.maximum(index, 0), wells, order), wells)
+
+
+def sort_wells(names, wells: int = 96, order: str = "row") -> list:
+    """Well names sorted in row- or column-major order (stable; names that are not wells last)."""
+    names = list(names)
+    return [names[i] for i in np.argsort(sort_key(names, wells, order), kind="stable")]
+
+
+# ---------- 96 -> 384 ----------
+def stamp(indices, quadrant: int) -> np.ndarray:
+    """384-well row-major indices of 96-well row-major indices stamped into a quadrant (0-3)."""
+    if not 0 <= quadrant < 4:
+        raise ValueError(f"Quadrant must be 0-3, got {quadrant}")
+    return _quadrant_table()[quadrant, np.asarray(indices, dtype=int)]
+
+
+def unstamp(indices) -> tuple:
+    """Return (quadrant, 96-well row-major index) of 384-well row-major indices."""
+    row, column = np.divmod(np.asarray(indices, dtype=int), FORMATS[384][1])
+    quadrant = (row % 2) * 2 + column % 2
+    return quadrant, (row // 2) * FORMATS[96][1] + column // 2
+
+
+# ---------- Multi-plate ----------
+def locate(positions, wells: int = 96, order: str = "column", per_plate: int = None) -> tuple:
+    """Return (1-based plate, row-major well index) of 0-based positions in a multi-plate fill.
+
+    Plates are filled in the given order, per_plate wells each (default:
+    the whole plate), e.g. per_plate=88 when column 12 is kept for controls.
+    """
+    per_plate = per_plate or wells
+    plate, position = np.divmod(np.asarray(positions, dtype=int), per_plate)
+    return plate + 1, from_order(position, wells, order)
+
+
+def positions(plates, indices, wells: int = 96, order: str = "column", per_plate: int = None) -> np.ndarray:
+    """0-based positions in a multi-plate fill of (1-based plate, row-major well index) pairs; inverse of locate."""
+    per_plate = per_plate or wells
+    return (np.asarray(plates, dtype=int) - 1) * per_plate + to_order(indices, wells, order)
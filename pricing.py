@@ -0,0 +1,258 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+import metrics
+import pricing_catalog
+import shared_cache
+
+ACCOUNT_TYPES = ["Internal", "External Academic", "External Commercial"]
+
+# VAT is only charged to external accounts
+VAT_RATE = 0.2
+VAT_ACCOUNTS = ("External Academic", "External Commercial")
+
+# Columns of plan_batches(); the last three are the ranking criteria
+PLAN_COLUMNS = ["Samples", "Batches", "Wasted Wells", "Total Cost", "Cost per Sample"]
+
+QUOTES = metrics.counter("quotes_total", "Quotes served, by account type", ["account"])
+QUOTE_SECONDS = metrics.histogram("quote_seconds", "Seconds to serve a quote, shared cache lookup included")
+
+
+# ---------- Catalog ----------
+def panel_options(prices_df: pd.DataFrame) -> tuple:
+    """Return (combinable, standalone) panel names of one prices file."""
+    combinable = prices_df[prices_df["Panel type"] == "Combinable"]["Panel Name"].tolist()
+    standalone = prices_df[prices_df["Panel type"] == "Standalone"]["Panel Name"].tolist()
+    return combinable, standalone
+
+
+# ---------- Rules ----------
+def panel_details(prices_df: pd.DataFrame, panel: str) -> tuple:
+    """Return (batch size, product name) for a panel, or (None, None) when it is not listed.
+
+    Batch sizes are validated as positive integers when the catalog is compiled.
+    """
+    row = prices_df[prices_df["Panel Name"].str.strip() == panel.strip()]
+    if not row.empty:
+        return int(row.iloc[0]["Batch Size"]), row.iloc[0]["Product Name"].strip()
+    return None, None
+
+
+def product_price(rules_df: pd.DataFrame, product: str, count, account: str) -> tuple:
+    """Return (total cost, unit price) of count units of a product for an account type."""
+    row = rules_df[rules_df["Product Name"].str.strip() == product.strip()]
+    if not row.empty:
+        price_column = f"{account} Price"
+        base_price = float(row.iloc[0][price_column])
+
+        # Check for volume discount (the catalog guarantees both columns are set together)
+        discount_threshold = row.iloc[0]["Sample Number for Discount"]
+        discount_percentage = row.iloc[0]["Discount Percentage"]
+        if pd.notna(discount_threshold) and count >= discount_threshold:
+            base_price *= (1 - discount_percentage / 100)
+
+        return count * base_price, base_price
+    return 0, 0
+
+
+def product_costs(rules_df: pd.DataFrame, product: str, counts: np.ndarray, account: str) -> np.ndarray:
+    """Vectorized product_price: the cost of counts[i] units of a product, for every i at once."""
+    counts = np.asarray(counts, dtype=float)
+    row = rules_df[rules_df["Product Name"].str.strip() == product.strip()]
+    if row.empty:
+        return np.zeros(len(counts))
+    price_column = f"{account} Price"
+    base_price = np.full(len(counts), float(row.iloc[0][price_column]))
+
+    # Check for volume discount
+    discount_threshold = row.iloc[0]["Sample Number for Discount"]
+    discount_percentage = row.iloc[0]["Discount Percentage"]
+    if pd.notna(discount_threshold):
+        base_price = np.where(counts >= discount_threshold, base_price * (1 - discount_percentage / 100), base_price)
+
+    return counts * base_price
+
+
+def sequencing_kit_info(rules_df: pd.DataFrame, product: str) -> tuple:
+    """Return (sequencing kit, kits per batch) for a product, or (None, 0)."""
+    row = rules_df[rules_df["Product Name"].str.strip() == product.strip()]
+    if not row.empty:
+        sequencing_kit = row.iloc[0].get("Sequencing Kit")
+        sequencing_qty = row.iloc[0].get("Sequencing Qty per Batch")
+        if pd.isna(sequencing_kit):
+            return None, 0
+        return sequencing_kit.strip(), float(sequencing_qty) if pd.notna(sequencing_qty) else 0
+    return None, 0
+
+
+def apply_bundle_rules(rules_df: pd.DataFrame, product: str, sample_count: int, batch_size: int) -> dict:
+    """Split the batches of a product into bundled products plus the unbundled remainder."""
+    row = rules_df[rules_df["Product Name"].str.strip() == product.strip()]
+
+    if not row.empty:
+        bundle_size = row.iloc[0].get("Bundle Size")
+        bundle_product = row.iloc[0].get("Bundle Product Name")
+
+        if pd.notna(bundle_size) and pd.notna(bundle_product):
+            bundle_size = int(bundle_size)
+            batch_count = sample_count // batch_size  # Number of full batches
+            full_bundles = batch_count // bundle_size  # Number of complete bundled products
+            remainder_batches = batch_count % bundle_size  # Remaining unbundled batches
+
+            result = {}
+            if full_bundles > 0:
+                result[bundle_product] = full_bundles
+            if remainder_batches > 0:
+                result[product] = remainder_batches  # Remainder stays as original product
+
+            return result
+
+    # If no bundling is needed, return the original product count
+    return {product: sample_count // batch_size}
+
+
+def bundle_split(rules_df: pd.DataFrame, product: str, batches: np.ndarray) -> dict:
+    """Vectorized apply_bundle_rules on batch counts: {product: units per candidate}."""
+    row = rules_df[rules_df["Product Name"].str.strip() == product.strip()]
+    if not row.empty:
+        bundle_size = row.iloc[0].get("Bundle Size")
+        bundle_product = row.iloc[0].get("Bundle Product Name")
+        if pd.notna(bundle_size) and pd.notna(bundle_product):
+            bundle_size = int(bundle_size)
+            return {bundle_product: batches // bundle_size, product: batches % bundle_size}
+    return {product: batches}
+
+
+def valid_sample_counts(prices_df: pd.DataFrame, panels: list, num_samples: int) -> list:
+    """Return [closest smaller, closest larger] sample counts filling whole batches, or [] when no panel has a batch size."""
+    batch_sizes = [b for b, _ in (panel_details(prices_df, p) for p in panels) if b]
+    if not batch_sizes:
+        return []
+    closest_smaller = max([b * (num_samples // b) for b in batch_sizes])
+    closest_larger = min([b * (num_samples // b + 1) for b in batch_sizes])
+    return [closest_smaller, closest_larger]
+
+
+# ---------- Batch planner ----------
+def plan_batches(prices_df: pd.DataFrame, rules_df: pd.DataFrame, panels: list, low: int, high: int,
+                 account: str, rank_by: str = "Cost per Sample", top: int = 10) -> pd.DataFrame:
+    """Rank every sample count in [low, high] for running all of them on every selected panel.
+
+    Each panel needs ceil(samples / batch size) batches; the wells left empty
+    in those batches, summed over panels, are the wasted wells. Costs follow
+    the same bundle, sequencing kit and price rules as quote(), evaluated for
+    all candidates at once as arrays. Returns the top rows (PLAN_COLUMNS)
+    ordered by rank_by, ties broken by the other criteria.
+    """
+    details = [(panel,) + panel_details(prices_df, panel) for panel in panels]
+    details = [(panel, b, product) for panel, b, product in details if b and product]
+    low = max(1, int(low))
+    if not details or high < low:
+        return pd.DataFrame(columns=PLAN_COLUMNS)
+
+    samples = np.arange(low, int(high) + 1)
+    sizes = np.array([b for _, b, _ in details])
+    batches = -(-samples[:, None] // sizes[None, :])  # ceil, candidates x panels
+    wasted = (batches * sizes - samples[:, None]).sum(axis=1)
+
+    product_counts = {}
+    for j, (_, _, product) in enumerate(details):
+        for bundled_product, counts in bundle_split(rules_df, product, batches[:, j]).items():
+            product_counts[bundled_product] = product_counts.get(bundled_product, 0) + counts
+
+    total = np.zeros(len(samples))
+    sequencing_counts = {}
+    for product, counts in product_counts.items():
+        total += product_costs(rules_df, product, counts, account)
+        sequencing_kit, sequencing_qty = sequencing_kit_info(rules_df, product)
+        if sequencing_kit:
+            sequencing_counts[sequencing_kit] = sequencing_counts.get(sequencing_kit, 0) + counts * sequencing_qty
+    for seq_kit, counts in sequencing_counts.items():
+        total += product_costs(rules_df, seq_kit, np.ceil(counts), account)
+
+    plan = pd.DataFrame({
+        "Samples": samples,
+        "Wasted Wells": wasted,
+        "Total Cost": total.round(2),
+        "Cost per Sample": (total / samples).round(2),
+    })
+    criteria = [rank_by] + [c for c in PLAN_COLUMNS[2:] if c != rank_by]
+    plan = plan.sort_values(criteria + ["Samples"], kind="stable").head(top)
+    plan.insert(1, "Batches", [
+        ", ".join(f"{panel} x{k}" for (panel, _, _), k in zip(details, row))
+        for row in batches[plan.index.to_numpy()]
+    ])
+    return plan.reset_index(drop=True)[PLAN_COLUMNS]
+
+
+# ---------- Quote ----------
+def quote(prices_df: pd.DataFrame, rules_df: pd.DataFrame, panels: list, num_samples: int, account: str) -> dict:
+    """Price num_samples on the selected panels.
+
+    Returns a dict with the panel breakdown, product and sequencing kit
+    lines (quantity, unit price, cost), the total and, for external
+    accounts, VAT.
+    """
+    panel_breakdown = {}
+    product_counts = {}
+    sequencing_counts = {}
+
+    if num_samples > 0 and panels:
+        for panel in panels:
+            batch_size, product_name = panel_details(prices_df, panel)
+            if batch_size and product_name:
+                panel_breakdown[panel] = panel_breakdown.get(panel, 0) + num_samples // batch_size
+                bundled_products = apply_bundle_rules(rules_df, product_name, num_samples, batch_size)
+
+                for bundled_product, bundled_count in bundled_products.items():
+                    product_counts[bundled_product] = product_counts.get(bundled_product, 0) + bundled_count
+
+                    # Sequencing kits follow the final (possibly bundled) product
+                    sequencing_kit, sequencing_qty = sequencing_kit_info(rules_df, bundled_product)
+                    if sequencing_kit:
+                        sequencing_counts[sequencing_kit] = sequencing_counts.get(sequencing_kit, 0) + (
+                            bundled_count * sequencing_qty)
+
+    total_cost = 0.0
+    products = []
+    for product, count in product_counts.items():
+        cost, unit_price = product_price(rules_df, product, count, account)
+        total_cost += cost
+        products.append({"product": product, "quantity": count, "unit_price": unit_price, "cost": cost})
+
+    sequencing_kits = []
+    for seq_kit, count in sequencing_counts.items():
+        count = math.ceil(count)
+        cost, unit_price = product_price(rules_df, seq_kit, count, account)
+        total_cost += cost
+        sequencing_kits.append({"kit": seq_kit, "quantity": count, "unit_price": unit_price, "cost": cost})
+
+    vat = total_cost * VAT_RATE if account in VAT_ACCOUNTS else 0
+    return {
+        "account": account,
+        "num_samples": num_samples,
+        "panels": panel_breakdown,
+        "products": products,
+        "sequencing_kits": sequencing_kits,
+        "total": total_cost,
+        "vat": vat,
+        "total_including_vat": total_cost + vat,
+    }
+
+
+def quote_category(category: str, panels: list, num_samples: int, account: str) -> dict:
+    """quote() against the prices of a category in the compiled pricing catalog, through the shared cache."""
+    if account not in ACCOUNT_TYPES:
+        raise KeyError(f"Unknown account type: {account}")
+    catalog = pricing_catalog.current()
+    # Shared by every worker process; the catalog sources are part of the key, so edited prices are never served stale
+    with QUOTE_SECONDS.time():
+        result = shared_cache.default().get_or_compute(
+            "quote", (catalog.sources, category, list(panels), int(num_samples), account),
+            lambda: quote(catalog.prices(category), catalog.rules(), panels, num_samples, account),
+        )
+    QUOTES.inc(account=account)
+    result["category"] = category
+    return result
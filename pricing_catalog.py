@@ -0,0 +1,411 @@
+"""Validated, precompiled pricing catalog.
+
+categories.csv, the prices files it lists and pricing_rules.csv are
+checked once (schema, numbers, cross-references) and compiled into one
+typed binary snapshot that the apps memory-map. When a source CSV changes
+the catalog is recompiled and swapped in atomically; if the new sources
+do not validate, the last good catalog stays in service.
+
+Validate and rebuild by hand (exit code 1 on errors):
+
+    python pricing_catalog.py
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import data_access
+
+SNAPSHOT_PATH = data_access.APP_DIR / "cache" / "pricing_catalog.bin"
+
+MAGIC = b"PRCAT01\n"
+ALIGN = 64
+
+PANEL_TYPES = ("Combinable", "Standalone")
+PRICE_COLUMNS = ["Internal Price", "External Academic Price", "External Commercial Price"]
+RULE_NUMBER_COLUMNS = PRICE_COLUMNS + [
+    "Sample Number for Discount", "Discount Percentage", "Bundle Size", "Bundle Factor", "Sequencing Qty per Batch",
+]
+CATEGORY_COLUMNS = ["Category Name", "Prices File"]
+PANEL_COLUMNS = ["Panel Name", "Batch Size", "Panel type", "Product Name"]
+RULE_COLUMNS = list(data_access.RULES_DTYPES)
+
+# Markers read as missing in the source CSVs
+MISSING = {"", "NA", "N/A", "NAN", "NONE"}
+
+
+class CatalogError(ValueError):
+    """The pricing sources failed validation; .issues lists every problem found.
+
+    .sources fingerprints the files read (None for missing ones), so the
+    same rejected sources need not be compiled again.
+    """
+
+    def __init__(self, issues: list, sources: dict = None):
+        super().__init__(f"{len(issues)} pricing catalog error(s): " + "; ".join(issues[:5]))
+        self.issues = issues
+        self.sources = sources or {}
+
+
+# ---------- Compile ----------
+def _read(path: Path, columns: list, issues: list):
+    """Read a source CSV as stripped text (missing markers -> None), checking its columns."""
+    try:
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    except Exception as e:
+        issues.append(f"{path.name}: cannot be read ({e})")
+        return None
+    missing = [c for c in columns if c not in df.columns]
+    if missing:
+        issues.append(f"{path.name}: missing column(s) {', '.join(missing)}")
+        return None
+    df = df[columns].apply(lambda col: col.str.strip())
+    missing_cells = df.apply(lambda col: col.str.upper().isin(MISSING))
+    return df.astype(object).where(~missing_cells, None)
+
+
+def _numbers(df: pd.DataFrame, column: str, name: str, issues: list) -> np.ndarray:
+    """Parse a column as float64 (missing -> NaN), reporting cells that are not numbers by CSV line."""
+    values = pd.to_numeric(df[column], errors="coerce")
+    bad = values.isna() & df[column].notna()
+    for i in np.flatnonzero(bad.to_numpy()):
+        issues.append(f"{name} line {i + 2}: {column} {df[column].iloc[i]!r} is not a number")
+    return values.to_numpy(dtype=float)
+
+
+def compile_catalog(app_dir: Path = data_access.APP_DIR) -> tuple:
+    """Validate the pricing sources and return (tables, sources, warnings).
+
+    tables holds typed structured arrays (categories, panels, rules),
+    sources the (mtime_ns, size) of every file read and warnings the
+    non-fatal findings (e.g. products without a price). Raises CatalogError.
+    """
+    app_dir = Path(app_dir)
+    issues = []
+    warnings = []
+    sources = {}
+
+    def stat(path: Path):
+        st = path.stat()
+        sources[str(path.relative_to(app_dir))] = [st.st_mtime_ns, st.st_size]
+
+    def missing(path: Path):
+        sources[str(path.relative_to(app_dir))] = None
+
+    categories_path = app_dir / "olink_cost_files" / "categories.csv"
+    rules_path = app_dir / "olink_cost_files" / "pricing_rules.csv"
+    for path in (categories_path, rules_path):
+        if not path.exists():
+            missing(path)
+            raise CatalogError([f"{path.relative_to(app_dir)} does not exist"], sources)
+        stat(path)
+
+    # Rules
+    rules = _read(rules_path, RULE_COLUMNS, issues)
+    if rules is None:
+        raise CatalogError(issues, sources)
+    numbers = {c: _numbers(rules, c, rules_path.name, issues) for c in RULE_NUMBER_COLUMNS}
+    products = rules["Product Name"]
+    for i in np.flatnonzero(products.isna().to_numpy()):
+        issues.append(f"{rules_path.name} line {i + 2}: Product Name is empty")
+    for name in products[products.duplicated() & products.notna()].unique():
+        issues.append(f"{rules_path.name}: Product Name {name!r} has more than one rule")
+    known = set(products.dropna())
+
+    for i, row in enumerate(rules.itertuples(index=False)):
+        line = f"{rules_path.name} line {i + 2}"
+        has_threshold = not np.isnan(numbers["Sample Number for Discount"][i])
+        if has_threshold != (not np.isnan(numbers["Discount Percentage"][i])):
+            issues.append(f"{line}: Sample Number for Discount and Discount Percentage must be set together")
+        pct = numbers["Discount Percentage"][i]
+        if not np.isnan(pct) and not 0 <= pct <= 100:
+            issues.append(f"{line}: Discount Percentage {pct} is outside 0-100")
+        bundle_size = numbers["Bundle Size"][i]
+        bundle_product = row[RULE_COLUMNS.index("Bundle Product Name")]
+        if np.isnan(bundle_size) != (bundle_product is None):
+            issues.append(f"{line}: Bundle Size and Bundle Product Name must be set together")
+        elif bundle_product is not None:
+            if bundle_size < 1 or bundle_size != int(bundle_size):
+                issues.append(f"{line}: Bundle Size {bundle_size} is not a positive whole number")
+            if bundle_product not in known:
+                issues.append(f"{line}: Bundle Product Name {bundle_product!r} has no rule")
+        kit = row[RULE_COLUMNS.index("Sequencing Kit")]
+        if kit is not None:
+            if kit not in known:
+                issues.append(f"{line}: Sequencing Kit {kit!r} has no rule")
+            else:
+                kit_row = int(np.flatnonzero((products == kit).to_numpy())[0])
+                if any(np.isnan(numbers[c][kit_row]) for c in PRICE_COLUMNS):
+                    issues.append(f"{line}: Sequencing Kit {kit!r} has no price")
+
+    # Categories and prices files
+    categories = _read(categories_path, CATEGORY_COLUMNS, issues)
+    panel_rows = []
+    if categories is not None:
+        for i, (category, prices_file) in enumerate(categories.itertuples(index=False)):
+            line = f"{categories_path.name} line {i + 2}"
+            if category is None or prices_file is None:
+                issues.append(f"{line}: Category Name and Prices File are required")
+                continue
+            prices_path = app_dir / prices_file
+            if not prices_path.exists():
+                issues.append(f"{line}: Prices File {prices_file} does not exist")
+                missing(prices_path)
+                continue
+            stat(prices_path)
+            prices = _read(prices_path, PANEL_COLUMNS, issues)
+            if prices is None:
+                continue
+            sizes = _numbers(prices, "Batch Size", prices_path.name, issues)
+            for j, (panel, _, panel_type, product) in enumerate(prices.itertuples(index=False)):
+                where = f"{prices_path.name} line {j + 2}"
+                if panel is None:
+                    issues.append(f"{where}: Panel Name is empty")
+                if np.isnan(sizes[j]) or sizes[j] < 1 or sizes[j] != int(sizes[j]):
+                    issues.append(f"{where}: Batch Size must be a positive whole number")
+                if panel_type not in PANEL_TYPES:
+                    issues.append(f"{where}: Panel type {panel_type!r} is not one of {', '.join(PANEL_TYPES)}")
+                if product not in known:
+                    issues.append(f"{where}: Product Name {product!r} has no rule in {rules_path.name}")
+                else:
+                    rule_row = int(np.flatnonzero((products == product).to_numpy())[0])
+                    if any(np.isnan(numbers[c][rule_row]) for c in PRICE_COLUMNS):
+                        warnings.append(f"{where}: Product Name {product!r} has no price")
+                panel_rows.append((i, panel or "", 0 if np.isnan(sizes[j]) else int(sizes[j]), panel_type or "", product or ""))
+            names = prices["Panel Name"]
+            for name in names[names.duplicated() & names.notna()].unique():
+                issues.append(f"{prices_path.name}: Panel Name {name!r} is listed more than once")
+
+    if issues:
+        raise CatalogError(issues, sources)
+
+    def text(values) -> str:
+        return f"U{max([1] + [len(v) for v in values])}"
+
+    rule_text = {c: rules[c].fillna("").tolist() for c in ("Product Name", "Bundle Product Name", "Sequencing Kit")}
+    rule_table = np.empty(len(rules), dtype=[
+        ("Product Name", text(rule_text["Product Name"])),
+        *[(c, "f8") for c in RULE_NUMBER_COLUMNS],
+        ("Bundle Product Name", text(rule_text["Bundle Product Name"])),
+        ("Sequencing Kit", text(rule_text["Sequencing Kit"])),
+    ])
+    for c in rule_text:
+        rule_table[c] = rule_text[c]
+    for c in RULE_NUMBER_COLUMNS:
+        rule_table[c] = numbers[c]
+
+    category_table = np.array(
+        list(categories.itertuples(index=False, name=None)),
+        dtype=[(c, text(categories[c])) for c in CATEGORY_COLUMNS],
+    )
+    panel_table = np.array(panel_rows, dtype=[
+        ("Category", "i4"),
+        ("Panel Name", text([r[1] for r in panel_rows])),
+        ("Batch Size", "i4"),
+        ("Panel type", text([r[3] for r in panel_rows])),
+        ("Product Name", text([r[4] for r in panel_rows])),
+    ])
+    tables = {"categories": category_table, "panels": panel_table, "rules": rule_table}
+    return tables, sources, warnings
+
+
+# ---------- Snapshot ----------
+def save_snapshot(tables: dict, sources: dict, warnings: list, path: Path = SNAPSHOT_PATH) -> None:
+    """Write the tables to one aligned binary file, atomically replacing the previous snapshot.
+
+    Layout: MAGIC, little-endian u64 header length, JSON header (sources,
+    warnings and per-table dtype / length / offset), then each table's raw
+    records at a 64-byte aligned offset.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    layout = {}
+    offset = 0
+    for name, table in tables.items():
+        layout[name] = {"dtype": table.dtype.descr, "length": len(table), "offset": offset}
+        offset += -(-table.nbytes // ALIGN) * ALIGN
+    header = json.dumps({"sources": sources, "warnings": warnings, "tables": layout}).encode("utf-8")
+    data_start = -(-(len(MAGIC) + 8 + len(header)) // ALIGN) * ALIGN
+
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + len(header).to_bytes(8, "little") + header)
+        for name, table in tables.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(table.tobytes())
+        f.truncate(data_start + offset)
+        f.flush()
+        os.fsync(f.fileno())
+    # Readers that still map the old file keep its inode until they let go
+    os.replace(tmp, path)
+
+
+def load_snapshot(path: Path = SNAPSHOT_PATH):
+    """Memory-map a snapshot; return (tables, sources, warnings) or None when missing or unreadable."""
+    path = Path(path)
+    try:
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None
+            header_len = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(header_len))
+    except (OSError, ValueError):
+        return None
+    data_start = -(-(len(MAGIC) + 8 + header_len) // ALIGN) * ALIGN
+    tables = {}
+    for name, spec in header["tables"].items():
+        dtype = np.dtype([tuple(field) for field in spec["dtype"]])
+        if spec["length"] == 0:
+            tables[name] = np.empty(0, dtype=dtype)
+            continue
+        tables[name] = np.memmap(
+            path, dtype=dtype, mode="r", offset=data_start + spec["offset"], shape=(spec["length"],)
+        )
+    return tables, header["sources"], header["warnings"]
+
+
+def sources_changed(sources: dict, app_dir: Path = data_access.APP_DIR) -> bool:
+    """True when any source file recorded in a catalog was modified, replaced, removed or (if missing) created."""
+    for relative, recorded in sources.items():
+        try:
+            st = (Path(app_dir) / relative).stat()
+        except OSError:
+            if recorded is None:
+                continue
+            return True
+        if recorded is None or st.st_mtime_ns != recorded[0] or st.st_size != recorded[1]:
+            return True
+    return False
+
+
+# ---------- Catalog ----------
+class Catalog:
+    """Read-only view of one compiled catalog version.
+
+    The DataFrames have the columns the pricing engine expects and are built
+    from the memory-mapped tables once per version; callers get shallow
+    copies.
+    """
+
+    def __init__(self, tables: dict, sources: dict, warnings: list):
+        self.tables = tables
+        self.sources = sources
+        self.warnings = warnings
+        self._frames = {}
+
+    def _frame(self, key, build):
+        if key not in self._frames:
+            self._frames[key] = build()
+        return self._frames[key].copy(deep=False)
+
+    def categories(self) -> pd.DataFrame:
+        table = self.tables["categories"]
+        return self._frame("categories", lambda: pd.DataFrame({c: table[c].astype(str) for c in CATEGORY_COLUMNS}))
+
+    def prices(self, category: str) -> pd.DataFrame:
+        """Panels of one category (Panel Name, Batch Size, Panel type, Product Name)."""
+        names = self.tables["categories"]["Category Name"].tolist()
+        if category not in names:
+            raise KeyError(f"Unknown category: {category}")
+        panels = self.tables["panels"]
+        rows = panels[panels["Category"] == names.index(category)]
+        return self._frame(("prices", category), lambda: pd.DataFrame({
+            "Panel Name": rows["Panel Name"].astype(str),
+            "Batch Size": rows["Batch Size"].astype(np.int64),
+            "Panel type": rows["Panel type"].astype(str),
+            "Product Name": rows["Product Name"].astype(str),
+        }))
+
+    def rules(self) -> pd.DataFrame:
+        """pricing_rules.csv with float columns and None for missing names."""
+        def build():
+            table = self.tables["rules"]
+            df = pd.DataFrame({c: np.asarray(table[c]) for c in RULE_COLUMNS})
+            for c in ("Product Name", "Bundle Product Name", "Sequencing Kit"):
+                df[c] = df[c].astype(str).replace("", None)
+            return df
+        return self._frame("rules", build)
+
+
+_lock = threading.Lock()
+_current = None
+_errors = []
+_rejected = None  # sources of the last rejected compile
+
+
+def current(app_dir: Path = data_access.APP_DIR, path: Path = SNAPSHOT_PATH) -> Catalog:
+    """Return the catalog in service, recompiling and swapping it in when the sources changed.
+
+    On first use the snapshot is memory-mapped if it matches the sources.
+    If changed sources fail validation the previous catalog (in memory or
+    on disk) keeps serving and errors() reports why; CatalogError is only
+    raised when there is no good catalog at all. Rejected sources are not
+    compiled again until one of their files changes.
+    """
+    global _current, _errors, _rejected
+
+    def settled(catalog) -> bool:
+        if catalog is not None and not sources_changed(catalog.sources, app_dir):
+            return True
+        return _rejected is not None and not sources_changed(_rejected, app_dir)
+
+    catalog = _current
+    if catalog is not None and settled(catalog):
+        return catalog
+    with _lock:
+        if settled(_current):
+            if _current is None:
+                raise CatalogError(_errors, _rejected)
+            return _current
+        if _current is None:
+            loaded = load_snapshot(path)
+            if loaded is not None:
+                _current = Catalog(*loaded)
+                if not sources_changed(_current.sources, app_dir):
+                    _errors = []
+                    return _current
+        try:
+            tables, sources, warnings = compile_catalog(app_dir)
+        except CatalogError as e:
+            _errors = e.issues
+            _rejected = e.sources
+            if _current is None:
+                raise
+            return _current
+        save_snapshot(tables, sources, warnings, path)
+        _current = Catalog(*load_snapshot(path))
+        _errors = []
+        _rejected = None
+        return _current
+
+
+def errors() -> list:
+    """Validation errors of the last recompile that was rejected (empty when the catalog is current)."""
+    return list(_errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate the pricing CSVs and rebuild the catalog snapshot.")
+    parser.add_argument("--output", default=str(SNAPSHOT_PATH))
+    args = parser.parse_args()
+    try:
+        tables, sources, warnings = compile_catalog()
+    except CatalogError as e:
+        for issue in e.issues:
+            print(f"ERROR {issue}")
+        sys.exit(1)
+    for warning in warnings:
+        print(f"WARNING {warning}")
+    save_snapshot(tables, sources, warnings, Path(args.output))
+    print(f"Wrote {len(tables['categories'])} categories, {len(tables['panels'])} panels and "
+          f"{len(tables['rules'])} rules to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import data_access
+import panel_catalog
+
+# UniProt accession format (https://www.uniprot.org/help/accession_numbers)
+ACCESSION = r"(?:[OPQ][0-9][A-Z0-9]{3}[0-9]|[A-NR-Z][0-9](?:[A-Z][A-Z0-9]{2}[0-9]){1,2})"
+ISOFORM = rf"^({ACCESSION})-\d+$"
+
+# Complexes / multi-target assays are written "P29459_P29460", "Q8IZJ0;Q8IZI9" or "P07288 | P01011"
+SEPARATORS = r"\s*[|;,_]\s*"
+
+# Columns in data/ that hold alternative names for the protein in "UniProt ID"
+ALIAS_COLUMNS = ["Gene", "Protein name", "Protein Name", "Common Name", "Full name", "Full Gene Name"]
+
+
+# ---------- Canonical keys ----------
+def canonical_keys(values: pd.Series) -> pd.Series:
+    """Return upper-cased, whitespace-collapsed keys with accession isoform suffixes removed.
+
+    Missing and blank values are dropped; the index of the input is kept.
+    """
+    keys = values.dropna().astype(str).str.strip().str.replace(r"\s+", " ", regex=True).str.upper()
+    keys = keys[keys != ""]
+    return keys.str.replace(ISOFORM, r"\1", regex=True)
+
+
+def split_keys(values: pd.Series) -> pd.Series:
+    """Return one canonical key per component, indexed by the row it came from.
+
+    A value is only split when every component is an accession, so names that
+    happen to contain separators ("HLA_DRA") stay whole.
+    """
+    keys = canonical_keys(values)
+    if keys.empty:
+        return keys
+    parts = keys.str.split(SEPARATORS, regex=True).explode()
+    parts = parts.str.replace(ISOFORM, r"\1", regex=True)
+    splittable = parts.str.fullmatch(ACCESSION).groupby(level=0).all()
+    whole = keys[~splittable.reindex(keys.index, fill_value=False)]
+    return pd.concat([parts[parts.index.isin(splittable[splittable].index)], whole]).sort_index()
+
+
+def split_symbols(values: pd.Series) -> pd.Series:
+    """Return one canonical gene symbol per component of multi-gene assays ("IL12A_IL12B", "C4B | C4A").
+
+    A value stays whole when a component does not start with a letter, as in
+    "HERVK_113".
+    """
+    keys = canonical_keys(values)
+    if keys.empty:
+        return keys
+    parts = keys.str.split(SEPARATORS, regex=True).explode()
+    splittable = parts.str.match(r"[A-Z]").groupby(level=0).all()
+    whole = keys[~splittable.reindex(keys.index, fill_value=False)]
+    return pd.concat([parts[parts.index.isin(splittable[splittable].index)], whole]).sort_index()
+
+
+# ---------- Alias table ----------
+def build_alias_table(data_dir: Path = panel_catalog.DATA_DIR) -> pd.Series:
+    """Return a Series mapping canonical alias -> canonical accession key.
+
+    Built once from the Gene / protein name columns of every preloaded panel;
+    an alias may map to several accessions (e.g. human and mouse IL16).
+    """
+    data_dir = Path(data_dir)
+    pairs = []
+    for name in panel_catalog.list_panels(data_dir):
+        df = data_access.panel(data_dir / name)
+        if panel_catalog.KEY_COLUMN not in df.columns:
+            continue
+        targets = split_keys(df[panel_catalog.KEY_COLUMN])
+        for column in ALIAS_COLUMNS:
+            if column not in df.columns:
+                continue
+            aliases = canonical_keys(df[column])
+            joined = pd.DataFrame({"alias": aliases}).join(targets.rename("target"), how="inner")
+            pairs.append(joined)
+
+    if not pairs:
+        return pd.Series(dtype=str, name="target")
+    table = pd.concat(pairs, ignore_index=True).drop_duplicates()
+    table = table[table["alias"] != table["target"]]
+    return table.set_index("alias")["target"].sort_index()
+
+
+def concept_keys(values: pd.Series, aliases: pd.Series) -> pd.Series:
+    """Return every key a value may stand for: its own components plus their aliased accessions."""
+    keys = split_keys(values)
+    resolved = keys.to_frame("alias").join(aliases, on="alias", how="inner")["target"]
+    combined = pd.concat([keys, resolved]).sort_index()
+    # Drop repeated (row, key) pairs only; the same key may legitimately appear on many rows
+    return combined[~combined.reset_index().duplicated().to_numpy()]
+
+
+# ---------- Matching ----------
+def query_keys(custom_values: pd.Series, aliases: pd.Series) -> frozenset:
+    """Return the hashed set of every key the custom list may stand for."""
+    return frozenset(concept_keys(custom_values.reset_index(drop=True), aliases).tolist())
+
+
+def match_mask(original_values: pd.Series, query: frozenset, aliases: pd.Series) -> np.ndarray:
+    """Return a boolean array, aligned with original_values, of rows matching the query keys.
+
+    Both sides go through the same canonical-key / alias tables, after which
+    matching is one set lookup per candidate key.
+    """
+    candidates = concept_keys(original_values.reset_index(drop=True), aliases)
+    return keys_mask(candidates, len(original_values), query)
+
+
+def keys_mask(candidates: pd.Series, length: int, query: frozenset) -> np.ndarray:
+    """match_mask for precomputed concept keys (indexed by row position) of a column of the given length."""
+    hits = np.fromiter((key in query for key in candidates.tolist()), dtype=bool, count=len(candidates))
+    mask = np.zeros(length, dtype=bool)
+    mask[candidates.index[hits]] = True
+    return mask
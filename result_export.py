@@ -0,0 +1,103 @@
+import io
+import re
+import zipfile
+
+import pandas as pd
+from openpyxl import Workbook
+
+# Excel limits sheet names to 31 characters and forbids []:*?/\
+_SHEET_INVALID = re.compile(r"[\[\]:*?/\\]")
+
+
+def summary_frame(results: list) -> pd.DataFrame:
+    """Return the match counts of (name, count, common_df) results as a table."""
+    return pd.DataFrame(
+        [(name, count) for name, count, _ in results], columns=["File", "Matches"]
+    )
+
+
+def write_frames_zip(frames: list, stream) -> None:
+    """Stream (file name, DataFrame) pairs into a zip archive of CSVs."""
+    with zipfile.ZipFile(stream, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        used = set()
+        for filename, df in frames:
+            # A preloaded and an uploaded file may share a name
+            stem, dot, ext = filename.rpartition(".") if "." in filename else (filename, "", "")
+            n = 1
+            while filename in used:
+                n += 1
+                filename = f"{stem}~{n}{dot}{ext}"
+            used.add(filename)
+            with zf.open(filename, "w") as member, io.TextIOWrapper(member, encoding="utf-8", newline="") as text:
+                df.to_csv(text, index=False)
+
+
+def write_zip(results: list, stream) -> None:
+    """Stream a summary CSV and one CSV of common items per result into a zip archive."""
+    frames = [("comparison_summary.csv", summary_frame(results))]
+    frames += [(f"common_items_{name}", common_df) for name, _, common_df in results]
+    write_frames_zip(frames, stream)
+
+
+def _sheet_names(names: list) -> list:
+    """Return unique, Excel-safe sheet names for the given file names."""
+    used = {"Summary"}
+    sheet_names = []
+    for name in names:
+        base = _SHEET_INVALID.sub("_", name.rsplit(".", 1)[0])[:31] or "Sheet"
+        candidate, n = base, 1
+        while candidate in used:
+            n += 1
+            suffix = f"~{n}"
+            candidate = base[: 31 - len(suffix)] + suffix
+        used.add(candidate)
+        sheet_names.append(candidate)
+    return sheet_names
+
+
+def write_frames_xlsx(frames: list, stream) -> None:
+    """Stream (sheet name, DataFrame) pairs into an xlsx workbook.
+
+    Uses openpyxl's write-only mode, so rows are written out as they are
+    appended instead of building every cell object in memory.
+    """
+    wb = Workbook(write_only=True)
+    for sheet_name, df in frames:
+        ws = wb.create_sheet(title=sheet_name)
+        ws.append(list(df.columns))
+        for row in df.itertuples(index=False):
+            ws.append([None if pd.isna(v) else v for v in row])
+    wb.save(stream)
+
+
+def write_xlsx(results: list, stream) -> None:
+    """Stream a Summary sheet plus one sheet of common items per result into an xlsx workbook."""
+    frames = [("Summary", summary_frame(results))]
+    frames += list(zip(_sheet_names([name for name, _, _ in results]), (df for _, _, df in results)))
+    write_frames_xlsx(frames, stream)
+
+
+def export_bytes(results: list, fmt: str) -> bytes:
+    """Build the full export ("zip" or "xlsx") of comparison results in one pass."""
+    buffer = io.BytesIO()
+    if fmt == "xlsx":
+        write_xlsx(results, buffer)
+    else:
+        write_zip(results, buffer)
+    return buffer.getvalue()
+
+
+def coverage_export_bytes(coverage: pd.DataFrame, details: pd.DataFrame, fmt: str) -> bytes:
+    """Export a batch coverage matrix ("zip" or "xlsx"): list x panel coverage and matches, plus every matched item."""
+    frames = [
+        ("Coverage", coverage.pivot(index="List", columns="Panel", values="Coverage").reset_index()),
+        ("Matches", coverage.pivot(index="List", columns="Panel", values="Matches").reset_index()),
+        ("Long", coverage),
+        ("Details", details),
+    ]
+    buffer = io.BytesIO()
+    if fmt == "xlsx":
+        write_frames_xlsx(frames, buffer)
+    else:
+        write_frames_zip([(f"coverage_{name.lower()}.csv", df) for name, df in frames], buffer)
+    return buffer.getvalue()
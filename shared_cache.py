@@ -0,0 +1,213 @@
+"""Result cache shared by every Streamlit and API server process on the host.
+
+Entries live in one SQLite database under cache/ and are addressed by a
+hash of what produced them (namespace plus the inputs, DataFrames and
+uploaded files included), so a quote or comparison computed by one
+worker is a hit in every other. The total size is bounded; the least
+recently used entries are evicted first.
+
+    cache = shared_cache.default()
+    result = cache.get_or_compute("quote", (catalog.sources, category, panels, n, account), compute)
+
+Values are pickled, so only this application's own processes should be
+able to write to the cache directory.
+"""
+import functools
+import hashlib
+import io
+import pickle
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import metrics
+from annotation_cache import CACHE_DIR
+
+DEFAULT_PATH = CACHE_DIR / "shared_cache.sqlite"
+
+# Upper bound on the pickled size of all entries together
+DEFAULT_MAX_BYTES = 512 * 1024 ** 2
+
+# Eviction trims to this fraction of the bound, so it does not run on every put
+_EVICT_TO = 0.9
+
+# A hit only rewrites the access time when it is older than this many seconds,
+# so hot entries are read without taking SQLite's single write lock
+ACCESS_RESOLUTION = 60
+
+LOOKUPS = metrics.counter("shared_cache_lookups_total", "Shared cache lookups, by namespace and result", ["namespace", "result"])
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key       TEXT    PRIMARY KEY,
+    namespace TEXT    NOT NULL,
+    value     BLOB    NOT NULL,
+    size      INTEGER NOT NULL,
+    created   REAL    NOT NULL,
+    accessed  REAL    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+CREATE INDEX IF NOT EXISTS entries_namespace ON entries (namespace);
+"""
+
+
+# ---------- Keys ----------
+def _feed(digest, value) -> None:
+    """Add a canonical encoding of value to the hash; tags keep different types from colliding."""
+    if isinstance(value, pd.DataFrame):
+        digest.update(b"D")
+        _feed(digest, [list(map(str, value.columns)), list(map(str, value.dtypes))])
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, pd.Series):
+        digest.update(b"S")
+        _feed(digest, [str(value.name), str(value.dtype)])
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray):
+        digest.update(b"A" + f"{value.dtype}{value.shape}".encode())
+        digest.update(np.ascontiguousarray(value).tobytes() if value.dtype != object else repr(value.tolist()).encode())
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        digest.update(b"B" + str(len(value)).encode() + b":")
+        digest.update(value)
+    elif isinstance(value, io.BytesIO):
+        # Uploaded files (Streamlit's UploadedFile is a BytesIO): hash the content, not the object
+        _feed(digest, value.getbuffer())
+    elif isinstance(value, dict):
+        digest.update(b"M" + str(len(value)).encode())
+        for k, v in sorted(value.items(), key=lambda item: repr(item[0])):
+            _feed(digest, k)
+            _feed(digest, v)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        items = sorted(value, key=repr) if isinstance(value, (set, frozenset)) else value
+        digest.update(b"L" + str(len(items)).encode())
+        for item in items:
+            _feed(digest, item)
+    elif value is None or isinstance(value, (str, int, float, bool, np.generic, Path)):
+        text = repr(value).encode()
+        digest.update(b"V" + str(len(text)).encode() + b":" + text)
+    else:
+        raise TypeError(f"Cannot build a cache key from {type(value).__name__}")
+
+
+def make_key(namespace: str, parts) -> str:
+    """Content-addressed key of a namespace and its inputs."""
+    digest = hashlib.blake2b(digest_size=20)
+    _feed(digest, [namespace, parts])
+    return f"{namespace}:{digest.hexdigest()}"
+
+
+# ---------- Cache ----------
+_MISSING = object()
+
+
+class SharedCache:
+    """Size-bounded LRU cache of pickled values in SQLite.
+
+    WAL mode and one connection per thread, as in annotation_cache, so
+    every session thread and server process reads concurrently while
+    writes are serialized by SQLite. hits / misses count this process's
+    lookups.
+    """
+
+    def __init__(self, path: Path = DEFAULT_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str, default=None):
+        """Return the cached value of key (marking it recently used, to ACCESS_RESOLUTION), or default."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT value, accessed FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                LOOKUPS.inc(namespace=key.split(":", 1)[0], result="miss")
+                return default
+            now = time.time()
+            if now - row[1] > ACCESS_RESOLUTION:
+                conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+        self.hits += 1
+        LOOKUPS.inc(namespace=key.split(":", 1)[0], result="hit")
+        return pickle.loads(row[0])
+
+    def put(self, key: str, value) -> None:
+        """Store value under key; values larger than the whole cache are not stored."""
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.max_bytes:
+            return
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, namespace, value, size, created, accessed) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, key.split(":", 1)[0], blob, len(blob), now, now),
+            )
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total > self.max_bytes:
+                self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Drop the least recently used entries beyond _EVICT_TO of the bound."""
+        conn.execute(
+            """
+            DELETE FROM entries WHERE key IN (
+                SELECT key FROM (
+                    SELECT key, SUM(size) OVER (ORDER BY accessed DESC, key) AS running FROM entries
+                ) WHERE running > ?
+            )
+            """,
+            (int(self.max_bytes * _EVICT_TO),),
+        )
+
+    def get_or_compute(self, namespace: str, parts, compute):
+        """Return the cached result for (namespace, parts), calling compute() and storing it on a miss.
+
+        Two workers missing at the same time both compute; the last write wins.
+        """
+        key = make_key(namespace, parts)
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self, namespace: str = None) -> None:
+        with self._connect() as conn:
+            if namespace is None:
+                conn.execute("DELETE FROM entries")
+            else:
+                conn.execute("DELETE FROM entries WHERE namespace = ?", (namespace,))
+
+    def stats(self) -> dict:
+        """Entries and bytes per namespace, plus this process's hits and misses."""
+        rows = self._connect().execute(
+            "SELECT namespace, COUNT(*), COALESCE(SUM(size), 0) FROM entries GROUP BY namespace"
+        ).fetchall()
+        return {
+            "namespaces": {namespace: {"entries": n, "bytes": size} for namespace, n, size in rows},
+            "bytes": sum(size for _, _, size in rows),
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+@functools.lru_cache(maxsize=None)
+def default() -> SharedCache:
+    """The process-wide cache at DEFAULT_PATH."""
+    return SharedCache()
@@ -0,0 +1,63 @@
+import types
+
+import pytest
+
+import annotation_cache
+from annotation_cache import AnnotationCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = types.SimpleNamespace(value=1_000_000.0)
+    monkeypatch.setattr(annotation_cache, "time", types.SimpleNamespace(time=lambda: now.value))
+    return now
+
+
+def test_lookups_expire_after_ttl(tmp_path, clock):
+    cache = AnnotationCache(tmp_path / "cache.sqlite", ttl=100)
+    cache.put_accessions({"IL6": "P05231", "NOSUCH": None}, 9606)
+    cache.put_details({"P05231": ("Interleukin-6", "Cytokine", "GO:0005615")})
+
+    clock.value += 99
+    assert cache.get_accessions(["IL6", "NOSUCH", "TNF"], 9606) == {"IL6": "P05231", "NOSUCH": None}
+    assert cache.get_details(["P05231"]) == {"P05231": ("Interleukin-6", "Cytokine", "GO:0005615")}
+
+    clock.value += 2
+    assert cache.get_accessions(["IL6", "NOSUCH"], 9606) == {}
+    assert cache.get_details(["P05231"]) == {}
+
+
+def test_refresh_restarts_the_ttl(tmp_path, clock):
+    cache = AnnotationCache(tmp_path / "cache.sqlite", ttl=100)
+    cache.put_accessions({"IL6": "P05231"}, 9606)
+    clock.value += 60
+    cache.put_accessions({"IL6": "P05231"}, 9606)
+    clock.value += 60
+
+    assert cache.get_accessions(["IL6"], 9606) == {"IL6": "P05231"}
+
+
+def test_organisms_are_kept_apart(tmp_path, clock):
+    cache = AnnotationCache(tmp_path / "cache.sqlite")
+    cache.put_accessions({"IL6": "P05231"}, 9606)
+    cache.put_accessions({"IL6": "P08505"}, 10090)
+
+    assert cache.get_accessions(["IL6"], 10090) == {"IL6": "P08505"}
+
+
+def test_purge_removes_only_expired_rows(tmp_path, clock):
+    cache = AnnotationCache(tmp_path / "cache.sqlite", ttl=100)
+    cache.put_accessions({"OLD": "P1"}, 9606)
+    clock.value += 150
+    cache.put_accessions({"NEW": "P2"}, 9606)
+
+    cache.purge_expired()
+    rows = cache._connect().execute("SELECT symbol FROM symbols").fetchall()
+
+    assert rows == [("NEW",)]
+
+
+def test_shared_between_instances(tmp_path, clock):
+    AnnotationCache(tmp_path / "cache.sqlite").put_details({"P05231": ("Interleukin-6",)})
+
+    assert AnnotationCache(tmp_path / "cache.sqlite").get_details(["P05231"]) == {"P05231": ("Interleukin-6",)}
@@ -0,0 +1,95 @@
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+from annotation_jobs import AnnotationJob
+from uniprot_client import ANNOTATION_COLUMNS
+
+
+def _annotate(symbols, failed=()):
+    blank = [""] * (len(ANNOTATION_COLUMNS) - 3)
+    df = pd.DataFrame([[s, f"ID_{s}", f"Name {s}", *blank] for s in symbols], columns=ANNOTATION_COLUMNS)
+    df.attrs["unresolved"] = [s for s in symbols if s in failed]
+    return df
+
+
+def test_interrupted_job_resumes_from_checkpoint(tmp_path):
+    symbols = ["A", "B", "C", "A", None]
+    seen = []
+
+    def annotate(chunk):
+        seen.extend(chunk)
+        return _annotate(chunk)
+
+    first = AnnotationJob(symbols, 9606, jobs_dir=tmp_path)
+    next(first.run(annotate, chunk_size=2))  # stop after the first chunk
+
+    second = AnnotationJob(symbols, 9606, jobs_dir=tmp_path)
+    assert second.completed == 2
+    list(second.run(annotate, chunk_size=2))
+
+    assert seen == ["A", "B", "C"]
+    result = second.result()
+    assert result["Protein Symbol"].tolist()[:4] == ["A", "B", "C", "A"]
+    assert result["UniProt ID"].tolist()[:4] == ["ID_A", "ID_B", "ID_C", "ID_A"]
+    assert result["Protein Symbol"].isna().tolist() == [False] * 4 + [True]
+    assert not second.path.exists()
+
+
+def test_failed_lookups_are_not_checkpointed(tmp_path):
+    job = AnnotationJob(["A", "B"], 9606, jobs_dir=tmp_path)
+    steps = job.run(lambda chunk: _annotate(chunk, failed={"B"}), chunk_size=1)
+    next(steps)
+    next(steps)
+
+    assert job.unresolved == ["B"]
+    assert job.result()["Protein Symbol"].tolist() == ["A", "B"]
+    assert [json.loads(line)[0] for line in job.path.read_text().splitlines()] == ["A"]
+
+
+def test_expired_checkpoint_is_discarded(tmp_path):
+    job = AnnotationJob(["A", "B"], 9606, jobs_dir=tmp_path)
+    next(job.run(_annotate, chunk_size=1))
+    stamp = time.time() - 120
+    os.utime(job.path, (stamp, stamp))
+
+    assert AnnotationJob(["A", "B"], 9606, jobs_dir=tmp_path, ttl=60).completed == 0
+    assert not job.path.exists()
+
+
+def test_damaged_lines_are_skipped(tmp_path):
+    job = AnnotationJob(["A", "B", "C"], 9606, jobs_dir=tmp_path)
+    next(job.run(_annotate, chunk_size=1))
+    with open(job.path, "a", encoding="utf-8") as f:
+        f.write('["B", "ID_B", "Na\n7\n["C", "ID_')
+
+    resumed = AnnotationJob(["A", "B", "C"], 9606, jobs_dir=tmp_path)
+
+    assert resumed.pending() == ["B", "C"]
+    assert job.path.read_text().endswith("7\n")
+
+
+def test_sessions_sharing_a_checkpoint(tmp_path):
+    symbols = [f"S{i}" for i in range(400)]
+    errors = []
+
+    def session():
+        try:
+            job = AnnotationJob(symbols, 9606, jobs_dir=tmp_path)
+            for _ in job.run(_annotate, chunk_size=7):
+                # Every line another session left must still parse
+                AnnotationJob(symbols, 9606, jobs_dir=tmp_path)
+            assert job.result()["UniProt ID"].tolist() == [f"ID_{s}" for s in symbols]
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=session) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
@@ -0,0 +1,122 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+import api_server
+import pricing_catalog
+import shared_cache
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    # Compiled in memory from the shipped sources; no snapshot is written
+    tables, sources, warnings = pricing_catalog.compile_catalog()
+    return pricing_catalog.Catalog(tables, sources, warnings)
+
+
+@pytest.fixture
+def base_url(tmp_path, monkeypatch, catalog):
+    cache = shared_cache.SharedCache(tmp_path / "shared_cache.sqlite")
+    monkeypatch.setattr(shared_cache, "default", lambda: cache)
+    monkeypatch.setattr(pricing_catalog, "current", lambda: catalog)
+    server = api_server.make_server("127.0.0.1", 0, workers=2)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def _call(url: str, body=None) -> tuple:
+    """(status, content type, body) of a GET, or a POST when body is given."""
+    data = body if isinstance(body, (bytes, type(None))) else json.dumps(body).encode("utf-8")
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=data), timeout=30) as response:
+            return response.status, response.headers["Content-Type"], response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers["Content-Type"], e.read()
+
+
+def _json(url: str, body=None) -> tuple:
+    status, _, payload = _call(url, body)
+    return status, json.loads(payload)
+
+
+def test_health_and_listings(base_url):
+    status, health = _json(f"{base_url}/health")
+    assert status == 200
+    assert health["status"] == "ok"
+    assert health["shared_cache"]["namespaces"] == {}
+
+    status, listing = _json(f"{base_url}/panels")
+    assert status == 200
+    assert "Olink_Explore_384_Inf.csv" in listing["panels"]
+
+    status, listing = _json(f"{base_url}/categories")
+    assert status == 200
+    explore = next(c for c in listing["categories"] if c["category"] == "Olink Explore Panels")
+    assert "Inflammation I" in explore["combinable"]
+    assert "Internal" in listing["accounts"]
+
+
+def test_quote_is_cached_and_reports_valid_counts(base_url):
+    request = {"category": "Olink Target 96 Panels", "panels": ["T96 Inflammation"], "num_samples": 88}
+
+    status, first = _json(f"{base_url}/quote", request)
+    _, second = _json(f"{base_url}/quote", request)
+
+    assert status == 200
+    assert first == second
+    assert first["category"] == "Olink Target 96 Panels"
+    assert 88 in first["valid_sample_counts"]
+    assert shared_cache.default().stats()["hits"] == 1
+
+
+@pytest.mark.parametrize("request_body, message", [
+    ({"category": "Olink Target 96 Panels", "panels": ["T96 Inflammation"]}, "quote needs"),
+    ({"category": "Olink Target 96 Panels", "panels": ["T96 Inflammation"], "num_samples": "many"}, "quote needs"),
+    ({"category": "Olink Target 96 Panels", "panels": ["T96 Inflammation"], "num_samples": 88, "account": "Friends"},
+     "Unknown account type"),
+    (b"{not json", "not valid JSON"),
+    ([1, 2], "must be a JSON object"),
+])
+def test_quote_rejects_bad_requests(base_url, request_body, message):
+    status, payload = _json(f"{base_url}/quote", request_body)
+
+    assert status == 400
+    assert message in payload["error"]
+
+
+def test_compare_matches_query_against_panels(base_url):
+    request = {"query": ["P05231", "P99999"], "panels": ["Olink_Explore_384_Inf.csv", "Alamar_Inf_250.csv"]}
+
+    status, payload = _json(f"{base_url}/compare", request)
+
+    assert status == 200
+    assert {r["panel"]: r["items"] for r in payload["results"]} == {
+        "Olink_Explore_384_Inf.csv": ["P05231"],
+        "Alamar_Inf_250.csv": ["P05231"],
+    }
+    assert payload["errors"] == []
+
+
+def test_compare_rejects_unknown_panels(base_url):
+    status, payload = _json(f"{base_url}/compare", {"query": ["P05231"], "panels": ["Nope.csv"]})
+
+    assert status == 400
+    assert payload["error"] == "Unknown panels: Nope.csv"
+
+
+def test_unknown_endpoint_and_metrics(base_url):
+    status, payload = _json(f"{base_url}/nowhere")
+    assert status == 404
+    assert payload["error"] == "No endpoint GET /nowhere"
+
+    status, content_type, text = _call(f"{base_url}/metrics")
+    assert status == 200
+    assert content_type.startswith("text/plain")
+    assert 'api_requests_total{endpoint="unknown",status="404"}' in text.decode("utf-8")
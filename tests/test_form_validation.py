@@ -0,0 +1,100 @@
+import openpyxl as xl
+import pandas as pd
+
+import form_templates
+import form_validation
+
+FIELDS = {"quote_number": "Q123", "customer_name": "Ada", "sample_type": "Plasma"}
+
+
+def _plate_form(rows: list, fields: dict = None) -> dict:
+    """An Olink form with rows of (well, name, plate_name, volume) from Excel row 38."""
+    samples = pd.DataFrame(rows, columns=["well", "name", "plate_name", "volume"], dtype=object)
+    samples.insert(0, "row", range(38, 38 + len(samples)))
+    samples.insert(1, "plate", (samples["row"] - 38) // 88 + 1)
+    return {"template": "olink", "fields": {**FIELDS, **(fields or {})}, "samples": samples}
+
+
+def _problems(report: pd.DataFrame) -> list:
+    return list(zip(report["cell"], report["rule"]))
+
+
+def test_clean_form_has_no_problems():
+    form = _plate_form([("A1", "S1", "Plate 1", 20), ("B1", "S2", "Plate 1", "15.5")])
+
+    report = form_validation.validate(form, "form.xlsx")
+
+    assert report.empty
+    assert list(report.columns) == form_validation.REPORT_COLUMNS
+
+
+def test_sample_rules_report_their_cells_in_sheet_order():
+    form = _plate_form([
+        ("A1", "S1", "Plate 1", 20),
+        ("B1", None, None, None),             # gap before the next named row
+        ("C1", "S1", "Plate 1", 0),           # duplicate name, volume must be > 0
+        ("D13", "S:3", "Plate 2", "ten"),     # bad well, disallowed character, other plate name, not a number
+        ("E1", "Ünï", None, 5),               # non-ASCII name, plate name missing
+    ])
+
+    report = form_validation.validate(form)
+
+    assert _problems(report) == [
+        ("B38", "unique"),
+        ("B39", "no_gaps"),
+        ("B40", "unique"),
+        ("D40", "range"),
+        ("A41", "regex"),
+        ("B41", "name_chars"),
+        ("C41", "one_per_plate"),
+        ("D41", "range"),
+        ("B42", "name_chars"),
+        ("C42", "required"),
+    ]
+    assert report.loc[report["cell"] == "D41", "value"].item() == "ten"
+
+
+def test_required_fields():
+    form = _plate_form([("A1", "S1", "Plate 1", 20)], {"quote_number": " ", "customer_name": None})
+
+    report = form_validation.validate(form)
+
+    assert _problems(report) == [("D14", "required"), ("D15", "required")]
+
+
+def test_library_rules():
+    samples = pd.DataFrame({
+        "row": [12, 13], "plate": [1, 1], "name": ["L1", "L2"], "sample_type": ["rna", "Protein"],
+        "concentration": [1.5, 2], "volume": [10, 10], "rin": [7, 11], "ratio_260_280": [1.9, None],
+        "ratio_260_230": [None, -1], "well": ["A:1", "A1"],
+    }, dtype=object)
+    form = {"template": "library", "fields": FIELDS, "samples": samples}
+
+    report = form_validation.validate(form)
+
+    assert _problems(report) == [("B13", "choices"), ("H13", "range"), ("J13", "range"), ("N13", "regex")]
+
+
+def test_filled_template_round_trip(tmp_path):
+    wb = xl.load_workbook(form_templates.template_path("olink"))
+    ws = wb[form_templates.TEMPLATES["olink"]["sheet"]]
+    for ref, value in {"D14": "Ada", "D15": "Q123", "D27": "Plasma"}.items():
+        ws[ref] = value
+    for row, (name, volume) in enumerate([("S1", 20), ("S1", 20), ("S3", None)], start=38):
+        ws[f"B{row}"], ws[f"C{row}"], ws[f"D{row}"] = name, "Plate 1", volume
+    path = tmp_path / "filled.xlsx"
+    wb.save(path)
+
+    report = form_validation.validate_workbook(path, "filled.xlsx")
+
+    assert set(report["template"]) == {"olink"}
+    assert _problems(report) == [("B38", "unique"), ("B39", "unique"), ("D40", "range")]
+
+
+def test_unknown_workbook_is_one_report_row(tmp_path):
+    path = tmp_path / "other.xlsx"
+    xl.Workbook().save(path)
+
+    report = form_validation.validate_workbook(path, "other.xlsx")
+
+    assert report[["file", "rule"]].values.tolist() == [["other.xlsx", "template"]]
@@ -0,0 +1,80 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import index_optimizer
+import plate_layout
+
+
+def _kit(wells: int = 96, length: int = 8, seed: int = 1) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    sequences = lambda: ["".join(rng.choice(list("ACGT"), length)) for _ in range(wells)]
+    return pd.DataFrame({
+        "Well": plate_layout.all_wells(96).tolist()[:wells],
+        "i7": sequences(),
+        "i5": sequences(),
+    })
+
+
+def test_pair_avoids_dark_cycles_on_two_colour():
+    # G is dark: any pair with GGGG misses a channel; GGGT + TTTT is clean but closer than CCCC + TTTT
+    kit = pd.DataFrame({"Well": ["A1", "B1", "C1", "D1"], "i7": ["GGGG", "TTTT", "CCCC", "GGGT"]})
+
+    result = index_optimizer.optimize(kit, 2)
+
+    assert result["dark_cycles"] == 0
+    assert sorted(result["wells"]) == ["B1", "C1"]
+
+
+def test_four_colour_needs_every_base_at_every_cycle():
+    counts = index_optimizer.one_hot(["AC", "CG", "GT", "TA"]).astype(int)
+
+    dark, _ = index_optimizer.composition(counts.sum(0), 4, "four-colour")
+    # Red / green pairs would call this balanced; one base per channel does not
+    dark_pair, _ = index_optimizer.composition(counts[[0, 2]].sum(0), 2, "four-colour")
+
+    assert dark == 0
+    assert dark_pair == 2
+
+
+def test_unknown_chemistry():
+    with pytest.raises(ValueError):
+        index_optimizer.composition(np.zeros((8, 4), dtype=int), 1, "three-colour")
+
+
+@pytest.mark.parametrize("n", [2, 3, 12, 48])
+def test_suggestion_is_balanced_separated_and_fast(n):
+    kit = _kit()
+
+    started = time.perf_counter()
+    result = index_optimizer.optimize(kit, n)
+    elapsed = time.perf_counter() - started
+
+    assert len(result["wells"]) == n
+    assert len(set(result["wells"])) == n
+    assert result["dark_cycles"] == 0
+    assert result["min_distance"] >= index_optimizer.MIN_DISTANCE
+    assert elapsed < 1.0
+
+
+def test_exhaustive_matches_brute_force():
+    kit = _kit(wells=12, length=6)
+    encoded = np.concatenate([index_optimizer.one_hot(kit["i7"]), index_optimizer.one_hot(kit["i5"])], axis=1)
+    distances = index_optimizer.hamming_matrix(encoded)
+    counts_of = encoded.astype(np.int32)
+
+    chosen = index_optimizer.exhaustive(encoded, distances, 3, block=7)
+    best = max(
+        index_optimizer._set_score(counts_of, distances, np.array([i, j, k]), "two-colour")
+        for i in range(12) for j in range(i + 1, 12) for k in range(j + 1, 12)
+    )
+
+    assert index_optimizer._set_score(counts_of, distances, chosen, "two-colour") == pytest.approx(best)
+
+
+def test_more_samples_than_wells_uses_the_whole_kit():
+    kit = _kit(wells=5)
+
+    assert sorted(index_optimizer.optimize(kit, 8)["wells"]) == sorted(kit["Well"])
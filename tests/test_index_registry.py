@@ -0,0 +1,59 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from index_registry import IndexRegistry, normalize
+
+
+def _manifest(batch: str, samples: list, pairs: list) -> pd.DataFrame:
+    return normalize(pd.DataFrame({
+        "Sample": samples,
+        "batch": batch,
+        "i5": [i5 for i5, _ in pairs],
+        "i7": [i7 for _, i7 in pairs],
+    }), "Sample")
+
+
+def test_reports_pair_reused_in_batch_and_sample_sequenced_before(tmp_path):
+    registry = IndexRegistry(tmp_path / "registry.sqlite")
+    registry.record(_manifest("B1", ["S1", "S2"], [("aaaa", "cccc"), ("gggg", "tttt")]), "run1.csv")
+
+    found = registry.conflicts(_manifest("B1", ["S3", "S1"], [("AAAA", "CCCC"), ("ACGT", "TGCA")]))
+
+    assert found[["row", "conflict", "previous_sample", "previous_file"]].values.tolist() == [
+        [0, "index pair already used in this batch", "S1", "run1.csv"],
+        [1, "sample already sequenced", "S1", "run1.csv"],
+    ]
+
+
+def test_pairs_only_conflict_within_their_batch(tmp_path):
+    registry = IndexRegistry(tmp_path / "registry.sqlite")
+    registry.record(_manifest("B1", ["S1"], [("AAAA", "CCCC")]))
+
+    assert registry.conflicts(_manifest("B2", ["S2"], [("AAAA", "CCCC")])).empty
+
+
+def test_manifest_is_not_checked_against_itself_or_the_draft_it_replaces(tmp_path):
+    registry = IndexRegistry(tmp_path / "registry.sqlite")
+    draft = _manifest("B1", ["S1", "S2"], [("AAAA", "CCCC"), ("GGGG", "TTTT")])
+    draft_id = registry.record(draft)
+    final = _manifest("B1", ["S1", "S2"], [("AAAA", "CCCC"), ("GGGA", "TTTT")])
+
+    assert registry.conflicts(draft).empty
+    assert len(registry.conflicts(final)) == 3  # S1's pair, and both samples
+    assert registry.conflicts(final, replaces=draft_id).empty
+
+    final_id = registry.record(final, replaces=draft_id)
+    assert registry.history()["id"].tolist() == [final_id]
+
+
+def test_conflicts_sees_manifests_recorded_by_another_connection(tmp_path):
+    path = tmp_path / "registry.sqlite"
+    checker = IndexRegistry(path)
+    incoming = _manifest("B1", ["S9"], [("AAAA", "CCCC")])
+
+    # One long-lived worker thread, so both checks reuse the same connection
+    with ThreadPoolExecutor(max_workers=1) as worker:
+        assert worker.submit(checker.conflicts, incoming).result().empty
+        IndexRegistry(path).record(_manifest("B1", ["S1"], [("AAAA", "CCCC")]))
+        assert len(worker.submit(checker.conflicts, incoming).result()) == 1
@@ -0,0 +1,131 @@
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+import metrics
+import panel_compare
+
+REPO = Path(__file__).resolve().parent.parent
+
+
+def _samples(text: str) -> dict:
+    return {line.rsplit(" ", 1)[0]: float(line.rsplit(" ", 1)[1])
+            for line in text.splitlines() if line and not line.startswith("#")}
+
+
+def test_render_counter_and_histogram():
+    runs = metrics.counter("test_render_runs_total", "Runs", ["app"])
+    seconds = metrics.histogram("test_render_seconds", "Seconds", buckets=(0.1, 1))
+    runs.inc(app='say "hi"')
+    runs.inc(2, app='say "hi"')
+    seconds.observe(0.05)
+    seconds.observe(0.5)
+    seconds.observe(5)
+
+    samples = _samples(metrics.render({"pid": 7}))
+
+    assert samples['tools_test_render_runs_total{app="say \\"hi\\"",pid="7"}'] == 3
+    assert samples['tools_test_render_seconds_bucket{le="0.1",pid="7"}'] == 1
+    assert samples['tools_test_render_seconds_bucket{le="1",pid="7"}'] == 2
+    assert samples['tools_test_render_seconds_bucket{le="+Inf",pid="7"}'] == 3
+    assert samples['tools_test_render_seconds_count{pid="7"}'] == 3
+    assert samples['tools_test_render_seconds_sum{pid="7"}'] == 5.55
+
+
+def test_defining_a_metric_again_returns_it():
+    assert metrics.counter("test_again_total", "Again") is metrics.counter("test_again_total", "Again")
+
+
+def test_merge_sums_processes_and_drops_pid():
+    first = '# HELP tools_x_total X\n# TYPE tools_x_total counter\ntools_x_total{app="a",pid="1"} 2\n'
+    second = '# HELP tools_x_total X\n# TYPE tools_x_total counter\ntools_x_total{app="a",pid="2"} 3\n'
+
+    merged = metrics.merge([first, second])
+
+    assert "# TYPE tools_x_total counter" in merged
+    assert _samples(merged) == {'tools_x_total{app="a"}': 5}
+
+
+def _export(directory: Path, pid: int, value: int, age: float = 0) -> Path:
+    path = directory / f"{pid}.prom"
+    path.write_text(f'# TYPE tools_x_total counter\ntools_x_total{{pid="{pid}"}} {value}\n', encoding="utf-8")
+    if age:
+        stamp = time.time() - age
+        os.utime(path, (stamp, stamp))
+    return path
+
+
+def _dead_pid() -> int:
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def test_retired_processes_keep_counting(tmp_path):
+    path = _export(tmp_path, 101, 4)
+    _export(tmp_path, os.getpid(), 1)
+
+    assert metrics.retire(path, tmp_path)
+    assert not metrics.retire(path, tmp_path)
+    assert not path.exists()
+    assert _samples(metrics.merged_files(tmp_path)) == {"tools_x_total": 5}
+
+
+def test_stale_file_of_a_dead_process_is_retired_not_dropped(tmp_path):
+    dead = _export(tmp_path, _dead_pid(), 4, age=metrics.STALE_AFTER + 10)
+    hung = _export(tmp_path, os.getpid(), 1, age=metrics.STALE_AFTER + 10)
+
+    assert _samples(metrics.merged_files(tmp_path)) == {"tools_x_total": 5}
+    assert not dead.exists()
+    assert hung.exists()
+    assert (tmp_path / metrics.RETIRED_FILE).exists()
+
+
+def test_exiting_exporter_folds_its_totals_in(tmp_path):
+    script = (
+        "import metrics\n"
+        "metrics.counter('test_exit_total', 'Exits').inc(3)\n"
+        f"metrics.start_exporter({str(tmp_path)!r}, interval=60)\n"
+    )
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", script], cwd=REPO, check=True)
+
+    assert list(tmp_path.glob("[0-9]*.prom")) == []
+    assert _samples(metrics.merged_files(tmp_path))["tools_test_exit_total"] == 6
+
+
+def test_timed_counts_calls_and_observes_seconds():
+    calls = metrics.counter("test_timed_total", "Calls", ["kind"])
+    seconds = metrics.histogram("test_timed_seconds", "Seconds", ["kind"])
+
+    @metrics.timed(calls, seconds, kind="x")
+    def work(value):
+        """Doubles."""
+        if value is None:
+            raise ValueError("no value")
+        return value * 2
+
+    assert work(2) == 4
+    try:
+        work(None)
+    except ValueError:
+        pass
+    samples = _samples(metrics.render())
+
+    assert work.__doc__ == "Doubles."
+    assert samples['tools_test_timed_total{kind="x"}'] == 2
+    assert samples['tools_test_timed_seconds_count{kind="x"}'] == 2
+
+
+def test_comparisons_are_counted_by_kind():
+    def count():
+        return _samples(metrics.render()).get('tools_comparisons_total{kind="panels"}', 0)
+
+    before = count()
+    panel_compare.compare_sources([("panel", pd.DataFrame({"UniProt": ["P1"]}))], pd.DataFrame({"UniProt": ["P1"]}), "UniProt")
+
+    assert count() == before + 1
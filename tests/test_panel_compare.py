@@ -0,0 +1,60 @@
+import io
+
+import pandas as pd
+
+import panel_compare
+
+
+def _csv(text: str) -> io.BytesIO:
+    return io.BytesIO(text.encode("utf-8"))
+
+
+def test_stream_skips_blank_lines():
+    source = _csv("UniProt,Name\nP1,a\n\nP2,b\nP4,d\n\n\nP5,e\n")
+    custom = pd.DataFrame({"UniProt": ["P2", "P5"]})
+
+    common = panel_compare.stream_common_items(source, custom, "UniProt", chunksize=2)
+
+    assert common["UniProt"].tolist() == ["P2", "P5"]
+    assert common["Name"].tolist() == ["b", "e"]
+
+
+def test_stream_handles_quoted_line_breaks():
+    source = _csv('UniProt,Name\nP1,"first\nline"\nP2,"second, with comma"\nP3,"third\n\nline"\nP4,d\n')
+    custom = pd.DataFrame({"UniProt": ["P2", "P4"]})
+
+    common = panel_compare.stream_common_items(source, custom, "UniProt", chunksize=1)
+
+    assert common["UniProt"].tolist() == ["P2", "P4"]
+    assert common["Name"].tolist() == ["second, with comma", "d"]
+
+
+def test_stream_matches_loaded_comparison():
+    text = 'UniProt,Name\nP1,a\n\nP2,"b\nb"\nP3,c\n\nP4,d\nP5,e\n'
+    custom = pd.DataFrame({"UniProt": ["P1", "P3", "P5", "P9"]})
+
+    streamed = panel_compare.stream_common_items(_csv(text), custom, "UniProt", chunksize=2)
+    loaded = panel_compare.find_common_items(pd.read_csv(_csv(text)), custom, "UniProt")
+
+    pd.testing.assert_frame_equal(streamed.reset_index(drop=True), loaded.reset_index(drop=True))
+
+
+def test_compare_sources_streams_uploads_without_errors():
+    source = _csv("UniProt,Name\nP1,a\n\nP2,b\nP4,d\nP5,e\n")
+    custom = pd.DataFrame({"UniProt": ["P2", "P5"]})
+
+    results, skipped, errors = panel_compare.compare_sources([("upload.csv", source)], custom, "UniProt")
+
+    assert errors == []
+    assert skipped == []
+    assert [(name, count) for name, count, _ in results] == [("upload.csv", 2)]
+
+
+def test_stream_without_matches_keeps_columns():
+    source = _csv("UniProt,Name\nP1,a\n")
+    custom = pd.DataFrame({"UniProt": ["P9"]})
+
+    common = panel_compare.stream_common_items(source, custom, "UniProt")
+
+    assert common.empty
+    assert list(common.columns) == ["UniProt", "Name"]
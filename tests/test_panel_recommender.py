@@ -0,0 +1,65 @@
+import pandas as pd
+
+import panel_recommender
+
+NO_ALIASES = pd.Series(dtype=str, name="target")
+
+# Greedy takes the big panel first and then needs both small ones; two panels are enough
+KEY_SETS = {
+    "big.csv": frozenset({"A", "B", "C", "D"}),
+    "left.csv": frozenset({"A", "B", "E"}),
+    "right.csv": frozenset({"C", "D", "F"}),
+    "empty.csv": frozenset({"Z"}),
+}
+QUERY = pd.Series(["A", "B", "C", "D", "E", "F", "Q"])
+
+
+def _bitsets():
+    return panel_recommender.coverage_bitsets(QUERY, KEY_SETS, NO_ALIASES)
+
+
+def test_bitsets_mark_covered_items():
+    items, bitsets = _bitsets()
+
+    assert items == ["A", "B", "C", "D", "E", "F", "Q"]
+    assert bitsets["big.csv"] == 0b0001111
+    assert bitsets["left.csv"] == 0b0010011
+    assert bitsets["empty.csv"] == 0
+
+
+def test_greedy_is_beaten_by_exact_cover():
+    _, bitsets = _bitsets()
+    weights = {name: 1.0 for name in bitsets}
+    universe = 0b0111111
+
+    greedy = panel_recommender.greedy_cover(bitsets, weights, universe)
+    exact = panel_recommender.exact_covers(bitsets, weights, max_panels=3, top=1)
+
+    assert greedy[0] == "big.csv" and len(greedy) == 3
+    assert exact == [["left.csv", "right.csv"]]
+
+
+def test_weights_steer_the_greedy_choice():
+    _, bitsets = _bitsets()
+    weights = {"big.csv": 10.0, "left.csv": 1.0, "right.csv": 1.0, "empty.csv": 1.0}
+
+    assert panel_recommender.greedy_cover(bitsets, weights, 0b0111111) == ["left.csv", "right.csv"]
+
+
+def test_dominated_panels_are_not_candidates():
+    bitsets = {"a": 0b011, "b": 0b111, "c": 0b111, "d": 0}
+    weights = {"a": 1.0, "b": 1.0, "c": 2.0, "d": 1.0}
+
+    assert panel_recommender._non_dominated(bitsets, weights) == {"b": 0b111}
+
+
+def test_recommendation_ranks_full_cover_by_cost():
+    prices = {"big.csv": 100.0, "left.csv": 80.0, "right.csv": 80.0}
+
+    ranking, uncovered = panel_recommender.recommend_panels(QUERY, KEY_SETS, NO_ALIASES, prices=prices)
+
+    assert uncovered == ["Q"]
+    best = ranking.loc[1]
+    assert (best["Panels"], best["Covered"], best["Cost"]) == ("left.csv, right.csv", 6, 160.0)
+    assert ranking["Covered"].is_monotonic_decreasing
+    assert "empty.csv" not in " ".join(ranking["Panels"])
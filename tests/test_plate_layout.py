@@ -0,0 +1,87 @@
+import math
+
+import numpy as np
+import pytest
+
+import plate_layout
+
+
+def _legacy_row(old_loc: int) -> int:
+    """The float-based well -> sheet row offset manifests used before plate_layout (removed change())."""
+    new_row = math.ceil(old_loc / 12)
+    scale = (old_loc - 1) * 8 + new_row
+    f13 = (new_row - 1) * 13
+    plate_loc = math.ceil(old_loc / 96)
+    return int(scale - (f13 / 13 * 96) - ((plate_loc - 1) * 8))
+
+
+@pytest.mark.parametrize("plate", [1, 2, 5])
+def test_positions_match_legacy_sheet_rows(plate):
+    wells = np.arange(86)
+
+    rows = plate_layout.positions(plate, wells) + 37
+
+    assert rows.tolist() == [_legacy_row(w) + 96 * (plate - 1) + 36 for w in range(1, 87)]
+
+
+def test_well_index_parses_every_spelling():
+    names = ["A1", "B01", "c:12", " h-12 ", "I1", "A13", "A0", "", None, "P24"]
+
+    assert plate_layout.well_index(names).tolist() == [0, 12, 35, 95, -1, -1, -1, -1, -1, -1]
+    assert plate_layout.well_index(["P24", "I1"], 384).tolist() == [383, 192]
+
+
+def test_names_round_trip():
+    for wells in plate_layout.FORMATS:
+        names = plate_layout.all_wells(wells)
+        assert plate_layout.well_index(names, wells).tolist() == list(range(wells))
+        assert plate_layout.well_index(plate_layout.all_wells(wells, pad=True), wells).tolist() == list(range(wells))
+
+    assert plate_layout.all_wells(96, order="column")[:3].tolist() == ["A1", "B1", "C1"]
+    assert plate_layout.well_names([0, 95], pad=True).tolist() == ["A01", "H12"]
+
+
+def test_orders_are_inverse_permutations():
+    for wells in plate_layout.FORMATS:
+        index = np.arange(wells)
+        column = plate_layout.to_order(index, wells)
+        assert sorted(column.tolist()) == index.tolist()
+        assert plate_layout.from_order(column, wells).tolist() == index.tolist()
+    assert plate_layout.to_order([1, 12], 96).tolist() == [8, 1]  # A2 is 9th, B1 2nd column-wise
+
+
+def test_sort_wells():
+    names = ["B1", "A02", "x", "A1", "H12"]
+
+    assert plate_layout.sort_wells(names) == ["A1", "A02", "B1", "H12", "x"]
+    assert plate_layout.sort_wells(names, order="column") == ["A1", "B1", "A02", "H12", "x"]
+
+
+def test_stamp_quadrants_cover_384_once():
+    index = np.arange(96)
+    stamped = np.concatenate([plate_layout.stamp(index, q) for q in range(4)])
+
+    assert sorted(stamped.tolist()) == list(range(384))
+    assert plate_layout.well_names(plate_layout.stamp([0], 1), 384).tolist() == ["A2"]
+    assert plate_layout.well_names(plate_layout.stamp([0], 2), 384).tolist() == ["B1"]
+    quadrant, source = plate_layout.unstamp(stamped)
+    assert quadrant.tolist() == np.repeat(np.arange(4), 96).tolist()
+    assert source.tolist() == np.tile(index, 4).tolist()
+
+
+def test_locate_inverts_positions():
+    positions = np.arange(300)
+
+    plates, wells = plate_layout.locate(positions, per_plate=88)
+
+    assert plates.tolist()[87:89] == [1, 2]
+    assert plate_layout.positions(plates, wells, per_plate=88).tolist() == positions.tolist()
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        plate_layout.layout(48)
+    with pytest.raises(ValueError):
+        plate_layout.stamp([0], 4)
+    with pytest.raises(ValueError):
+        plate_layout.to_order([0], order="diagonal")
@@ -0,0 +1,92 @@
+import pandas as pd
+import pytest
+
+import pricing
+import pricing_catalog
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    # Compiled in memory from the shipped sources; no snapshot is written
+    tables, sources, warnings = pricing_catalog.compile_catalog()
+    return pricing_catalog.Catalog(tables, sources, warnings)
+
+
+def _plan_cost(prices_df, rules_df, panels, samples, account):
+    plan = pricing.plan_batches(prices_df, rules_df, panels, samples, samples, account)
+    return plan.loc[0, "Total Cost"]
+
+
+@pytest.mark.parametrize("account", pricing.ACCOUNT_TYPES)
+@pytest.mark.parametrize("category, panels", [
+    ("Olink Explore Panels", ["Inflammation I", "Oncology I"]),  # bundles and sequencing kits
+    ("Olink Explore Panels", ["Reveal"]),
+    ("Olink Target 96 Panels", ["T96 Inflammation", "T96 Neurology", "T96 Metabolism"]),
+])
+def test_plan_costs_match_quote_on_full_batches(catalog, category, panels, account):
+    prices_df, rules_df = catalog.prices(category), catalog.rules()
+    batch = pricing.panel_details(prices_df, panels[0])[0]
+
+    for batches in (1, 3, 4, 9):
+        samples = batch * batches
+        quoted = pricing.quote(prices_df, rules_df, panels, samples, account)["total"]
+        assert _plan_cost(prices_df, rules_df, panels, samples, account) == pytest.approx(quoted, abs=0.01)
+
+
+def test_plan_rounds_partial_batches_up(catalog):
+    prices_df, rules_df = catalog.prices("Olink Target 96 Panels"), catalog.rules()
+
+    plan = pricing.plan_batches(prices_df, rules_df, ["T96 Inflammation"], 100, 100, "Internal")
+    quoted = pricing.quote(prices_df, rules_df, ["T96 Inflammation"], 176, "Internal")["total"]
+
+    assert plan.loc[0, "Batches"] == "T96 Inflammation x2"
+    assert plan.loc[0, "Wasted Wells"] == 76
+    assert plan.loc[0, "Total Cost"] == pytest.approx(quoted)
+
+
+def test_plan_ranks_candidates(catalog):
+    prices_df, rules_df = catalog.prices("Olink Target 96 Panels"), catalog.rules()
+
+    plan = pricing.plan_batches(prices_df, rules_df, ["T96 Inflammation"], 80, 180, "Internal", top=3)
+
+    assert list(plan.columns) == pricing.PLAN_COLUMNS
+    # Full batches tie on cost per sample and waste; the cheaper total goes first
+    assert plan["Samples"].tolist() == [88, 176, 175]
+    assert plan["Cost per Sample"].is_monotonic_increasing
+    by_waste = pricing.plan_batches(prices_df, rules_df, ["T96 Inflammation"], 80, 180, "Internal",
+                                    rank_by="Wasted Wells", top=2)
+    assert by_waste["Samples"].tolist() == [88, 176]
+
+
+def test_plan_applies_volume_discount_like_quote():
+    prices_df = pd.DataFrame({
+        "Panel Name": ["P"], "Batch Size": [10], "Panel type": ["Standalone"], "Product Name": ["Kit"],
+    })
+    rules_df = pd.DataFrame({
+        "Product Name": ["Kit"], "Internal Price": [100.0], "External Academic Price": [100.0],
+        "External Commercial Price": [100.0], "Sample Number for Discount": [3.0], "Discount Percentage": [10.0],
+        "Bundle Size": [float("nan")], "Bundle Factor": [float("nan")], "Bundle Product Name": [None],
+        "Sequencing Qty per Batch": [0.0], "Sequencing Kit": [None],
+    })
+
+    for samples in (10, 20, 30, 40):
+        quoted = pricing.quote(prices_df, rules_df, ["P"], samples, "Internal")["total"]
+        assert _plan_cost(prices_df, rules_df, ["P"], samples, "Internal") == pytest.approx(quoted)
+    assert _plan_cost(prices_df, rules_df, ["P"], 30, "Internal") == pytest.approx(270.0)
+
+
+def test_plan_without_priced_panels_is_empty(catalog):
+    plan = pricing.plan_batches(catalog.prices("Olink Target 96 Panels"), catalog.rules(), ["Nope"], 1, 10, "Internal")
+
+    assert plan.empty
+    assert list(plan.columns) == pricing.PLAN_COLUMNS
+
+
+def test_vat_only_for_external_accounts(catalog):
+    prices_df, rules_df = catalog.prices("Olink Target 96 Panels"), catalog.rules()
+
+    internal = pricing.quote(prices_df, rules_df, ["T96 Inflammation"], 88, "Internal")
+    external = pricing.quote(prices_df, rules_df, ["T96 Inflammation"], 88, "External Academic")
+
+    assert internal["vat"] == 0
+    assert external["vat"] == pytest.approx(external["total"] * pricing.VAT_RATE)
@@ -0,0 +1,126 @@
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import pricing_catalog
+from pricing_catalog import CatalogError
+
+REPO = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture
+def app_dir(tmp_path):
+    shutil.copytree(REPO / "olink_cost_files", tmp_path / "olink_cost_files")
+    return tmp_path
+
+
+@pytest.fixture
+def fresh(monkeypatch):
+    """Forget the catalog in service, so current() starts from the given sources."""
+    monkeypatch.setattr(pricing_catalog, "_current", None)
+    monkeypatch.setattr(pricing_catalog, "_errors", [])
+    monkeypatch.setattr(pricing_catalog, "_rejected", None)
+
+
+def _append(path: Path, line: str) -> None:
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(line + "\n")
+
+
+def _issues(app_dir) -> list:
+    with pytest.raises(CatalogError) as raised:
+        pricing_catalog.compile_catalog(app_dir)
+    return raised.value.issues
+
+
+def test_shipped_sources_compile(app_dir):
+    tables, sources, _ = pricing_catalog.compile_catalog(app_dir)
+
+    assert len(tables["categories"]) == 7
+    assert "olink_cost_files/pricing_rules.csv" in sources
+    target = tables["panels"][tables["panels"]["Panel Name"] == "T96 Cardiometabolic"]
+    assert target["Batch Size"].tolist() == [88]
+
+
+def test_rejects_bad_panel_rows(app_dir):
+    prices = app_dir / "olink_cost_files" / "Olink_Flex.csv"
+    _append(prices, "Flex 30,0,Combined,No Such Product")
+    _append(prices, "Flex 21,40,Standalone,Flex 21")
+
+    issues = _issues(app_dir)
+
+    assert "Olink_Flex.csv line 4: Batch Size must be a positive whole number" in issues
+    assert any(i.startswith("Olink_Flex.csv line 4: Panel type 'Combined'") for i in issues)
+    assert "Olink_Flex.csv line 4: Product Name 'No Such Product' has no rule in pricing_rules.csv" in issues
+    assert "Olink_Flex.csv: Panel Name 'Flex 21' is listed more than once" in issues
+
+
+def test_rejects_bad_rules(app_dir):
+    rules = app_dir / "olink_cost_files" / "pricing_rules.csv"
+    _append(rules, "Broken,ten,1,1,100,NA,2,1,Nowhere,0,NA")
+    row = len(pd.read_csv(rules)) + 1  # CSV line of the last row
+
+    issues = _issues(app_dir)
+
+    assert f"pricing_rules.csv line {row}: Internal Price 'ten' is not a number" in issues
+    assert f"pricing_rules.csv line {row}: Sample Number for Discount and Discount Percentage must be set together" in issues
+    assert f"pricing_rules.csv line {row}: Bundle Product Name 'Nowhere' has no rule" in issues
+
+
+def test_missing_prices_file_is_an_error(app_dir):
+    (app_dir / "olink_cost_files" / "Xenium.csv").unlink()
+
+    with pytest.raises(CatalogError) as raised:
+        pricing_catalog.compile_catalog(app_dir)
+
+    assert raised.value.sources["olink_cost_files/Xenium.csv"] is None
+
+
+def test_snapshot_round_trip(app_dir, tmp_path):
+    tables, sources, warnings = pricing_catalog.compile_catalog(app_dir)
+    path = tmp_path / "catalog.bin"
+
+    pricing_catalog.save_snapshot(tables, sources, warnings, path)
+    loaded, loaded_sources, loaded_warnings = pricing_catalog.load_snapshot(path)
+
+    for name, table in tables.items():
+        for field in table.dtype.names:
+            np.testing.assert_array_equal(loaded[name][field], table[field])
+    assert (loaded_sources, loaded_warnings) == (sources, warnings)
+
+
+def test_rejected_edit_keeps_last_good_catalog(app_dir, tmp_path, fresh, monkeypatch):
+    snapshot = tmp_path / "catalog.bin"
+    good = pricing_catalog.current(app_dir, snapshot)
+    prices = app_dir / "olink_cost_files" / "Olink_Flex.csv"
+    _append(prices, "Flex 30,forty,Standalone,Flex 21")
+
+    assert pricing_catalog.current(app_dir, snapshot) is good
+    assert pricing_catalog.errors() == ["Olink_Flex.csv line 4: Batch Size 'forty' is not a number",
+                                        "Olink_Flex.csv line 4: Batch Size must be a positive whole number"]
+
+    # The same rejected sources are not compiled again
+    compiles = []
+    compile_catalog = pricing_catalog.compile_catalog
+    monkeypatch.setattr(pricing_catalog, "compile_catalog", lambda *a: compiles.append(a) or compile_catalog(*a))
+    assert pricing_catalog.current(app_dir, snapshot) is good
+    assert compiles == []
+
+    _append(prices, "Flex 40,40,Standalone,Flex 21")
+    prices.write_text(prices.read_text(encoding="utf-8").replace("Flex 30,forty,", "Flex 30,40,"), encoding="utf-8")
+    fixed = pricing_catalog.current(app_dir, snapshot)
+
+    assert fixed is not good
+    assert pricing_catalog.errors() == []
+    assert "Flex 40" in fixed.prices("Olink Flex options")["Panel Name"].tolist()
+
+
+def test_no_good_catalog_raises(app_dir, tmp_path, fresh):
+    _append(app_dir / "olink_cost_files" / "Olink_Flex.csv", "Flex 30,forty,Standalone,Flex 21")
+
+    for _ in range(2):
+        with pytest.raises(CatalogError):
+            pricing_catalog.current(app_dir, tmp_path / "catalog.bin")
@@ -0,0 +1,100 @@
+import io
+import pickle
+import types
+
+import pandas as pd
+import pytest
+
+import shared_cache
+from shared_cache import SharedCache
+
+VALUE = b"x" * 1000
+SIZE = len(pickle.dumps(VALUE, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = types.SimpleNamespace(value=1_000_000.0)
+    monkeypatch.setattr(shared_cache, "time", types.SimpleNamespace(time=lambda: now.value))
+    return now
+
+
+def _keys(cache: SharedCache) -> list:
+    return sorted(k for (k,) in cache._connect().execute("SELECT key FROM entries"))
+
+
+def test_evicts_least_recently_used(tmp_path, clock):
+    cache = SharedCache(tmp_path / "cache.sqlite", max_bytes=4 * SIZE)
+    for key in ("t:a", "t:b", "t:c", "t:d"):
+        cache.put(key, VALUE)
+        clock.value += shared_cache.ACCESS_RESOLUTION + 1
+    cache.get("t:a")  # a becomes the most recently used
+
+    cache.put("t:e", VALUE)
+
+    # Over the bound: trimmed to 90% of it, the oldest accesses first
+    assert _keys(cache) == ["t:a", "t:d", "t:e"]
+
+
+def test_recent_hits_do_not_rewrite_access_time(tmp_path, clock):
+    cache = SharedCache(tmp_path / "cache.sqlite", max_bytes=4 * SIZE)
+    cache.put("t:a", VALUE)
+    cache.put("t:b", VALUE)
+    clock.value += shared_cache.ACCESS_RESOLUTION - 1
+
+    assert cache.get("t:a") == VALUE
+    accessed = dict(cache._connect().execute("SELECT key, accessed FROM entries"))
+    assert accessed["t:a"] == accessed["t:b"]
+
+    clock.value += 2
+    cache.get("t:a")
+    accessed = dict(cache._connect().execute("SELECT key, accessed FROM entries"))
+    assert accessed["t:a"] == clock.value
+
+
+def test_values_larger_than_the_cache_are_not_stored(tmp_path):
+    cache = SharedCache(tmp_path / "cache.sqlite", max_bytes=SIZE - 1)
+
+    cache.put("t:a", VALUE)
+
+    assert cache.get("t:a") is None
+
+
+def test_get_or_compute_shares_results_between_instances(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"total": 42}
+
+    first = SharedCache(path).get_or_compute("quote", ("cat", ["A", "B"], 88), compute)
+    second = SharedCache(path)
+    again = second.get_or_compute("quote", ("cat", ["A", "B"], 88), compute)
+
+    assert first == again == {"total": 42}
+    assert len(calls) == 1
+    assert second.stats()["hits"] == 1
+    assert second.stats()["namespaces"]["quote"]["entries"] == 1
+
+
+def test_keys_follow_content():
+    frame = pd.DataFrame({"UniProt": ["P1", "P2"]})
+
+    assert shared_cache.make_key("c", (frame, 1)) == shared_cache.make_key("c", (frame.copy(), 1))
+    assert shared_cache.make_key("c", (frame, 1)) != shared_cache.make_key("c", (frame.iloc[:1], 1))
+    assert shared_cache.make_key("c", io.BytesIO(b"abc")) == shared_cache.make_key("c", io.BytesIO(b"abc"))
+    assert shared_cache.make_key("c", [1]) != shared_cache.make_key("c", ["1"])
+    assert shared_cache.make_key("c", {"a", "b"}) == shared_cache.make_key("c", {"b", "a"})
+    with pytest.raises(TypeError):
+        shared_cache.make_key("c", object())
+
+
+def test_clear_namespace(tmp_path):
+    cache = SharedCache(tmp_path / "cache.sqlite")
+    cache.put("quote:1", 1)
+    cache.put("compare:1", 2)
+
+    cache.clear("quote")
+
+    assert _keys(cache) == ["compare:1"]
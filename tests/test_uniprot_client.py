@@ -0,0 +1,143 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from uniprot_client import UniProtClient
+
+
+class StubUniProt(ThreadingHTTPServer):
+    """Local stand-in for rest.uniprot.org: records every request and answers from respond(path, params)."""
+
+    def __init__(self, respond):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.respond = respond
+        self.requests = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        with self.server.lock:
+            self.server.requests.append((url.path, params))
+            status, headers, body = self.server.respond(url.path, params)
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    servers = []
+
+    def start(respond):
+        server = StubUniProt(respond)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def _client(server, **kwargs) -> UniProtClient:
+    kwargs.setdefault("backoff", 0.0)
+    kwargs.setdefault("rate", 1000.0)
+    return UniProtClient(base_url=server.url, **kwargs)
+
+
+def _entry(accession: str) -> dict:
+    return {
+        "primaryAccession": accession,
+        "proteinDescription": {"recommendedName": {"fullName": {"value": f"Protein {accession}"}}},
+        "comments": [{"commentType": "FUNCTION", "texts": [{"value": f"Function of {accession}"}]}],
+        "uniProtKBCrossReferences": [{"database": "GO", "id": "GO:0005615"}],
+    }
+
+
+def _accessions(params: dict) -> list:
+    return [part.split(":", 1)[1] for part in params["query"].split(" OR ")]
+
+
+@pytest.mark.parametrize("status", [429, 503])
+def test_retries_transient_status_honouring_retry_after(stub, status):
+    calls = []
+
+    def respond(path, params):
+        calls.append(path)
+        if len(calls) == 1:
+            return status, {"Retry-After": "1"}, {}
+        return 200, {}, {"results": [{"primaryAccession": "P05231"}]}
+
+    server = stub(respond)
+
+    started = time.monotonic()
+    assert _client(server).search_accession("IL6") == "P05231"
+    # backoff is 0, so the wait can only come from Retry-After
+    assert time.monotonic() - started >= 0.9
+    assert len(server.requests) == 2
+
+
+def test_gives_up_after_retries(stub):
+    server = stub(lambda path, params: (503, {"Retry-After": "0"}, {}))
+
+    assert _client(server, retries=2).search_accession("IL6") is None
+    assert len(server.requests) == 3
+
+
+def test_fetches_details_in_batches(stub):
+    def respond(path, params):
+        return 200, {}, {"results": [_entry(a) for a in _accessions(params)]}
+
+    server = stub(respond)
+    accessions = ["P1", "P2", "P3", "P4", "P5", "P3"]
+
+    details = _client(server, batch_size=2).fetch_details(accessions)
+
+    batches = sorted(_accessions(params) for _, params in server.requests)
+    assert batches == [["P1", "P2"], ["P3", "P4"], ["P5"]]
+    assert all(params["size"] == str(len(_accessions(params))) for _, params in server.requests)
+    assert set(details) == {"P1", "P2", "P3", "P4", "P5"}
+    assert details["P4"][:2] == ("Protein P4", "Function of P4")
+
+
+def test_annotate_reports_failed_lookups(stub):
+    def respond(path, params):
+        query = params["query"]
+        if query.startswith("accession:"):
+            return 200, {}, {"results": [_entry(a) for a in _accessions(params)]}
+        if query.startswith("IL6 "):
+            return 200, {}, {"results": [{"primaryAccession": "P05231"}]}
+        if query.startswith("NOSUCH "):
+            return 200, {}, {"results": []}
+        return 500, {}, {}
+
+    server = stub(respond)
+
+    df = _client(server, retries=1).annotate(["IL6", "NOSUCH", "BROKEN", "IL6"])
+
+    assert df["Protein Symbol"].tolist() == ["IL6", "NOSUCH", "BROKEN", "IL6"]
+    assert df["UniProt ID"].isna().tolist() == [False, True, True, False]
+    assert df.loc[0, "UniProt ID"] == "P05231"
+    assert df.loc[0, "Protein Name"] == "Protein P05231"
+    # Not found is an answer; a failed request is not, and is left for a retry
+    assert df.attrs["unresolved"] == ["BROKEN"]
@@ -0,0 +1,219 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+UNIPROT_URL = "https://rest.uniprot.org"
+HUMAN = 9606
+
+ANNOTATION_COLUMNS = ["Protein Symbol", "UniProt ID", "Protein Name", "Function", "GO Terms", "Pathways", "Diseases"]
+
+# Responses worth retrying; anything else is returned / raised straight away
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# Marks a lookup that failed (as opposed to "no match"), so it is never cached
+_FAILED = object()
+
+REQUESTS = metrics.counter("uniprot_requests_total", "UniProt HTTP attempts, by path and status code (or error)", ["path", "status"])
+REQUEST_SECONDS = metrics.histogram("uniprot_request_seconds", "Seconds per UniProt HTTP attempt, rate limiting excluded", ["path"])
+
+
+class TokenBucket:
+    """Thread-safe token bucket: on average `rate` acquisitions per second, bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: int = None):
+        self.rate = rate
+        self.capacity = capacity or max(1, int(rate))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a token is available, then take it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def parse_entry(data: dict) -> tuple:
+    """Return (name, function, GO terms, pathways, diseases) from a UniProtKB JSON entry."""
+    name = data.get("proteinDescription", {}).get("recommendedName", {}).get("fullName", {}).get("value", "")
+    comments = data.get("comments", [])
+    function = " ".join(
+        c.get("texts", [{}])[0].get("value", "")
+        for c in comments if c.get("commentType") == "FUNCTION"
+    )
+    go_terms = [ref["id"] for ref in data.get("uniProtKBCrossReferences", []) if ref["database"] == "GO"]
+    pathways = [ref["id"] for ref in data.get("uniProtKBCrossReferences", []) if ref["database"] in ["Reactome", "KEGG"]]
+    diseases = []
+    for comment in comments:
+        if comment.get("commentType") == "DISEASE":
+            notes = comment.get("texts", [])
+            if notes:
+                diseases.append(notes[0].get("value", ""))
+    return name, function, ", ".join(go_terms), ", ".join(pathways), ", ".join(diseases)
+
+
+class UniProtClient:
+    """Concurrent, rate-limited client for the UniProtKB REST API.
+
+    One pooled requests.Session is shared by a bounded worker pool; every
+    request goes through a token bucket and is retried with exponential
+    backoff on connection errors, timeouts, 429 and 5xx responses.
+    base_url can point at a local stub server for testing.
+
+    With an AnnotationCache, fresh cached lookups are served locally and only
+    the misses go to the network (or nowhere, in offline mode).
+    """
+
+    def __init__(self, base_url: str = UNIPROT_URL, organism_id: int = HUMAN, max_workers: int = 8,
+                 rate: float = 10.0, batch_size: int = 100, timeout: float = 30.0, retries: int = 4,
+                 backoff: float = 0.5, cache=None):
+        self.base_url = base_url.rstrip("/")
+        self.cache = cache
+        self.organism_id = organism_id
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.limiter = TokenBucket(rate)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    # ---------- HTTP ----------
+    def _get(self, path: str, params: dict) -> dict:
+        """GET base_url + path and return the decoded JSON, retrying transient failures."""
+        url = f"{self.base_url}{path}"
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire()
+            started = time.perf_counter()
+            try:
+                r = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                REQUEST_SECONDS.observe(time.perf_counter() - started, path=path)
+                REQUESTS.inc(path=path, status=type(e).__name__)
+                if attempt == self.retries:
+                    raise
+                time.sleep(self.backoff * 2 ** attempt)
+                continue
+            REQUEST_SECONDS.observe(time.perf_counter() - started, path=path)
+            REQUESTS.inc(path=path, status=str(r.status_code))
+            if r.status_code in RETRY_STATUS and attempt < self.retries:
+                retry_after = r.headers.get("Retry-After", "")
+                time.sleep(float(retry_after) if retry_after.isdigit() else self.backoff * 2 ** attempt)
+                continue
+            r.raise_for_status()
+            return r.json()
+
+    # ---------- Lookups ----------
+    def search_accession(self, symbol: str):
+        """Return the top UniProt accession for a protein symbol in the client's organism, or None."""
+        accession = self._search(symbol)
+        return None if accession is _FAILED else accession
+
+    def _search(self, symbol: str):
+        params = {
+            "query": f"{symbol} AND organism_id:{self.organism_id}",
+            "fields": "accession",
+            "format": "json",
+            "size": 1,
+        }
+        try:
+            data = self._get("/uniprotkb/search", params)
+        except Exception:
+            return _FAILED
+        if data.get("results"):
+            return data["results"][0]["primaryAccession"]
+        return None
+
+    def fetch_entries(self, accessions: list) -> dict:
+        """Return {accession: UniProtKB JSON entry}, fetched in multi-ID batches of batch_size."""
+        unique = list(dict.fromkeys(a for a in accessions if a))
+        batches = [unique[i:i + self.batch_size] for i in range(0, len(unique), self.batch_size)]
+
+        def fetch(batch):
+            params = {
+                "query": " OR ".join(f"accession:{a}" for a in batch),
+                "format": "json",
+                "size": len(batch),
+            }
+            try:
+                data = self._get("/uniprotkb/search", params)
+            except Exception:
+                return {}
+            return {entry["primaryAccession"]: entry for entry in data.get("results", [])}
+
+        entries = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for found in pool.map(fetch, batches):
+                entries.update(found)
+        return entries
+
+    def resolve_accessions(self, symbols: list, offline: bool = False) -> dict:
+        """Return {symbol: accession or None} for unique symbols, cache first.
+
+        Symbols whose lookup failed (or, offline, that are not cached) are left out.
+        """
+        accessions = self.cache.get_accessions(symbols, self.organism_id) if self.cache else {}
+        missing = [s for s in symbols if s not in accessions]
+        if missing and not offline:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                fetched = dict(zip(missing, pool.map(self._search, missing)))
+            if self.cache:
+                self.cache.put_accessions(
+                    {s: a for s, a in fetched.items() if a is not _FAILED}, self.organism_id
+                )
+            accessions.update({s: a for s, a in fetched.items() if a is not _FAILED})
+        return accessions
+
+    def fetch_details(self, accessions: list, offline: bool = False) -> dict:
+        """Return {accession: parsed details tuple}, cache first."""
+        accessions = list(dict.fromkeys(a for a in accessions if a))
+        details = self.cache.get_details(accessions) if self.cache else {}
+        missing = [a for a in accessions if a not in details]
+        if missing and not offline:
+            fetched = {accession: parse_entry(entry) for accession, entry in self.fetch_entries(missing).items()}
+            if self.cache:
+                self.cache.put_details(fetched)
+            details.update(fetched)
+        return details
+
+    def annotate(self, symbols, offline: bool = False) -> pd.DataFrame:
+        """Return one annotation row per input symbol (same columns as the annotator's table).
+
+        Symbols are deduplicated before any request is made; symbols that cannot
+        be resolved (or, offline, are not cached) get an empty annotation.
+        Those whose lookup failed, rather than found nothing, are listed in
+        df.attrs["unresolved"] so callers can retry them instead of keeping
+        the empty row.
+        """
+        symbols = list(symbols)
+        unique = list(dict.fromkeys(s for s in symbols if pd.notna(s)))
+        accessions = self.resolve_accessions(unique, offline)
+        details = self.fetch_details(list(accessions.values()), offline)
+
+        rows = []
+        for symbol in symbols:
+            accession = accessions.get(symbol) if pd.notna(symbol) else None
+            rows.append((symbol, accession) + details.get(accession, ("", "", "", "", "")))
+        df = pd.DataFrame(rows, columns=ANNOTATION_COLUMNS)
+        df.attrs["unresolved"] = [
+            s for s in unique if s not in accessions or (accessions[s] and accessions[s] not in details)
+        ]
+        return df